@@ -1,21 +1,24 @@
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
-from alembic import context
-import sys
 import os
+import sys
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from app.database.models import Base
 from app.config import settings
+from app.database import database_url
+from app.database.models import Base
 
 config = context.config
 
 target_metadata = Base.metadata
 
+# Same normalization as the app, so e.g. postgres:// URLs work here too
+url = database_url(settings.database_url).render_as_string(hide_password=False)
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
-    url = settings.database_url
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -30,7 +33,7 @@ def run_migrations_offline() -> None:
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
     configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = settings.database_url
+    configuration["sqlalchemy.url"] = url
     
     connectable = engine_from_config(
         configuration,
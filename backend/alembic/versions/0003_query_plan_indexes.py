@@ -0,0 +1,42 @@
+"""indexes chosen by app.scripts.explain_queries
+
+Revision ID: 0003_query_plan_indexes
+Revises: 0002_refresh_tokens
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0003_query_plan_indexes'
+down_revision = '0002_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Dashboard active-user count
+    op.create_index('ix_users_is_active', 'users', ['is_active'])
+    # Dashboard pending-reset count: covering for count(*) over unused tokens
+    op.create_index(
+        'ix_password_reset_tokens_unused_expires_at',
+        'password_reset_tokens',
+        ['expires_at'],
+        sqlite_where=sa.text('used = 0'),
+        postgresql_where=sa.text('used = false'),
+    )
+    # Hourly cleanup of expired, still-active tokens
+    op.create_index(
+        'ix_password_reset_tokens_active_expires_at',
+        'password_reset_tokens',
+        ['expires_at'],
+        sqlite_where=sa.text('active = 1'),
+        postgresql_where=sa.text('active = true'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_password_reset_tokens_active_expires_at', table_name='password_reset_tokens')
+    op.drop_index('ix_password_reset_tokens_unused_expires_at', table_name='password_reset_tokens')
+    op.drop_index('ix_users_is_active', table_name='users')
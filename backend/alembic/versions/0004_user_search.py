@@ -0,0 +1,62 @@
+"""admin user listing: email search index and keyset index
+
+Revision ID: 0004_user_search
+Revises: 0003_query_plan_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0004_user_search'
+down_revision = '0003_query_plan_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Role filter: user_roles is keyed (user_id, role_id), so look-ups by role
+    # need their own index
+    op.create_index('ix_user_roles_role_id', 'user_roles', ['role_id', 'user_id'])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Trigram FTS5 index over users.email (SQLite >= 3.34), kept in sync
+        # by triggers; it stores no copy of the email (external content)
+        op.execute(
+            "CREATE VIRTUAL TABLE users_email_fts USING fts5("
+            "email, content='users', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER users_email_fts_ai AFTER INSERT ON users BEGIN "
+            "INSERT INTO users_email_fts(rowid, email) VALUES (new.id, new.email); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_email_fts_ad AFTER DELETE ON users BEGIN "
+            "INSERT INTO users_email_fts(users_email_fts, rowid, email) VALUES ('delete', old.id, old.email); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_email_fts_au AFTER UPDATE OF email ON users BEGIN "
+            "INSERT INTO users_email_fts(users_email_fts, rowid, email) VALUES ('delete', old.id, old.email); "
+            "INSERT INTO users_email_fts(rowid, email) VALUES (new.id, new.email); END"
+        )
+        op.execute("INSERT INTO users_email_fts(users_email_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        # Keyset pagination on (created_at, id), newest first. SQLite needs no
+        # extra index: ix_users_created_at already ends in the rowid (= id).
+        op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'])
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_users_email_trgm ON users USING gin (email gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS users_email_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS users_email_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS users_email_fts_ai")
+        op.execute("DROP TABLE IF EXISTS users_email_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_users_email_trgm")
+        op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_user_roles_role_id', table_name='user_roles')
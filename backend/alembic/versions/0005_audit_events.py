@@ -0,0 +1,40 @@
+"""audit events
+
+Revision ID: 0005_audit_events
+Revises: 0004_user_search
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0005_audit_events'
+down_revision = '0004_user_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'audit_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('client_ip', sa.String(), nullable=True),
+        sa.Column('request_id', sa.String(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+    )
+    op.create_index('ix_audit_events_occurred_at', 'audit_events', ['occurred_at'])
+    op.create_index('ix_audit_events_user_id_id', 'audit_events', ['user_id', 'id'])
+    op.create_index('ix_audit_events_event_type_id', 'audit_events', ['event_type', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_events_event_type_id', table_name='audit_events')
+    op.drop_index('ix_audit_events_user_id_id', table_name='audit_events')
+    op.drop_index('ix_audit_events_occurred_at', table_name='audit_events')
+    op.drop_table('audit_events')
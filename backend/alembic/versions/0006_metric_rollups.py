@@ -0,0 +1,40 @@
+"""metric rollups for dashboard time series
+
+Revision ID: 0006_metric_rollups
+Revises: 0005_audit_events
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0006_metric_rollups'
+down_revision = '0005_audit_events'
+branch_labels = None
+depends_on = None
+
+METRICS = ('signups', 'logins', 'password_resets')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'metric_rollups',
+        sa.Column('metric', sa.String(), primary_key=True),
+        sa.Column('granularity', sa.String(), primary_key=True),
+        sa.Column('bucket', sa.DateTime(), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    watermarks = op.create_table(
+        'rollup_watermarks',
+        sa.Column('metric', sa.String(), primary_key=True),
+        sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    # Starting at 0 makes the first job runs backfill existing history
+    op.bulk_insert(watermarks, [{'metric': metric, 'last_id': 0} for metric in METRICS])
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_watermarks')
+    op.drop_table('metric_rollups')
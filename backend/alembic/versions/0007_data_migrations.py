@@ -0,0 +1,34 @@
+"""checkpoints for online data migrations
+
+Revision ID: 0007_data_migrations
+Revises: 0006_metric_rollups
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0007_data_migrations'
+down_revision = '0006_metric_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows are created by the app for each registered migration
+    op.create_table(
+        'data_migrations',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('last_key', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('processed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('data_migrations')
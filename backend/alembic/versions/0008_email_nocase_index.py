@@ -0,0 +1,27 @@
+"""case-insensitive email prefix index for short admin searches
+
+Revision ID: 0008_email_nocase_index
+Revises: 0007_data_migrations
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0008_email_nocase_index'
+down_revision = '0007_data_migrations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Searches under three characters are email prefixes; the unique email
+    # index is case-sensitive, so they need a NOCASE one to match FTS and
+    # PostgreSQL's ILIKE. PostgreSQL serves every search from pg_trgm.
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("CREATE INDEX ix_users_email_nocase ON users (email COLLATE NOCASE)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP INDEX IF EXISTS ix_users_email_nocase")
@@ -1,6 +1,6 @@
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-import os
 
 
 class Settings(BaseSettings):
@@ -8,9 +8,39 @@ class Settings(BaseSettings):
     jwt_secret: str = Field(..., env="JWT_SECRET")
     access_token_ttl_minutes: int = Field(15, env="ACCESS_TOKEN_TTL_MINUTES")
     refresh_token_ttl_days: int = Field(30, env="REFRESH_TOKEN_TTL_DAYS")
+    refresh_reuse_grace_seconds: int = Field(10, env="REFRESH_REUSE_GRACE_SECONDS")
+    refresh_revocation_sync_seconds: float = Field(5.0, env="REFRESH_REVOCATION_SYNC_SECONDS")
     
+    # Password hashing: 0 calibrates the bcrypt cost at startup to take about
+    # PASSWORD_HASH_TARGET_MS on this machine, within the min/max bounds
+    password_bcrypt_rounds: int = Field(0, env="PASSWORD_BCRYPT_ROUNDS")
+    password_hash_target_ms: float = Field(250.0, env="PASSWORD_HASH_TARGET_MS")
+    password_bcrypt_min_rounds: int = Field(12, env="PASSWORD_BCRYPT_MIN_ROUNDS")
+    password_bcrypt_max_rounds: int = Field(16, env="PASSWORD_BCRYPT_MAX_ROUNDS")
+    # Hashes below the current cost are upgraded in the background after login
+    password_rehash_on_login: bool = Field(True, env="PASSWORD_REHASH_ON_LOGIN")
+    password_rehash_max_pending: int = Field(1000, env="PASSWORD_REHASH_MAX_PENDING")
+
     # Database
     database_url: str = Field("sqlite:///./data/service.db", env="DATABASE_URL")
+    # Pool and timeout settings for server databases (PostgreSQL); SQLite
+    # uses one shared file with WAL and busy_timeout instead
+    db_pool_size: int = Field(5, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, env="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(30.0, env="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(1800, env="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(True, env="DB_POOL_PRE_PING")
+    db_statement_timeout_ms: int = Field(30000, env="DB_STATEMENT_TIMEOUT_MS")
+    db_application_name: str = Field("service", env="DB_APPLICATION_NAME")
+    # Read replicas (JSON list of URLs). Without them, SQLite reads use a
+    # separate pool of query_only connections to the same WAL file
+    database_read_urls: list[str] = Field([], env="DATABASE_READ_URLS")
+    db_read_pool_size: int = Field(10, env="DB_READ_POOL_SIZE")
+    # With replicas, a client's reads go to the writer for this long after
+    # it writes, so it never reads a replica that hasn't caught up yet
+    read_your_writes_seconds: float = Field(5.0, env="READ_YOUR_WRITES_SECONDS")
+    # Expired tokens are deleted this many rows per transaction
+    db_cleanup_batch_size: int = Field(1000, env="DB_CLEANUP_BATCH_SIZE")
 
     # CORS
     cors_origins: list[str] = Field(["*"], env="CORS_ORIGINS")
@@ -36,6 +66,140 @@ class Settings(BaseSettings):
     aws_default_region: str = Field("us-east-1", env="AWS_DEFAULT_REGION")
     frontend_url: str = Field("http://localhost:3000", env="FRONTEND_URL")
 
+    # OpenAPI: serve the schema written by app.scripts.export_openapi at build time
+    openapi_prebuilt: bool = Field(False, env="OPENAPI_PREBUILT")
+
+    # Warm-up and readiness
+    role_cache_ttl_seconds: float = Field(60.0, env="ROLE_CACHE_TTL_SECONDS")
+    # /api/dashboard/onload counts are shared between requests for this long
+    dashboard_metrics_ttl_seconds: float = Field(5.0, env="DASHBOARD_METRICS_TTL_SECONDS")
+    health_probe_interval_seconds: float = Field(5.0, env="HEALTH_PROBE_INTERVAL_SECONDS")
+    health_probe_timeout_seconds: float = Field(2.0, env="HEALTH_PROBE_TIMEOUT_SECONDS")
+
+    # Load shedding
+    load_shedding_enabled: bool = Field(True, env="LOAD_SHEDDING_ENABLED")
+    load_shedding_queue_size: int = Field(32, env="LOAD_SHEDDING_QUEUE_SIZE")
+    load_shedding_queue_timeout_seconds: float = Field(1.0, env="LOAD_SHEDDING_QUEUE_TIMEOUT_SECONDS")
+
+    # Live dashboard metrics (/api/dashboard/stream)
+    dashboard_stream_interval_seconds: float = Field(5.0, env="DASHBOARD_STREAM_INTERVAL_SECONDS")
+    dashboard_stream_heartbeat_seconds: float = Field(15.0, env="DASHBOARD_STREAM_HEARTBEAT_SECONDS")
+    dashboard_stream_max_clients: int = Field(500, env="DASHBOARD_STREAM_MAX_CLIENTS")
+
+    # Batched page calls (/api/batch)
+    batch_max_requests: int = Field(10, env="BATCH_MAX_REQUESTS")
+
+    # Bulk user export/import (admin endpoints and app.scripts.bulk_users)
+    bulk_export_chunk_size: int = Field(1000, env="BULK_EXPORT_CHUNK_SIZE")
+    bulk_import_batch_size: int = Field(1000, env="BULK_IMPORT_BATCH_SIZE")
+    # 0 means one hashing thread per core
+    bulk_import_hash_workers: int = Field(0, env="BULK_IMPORT_HASH_WORKERS")
+    bulk_import_max_errors: int = Field(1000, env="BULK_IMPORT_MAX_ERRORS")
+
+    # Write-behind audit trail (auth events)
+    audit_enabled: bool = Field(True, env="AUDIT_ENABLED")
+    audit_buffer_size: int = Field(10000, env="AUDIT_BUFFER_SIZE")
+    audit_batch_size: int = Field(500, env="AUDIT_BATCH_SIZE")
+    audit_flush_interval_seconds: float = Field(2.0, env="AUDIT_FLUSH_INTERVAL_SECONDS")
+
+    # Hourly/daily metric rollups behind /api/dashboard/timeseries
+    rollup_interval_seconds: float = Field(60.0, env="ROLLUP_INTERVAL_SECONDS")
+    rollup_batch_size: int = Field(5000, env="ROLLUP_BATCH_SIZE")
+    rollup_max_points: int = Field(1000, env="ROLLUP_MAX_POINTS")
+    rollup_visibility_lag_seconds: float = Field(60.0, env="ROLLUP_VISIBILITY_LAG_SECONDS")
+
+    # Online data migrations (app.functions.data_migrations)
+    data_migrations_enabled: bool = Field(True, env="DATA_MIGRATIONS_ENABLED")
+    data_migration_batch_size: int = Field(1000, env="DATA_MIGRATION_BATCH_SIZE")
+    # Fraction of wall time spent running batches; the rest is spent paused
+    data_migration_duty_cycle: float = Field(0.25, env="DATA_MIGRATION_DUTY_CYCLE")
+    data_migration_min_pause_seconds: float = Field(0.05, env="DATA_MIGRATION_MIN_PAUSE_SECONDS")
+    data_migration_retry_seconds: float = Field(30.0, env="DATA_MIGRATION_RETRY_SECONDS")
+    # How long a "not finished yet" answer is reused by feature gates
+    data_migration_gate_ttl_seconds: float = Field(5.0, env="DATA_MIGRATION_GATE_TTL_SECONDS")
+
+    # Response compression; br and zstd need the brotli / zstandard packages
+    compression_enabled: bool = Field(True, env="COMPRESSION_ENABLED")
+    compression_encodings: list[str] = Field(["br", "zstd", "gzip"], env="COMPRESSION_ENCODINGS")
+    compression_min_size: int = Field(1024, env="COMPRESSION_MIN_SIZE")
+    compression_gzip_level: int = Field(6, env="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(4, env="COMPRESSION_BROTLI_QUALITY")
+    compression_zstd_level: int = Field(3, env="COMPRESSION_ZSTD_LEVEL")
+    compression_content_types: list[str] = Field(
+        [
+            "application/json",
+            "application/x-ndjson",
+            "application/javascript",
+            "application/xml",
+            "image/svg+xml",
+            "text/css",
+            "text/csv",
+            "text/html",
+            "text/javascript",
+            "text/plain",
+        ],
+        env="COMPRESSION_CONTENT_TYPES",
+    )
+
+    # Production launcher (python -m app.scripts.serve)
+    server_host: str = Field("0.0.0.0", env="SERVER_HOST")
+    server_port: int = Field(5656, env="SERVER_PORT")
+    # 0 sizes the pool from usable cores and memory
+    server_workers: int = Field(0, env="SERVER_WORKERS")
+    server_workers_per_core: float = Field(1.0, env="SERVER_WORKERS_PER_CORE")
+    server_worker_memory_mb: int = Field(256, env="SERVER_WORKER_MEMORY_MB")
+    server_max_workers: int = Field(0, env="SERVER_MAX_WORKERS")
+    # Longer than a typical load balancer's 60s idle timeout, so the balancer
+    # (not us) closes idle connections and never reuses a closed one
+    server_keepalive_seconds: int = Field(75, env="SERVER_KEEPALIVE_SECONDS")
+    server_backlog: int = Field(2048, env="SERVER_BACKLOG")
+    # Workers are recycled after about this many requests (0 disables);
+    # the jitter keeps them from restarting at the same moment
+    server_max_requests: int = Field(50000, env="SERVER_MAX_REQUESTS")
+    server_max_requests_jitter: int = Field(5000, env="SERVER_MAX_REQUESTS_JITTER")
+    server_graceful_timeout_seconds: int = Field(30, env="SERVER_GRACEFUL_TIMEOUT_SECONDS")
+
+    # Logging
+    log_level: str = Field("INFO", env="LOG_LEVEL")
+    log_format: str = Field("json", env="LOG_FORMAT")
+    access_log_enabled: bool = Field(True, env="ACCESS_LOG_ENABLED")
+    access_log_sample_rate: float = Field(0.05, env="ACCESS_LOG_SAMPLE_RATE")
+    access_log_sampled_paths: list[str] = Field(
+        ["/livez", "/readyz", "/api/auth/me"], env="ACCESS_LOG_SAMPLED_PATHS"
+    )
+    access_log_slow_ms: float = Field(1000.0, env="ACCESS_LOG_SLOW_MS")
+
+    # Tracing: sampled traces plus every slow or failed one, exported as
+    # OTLP/JSON to a JSONL file ("file") or a collector endpoint ("otlp")
+    tracing_enabled: bool = Field(False, env="TRACING_ENABLED")
+    tracing_sample_rate: float = Field(0.01, env="TRACING_SAMPLE_RATE")
+    tracing_slow_ms: float = Field(500.0, env="TRACING_SLOW_MS")
+    tracing_exporter: str = Field("file", env="TRACING_EXPORTER")
+    tracing_file_path: str = Field("./data/traces.jsonl", env="TRACING_FILE_PATH")
+    tracing_otlp_endpoint: str = Field("http://localhost:4318/v1/traces", env="TRACING_OTLP_ENDPOINT")
+    tracing_service_name: str = Field("service-template", env="TRACING_SERVICE_NAME")
+    tracing_batch_size: int = Field(512, env="TRACING_BATCH_SIZE")
+    tracing_flush_interval_seconds: float = Field(5.0, env="TRACING_FLUSH_INTERVAL_SECONDS")
+    tracing_max_queue: int = Field(2048, env="TRACING_MAX_QUEUE")
+
+    # Profiling: admins send PROFILING_HEADER to profile one request; profiles
+    # are stored as speedscope JSON. pyinstrument is used when installed.
+    profiling_enabled: bool = Field(True, env="PROFILING_ENABLED")
+    profiling_header: str = Field("X-Profile", env="PROFILING_HEADER")
+    profiling_sample_rate: float = Field(0.0, env="PROFILING_SAMPLE_RATE")
+    profiling_interval_ms: float = Field(1.0, env="PROFILING_INTERVAL_MS")
+    profiling_engine: str = Field("auto", env="PROFILING_ENGINE")
+    profiling_dir: str = Field("./data/profiles", env="PROFILING_DIR")
+    profiling_max_profiles: int = Field(50, env="PROFILING_MAX_PROFILES")
+
+    # Memory diagnostics: RSS is sampled every interval; tracemalloc adds
+    # allocation snapshots at a CPU and memory cost, so it is opt-in
+    memory_snapshot_interval_seconds: float = Field(300.0, env="MEMORY_SNAPSHOT_INTERVAL_SECONDS")
+    memory_history_size: int = Field(288, env="MEMORY_HISTORY_SIZE")
+    memory_tracemalloc_enabled: bool = Field(False, env="MEMORY_TRACEMALLOC_ENABLED")
+    memory_tracemalloc_frames: int = Field(1, env="MEMORY_TRACEMALLOC_FRAMES")
+    memory_keep_snapshots: int = Field(3, env="MEMORY_KEEP_SNAPSHOTS")
+
     # Cookies
     cookie_secure: bool = Field(False, env="COOKIE_SECURE")
     
@@ -1,15 +1,245 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
 from contextlib import contextmanager
-from .models import Base
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+
 from ..config import settings
+from ..functions.tracing import KIND_CLIENT, start_span
+from .models import Base
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": "5000",
+}
+
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
+pool_stats = {"checkouts": 0}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply per-connection SQLite pragmas when a pooled connection is opened"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats["checkouts"] += 1
+
+
+def _start_query_span(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_span = start_span(
+            "db." + statement.lstrip().split(None, 1)[0].lower(),
+            KIND_CLIENT,
+            **{"db.system": conn.dialect.name, "db.statement": statement[:1000]},
+        )
+
+
+def _end_query_span(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "query_span", None)
+    if span is not None:
+        if cursor.rowcount >= 0:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+
+
+def _fail_query_span(exception_context):
+    span = getattr(exception_context.execution_context, "query_span", None)
+    if span is not None:
+        span.record_error(exception_context.original_exception)
+        span.end()
+
+
+def database_url(url: str) -> URL:
+    """Parse ``url``, accepting the ``postgres://`` scheme some hosts hand out"""
+    parsed = make_url(url)
+    if parsed.drivername == "postgres":
+        parsed = parsed.set(drivername="postgresql")
+    if parsed.get_backend_name() not in SUPPORTED_DIALECTS:
+        raise ValueError(f"Unsupported database {parsed.get_backend_name()!r}; use one of {SUPPORTED_DIALECTS}")
+    return parsed
+
+
+def _make_read_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def _sqlite_engine(url: URL, read_only: bool) -> Engine:
+    # One file shared by threads; WAL and busy_timeout handle the locking
+    if not read_only:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+        return engine
+    # WAL readers never block the writer (or each other), so they get a
+    # pool of their own
+    engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=settings.db_read_pool_size)
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(engine, "connect", _make_read_only)
+    return engine
+
+
+def _postgresql_engine(url: URL, read_only: bool) -> Engine:
+    # statement_timeout is set at connect time so a runaway query can't hold
+    # a pooled connection (and its locks) indefinitely
+    options = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    if read_only:
+        options += " -c default_transaction_read_only=on"
+    return create_engine(
+        url,
+        pool_size=settings.db_read_pool_size if read_only else settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={"options": options, "application_name": settings.db_application_name},
+    )
+
+
+def create_app_engine(url: str, read_only: bool = False) -> Engine:
+    """An engine configured for the URL's dialect, with pool counting and query spans"""
+    parsed = database_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        engine = _sqlite_engine(parsed, read_only)
+    else:
+        engine = _postgresql_engine(parsed, read_only)
+    event.listen(engine, "checkout", _count_checkout)
+    event.listen(engine, "before_cursor_execute", _start_query_span)
+    event.listen(engine, "after_cursor_execute", _end_query_span)
+    event.listen(engine, "handle_error", _fail_query_span)
+    return engine
+
 
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+def _read_engines() -> list[Engine]:
+    """Replicas if configured; otherwise query_only readers on the SQLite file"""
+    if settings.database_read_urls:
+        return [create_app_engine(url, read_only=True) for url in settings.database_read_urls]
+    if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        return [create_app_engine(settings.database_url, read_only=True)]
+    return [engine]
+
+
+engine = create_app_engine(settings.database_url)
+read_engines = _read_engines()
+_next_read_engine = itertools.cycle(read_engines).__next__
+
+# Read-write sessions for anything that changes data; read-only sessions
+# (``get_read_session()``) for lookups that can be served by any reader
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+class RequestSession:
+    """One connection and session shared by everything that runs in a request.
+
+    Both are opened on first use and released by ``close()``. After that,
+    ``get_db_session()`` falls back to short-lived sessions, e.g. for
+    background tasks that run after the response.
+
+    Reads use a reader connection until the request touches the writer, or
+    while ``sticky`` is set because this client wrote recently; from then on
+    they go to the writer too, so a client always sees its own writes.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._session: Session | None = None
+        self._read_connection = None
+        self._read_session: Session | None = None
+        self.closed = False
+        self.sticky = False
+        self.wrote = False
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._connection = engine.connect()
+            self._session = SessionLocal(bind=self._connection)
+        return self._session
+
+    @property
+    def read_session(self) -> Session:
+        if self._session is not None or self.sticky:
+            return self.session
+        if self._read_session is None:
+            read_engine = _next_read_engine()
+            if read_engine is engine:
+                # No separate reader: a second connection from the writer's
+                # pool would only let requests starve each other of it
+                return self.session
+            self._read_connection = read_engine.connect()
+            self._read_session = ReadSessionLocal(bind=self._read_connection)
+        return self._read_session
+
+    def close(self) -> None:
+        self.closed = True
+        if self._session is not None:
+            self._session.close()
+            self._connection.close()
+            self._session = self._connection = None
+        if self._read_session is not None:
+            self._read_session.close()
+            self._read_connection.close()
+            self._read_session = self._read_connection = None
+
+
+_request_session: ContextVar[RequestSession | None] = ContextVar("request_session", default=None)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _note_write(session):
+    scope = _request_session.get()
+    if scope is not None:
+        scope.wrote = True
+
+
+@contextmanager
+def request_session_scope():
+    """Share one session between all ``get_db_session()`` users inside the block.
+
+    A nested scope (e.g. a batch sub-request) inherits the enclosing one's
+    read-your-writes stickiness and hands its writes back to it.
+    """
+    outer = _request_session.get()
+    scope = RequestSession()
+    if outer is not None:
+        scope.sticky = outer.sticky or outer.wrote
+    token = _request_session.set(scope)
+    try:
+        yield scope
+    finally:
+        _request_session.reset(token)
+        scope.close()
+        if outer is not None and scope.wrote:
+            outer.wrote = True
 
 
 @contextmanager
 def get_db_session():
+    scope = _request_session.get()
+    if scope is not None and not scope.closed:
+        db = scope.session
+        try:
+            yield db
+        except Exception:
+            # Match a standalone session, which would discard the failed work
+            db.rollback()
+            raise
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -17,9 +247,27 @@ def get_db_session():
         db.close()
 
 
-def get_db():
-    db = SessionLocal()
+@contextmanager
+def get_read_session():
+    """A session for reads only: a reader connection, or the writer when the
+    request has written (or the client wrote recently)"""
+    scope = _request_session.get()
+    if scope is not None and not scope.closed:
+        db = scope.read_session
+        try:
+            yield db
+        except Exception:
+            db.rollback()
+            raise
+        return
+
+    db = ReadSessionLocal(bind=_next_read_engine())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_db():
+    with get_db_session() as db:
+        yield db
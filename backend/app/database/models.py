@@ -1,7 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
-from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
+from sqlalchemy.orm import declarative_base, relationship
+
 Base = declarative_base()
 
 
@@ -16,10 +27,18 @@ class User(Base, AuditMixin):
     id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, index=True)
     
     roles = relationship("UserRole", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination for the admin user list. On SQLite the created_at
+        # index already ends in the rowid. Email search uses a trigram index
+        # created in migration 0004 (FTS5 on SQLite, pg_trgm on PostgreSQL),
+        # which has no ORM representation.
+        Index("ix_users_created_at_id", "created_at", "id").ddl_if(dialect="postgresql"),
+    )
+
 
 class Role(Base, AuditMixin):
     __tablename__ = "roles"
@@ -37,6 +56,11 @@ class UserRole(Base):
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     role_id = Column(Integer, ForeignKey("roles.id"), primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Admin user list filtered by role
+        Index("ix_user_roles_role_id", "role_id", "user_id"),
+    )
     
     user = relationship("User", back_populates="roles")
     role = relationship("Role")
@@ -51,4 +75,88 @@ class PasswordResetToken(Base):
     expires_at = Column(DateTime, index=True)
     used = Column(Boolean, default=False)
     active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Partial indexes for the dashboard's pending count and the expiry cleanup
+        Index(
+            "ix_password_reset_tokens_unused_expires_at",
+            "expires_at",
+            sqlite_where=text("used = 0"),
+            postgresql_where=text("used = false"),
+        ),
+        Index(
+            "ix_password_reset_tokens_active_expires_at",
+            "expires_at",
+            sqlite_where=text("active = 1"),
+            postgresql_where=text("active = true"),
+        ),
+    )
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    family_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    rotated_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AuditEvent(Base):
+    __tablename__ = "audit_events"
+
+    id = Column(Integer, primary_key=True)
+    # When it happened, not when the write-behind buffer flushed it
+    occurred_at = Column(DateTime, nullable=False, index=True)
+    event_type = Column(String, nullable=False)
+    # No foreign keys: the trail must outlive the users it mentions
+    user_id = Column(Integer, nullable=True)
+    actor_id = Column(Integer, nullable=True)
+    email = Column(String, nullable=True)
+    client_ip = Column(String, nullable=True)
+    request_id = Column(String, nullable=True)
+    details = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        # Admin queries filter by subject or type and page newest first by id
+        Index("ix_audit_events_user_id_id", "user_id", "id"),
+        Index("ix_audit_events_event_type_id", "event_type", "id"),
+    )
+
+
+class MetricRollup(Base):
+    __tablename__ = "metric_rollups"
+
+    metric = Column(String, primary_key=True)
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    # Highest source row id already counted into metric_rollups
+    metric = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class DataMigrationState(Base):
+    __tablename__ = "data_migrations"
+
+    # One row per registered online data migration (app.functions.data_migrations)
+    name = Column(String, primary_key=True)
+    # Highest key already processed; batches resume after it
+    last_key = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,19 +1,189 @@
-from sqlalchemy.orm import Session
-from .models import User, PasswordResetToken
-from . import get_db_session
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 
+from sqlalchemy import (
+    bindparam,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    select,
+    table,
+    tuple_,
+    update,
+)
+
+from ..config import settings
+from ..functions.tracing import traced
+from . import engine, get_db_session, get_read_session
+from .models import PasswordResetToken, Role, User, UserRole
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Immutable, session-free copy of a users row.
+
+    Read helpers return these instead of ORM instances: they carry no
+    identity-map or instrumentation state, can't lazy-load after their
+    session is gone, and are safe to cache and share across requests.
+    """
+
+    id: int
+    email: str
+    hashed_password: str = field(repr=False)
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+USER_COLUMNS = (
+    User.id,
+    User.email,
+    User.hashed_password,
+    User.is_active,
+    User.created_at,
+    User.updated_at,
+)
+
+
+# Hot lookups are built once: SQLAlchemy memoizes a statement's cache key, so
+# each call goes straight to the compiled-statement cache.
+USER_BY_ID = select(*USER_COLUMNS).where(User.id == bindparam("user_id"))
+USER_BY_EMAIL = select(*USER_COLUMNS).where(User.email == bindparam("email"))
+ROLE_IDS_BY_USER = select(UserRole.role_id).where(UserRole.user_id == bindparam("user_id"))
+ALL_ROLES = select(Role.id, Role.name, Role.parent_role_id)
+
+COUNT_USERS = select(func.count()).select_from(User)
+COUNT_ACTIVE_USERS = select(func.count()).select_from(User).where(User.is_active == True)
+COUNT_PENDING_RESETS = select(func.count()).select_from(PasswordResetToken).where(
+    PasswordResetToken.used == False,
+    PasswordResetToken.expires_at > bindparam("now"),
+)
+
+
+USER_LIST_COLUMNS = (User.id, User.email, User.is_active, User.created_at)
+ROLES_FOR_USERS = select(UserRole.user_id, UserRole.role_id).where(
+    UserRole.user_id.in_(bindparam("user_ids", expanding=True))
+)
+
+# Trigram FTS5 index over users.email (SQLite only, see migration 0004)
+users_email_fts = table("users_email_fts", column("rowid"), column("users_email_fts"))
+
+# Trigrams need three characters; shorter terms fall back to an email prefix
+MIN_SUBSTRING_SEARCH = 3
+
+# Email searches matching fewer rows than this start from the search index and
+# sort the matches; more common terms walk users newest-first and test each
+# email until the page is full, like ROLE_DRIVEN_MAX below
+MATCH_DRIVEN_MAX = 10_000
+
+# Role filters with fewer members than this start from ix_user_roles_role_id
+# and sort the matches; larger ones walk users newest-first until the page is
+# full. Either way a page costs at most about this many index reads.
+ROLE_DRIVEN_MAX = 10_000
+ROLE_MEMBERS_UP_TO = select(func.count()).select_from(
+    select(UserRole.user_id)
+    .where(UserRole.role_id.in_(bindparam("role_ids", expanding=True)))
+    .limit(bindparam("cap"))
+    .subquery()
+)
+
+
+def _user_snapshot(row) -> UserSnapshot | None:
+    return UserSnapshot(*row) if row is not None else None
+
+
+def content_version(value) -> str:
+    """Short digest of a value's content; equal across workers for equal data"""
+    return hashlib.blake2b(repr(value).encode(), digest_size=8).hexdigest()
+
+
+class RoleCache:
+    """In-memory copy of the (small, rarely changing) roles table.
+
+    Maps role id -> (name, parent role id) so hierarchy walks need no queries.
+    Reloaded after ``ttl`` seconds, or immediately via ``invalidate()``.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._roles: dict[int, tuple[str, int | None]] | None = None
+        self._version = ""
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> dict[int, tuple[str, int | None]]:
+        roles = self._roles
+        if roles is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return roles
+        with self._lock:
+            if self._roles is None or time.monotonic() - self._loaded_at >= self.ttl:
+                with get_read_session() as db:
+                    rows = db.execute(ALL_ROLES).all()
+                self._roles = {role_id: (name, parent_id) for role_id, name, parent_id in rows}
+                self._version = content_version(sorted(self._roles.items()))
+                self._loaded_at = time.monotonic()
+            return self._roles
+
+    def version(self) -> str:
+        """Changes whenever a role is added, renamed or re-parented"""
+        self.get()
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._roles = None
+
+
+role_cache = RoleCache(ttl=settings.role_cache_ttl_seconds)
+
+
+class MetricsCache:
+    """Dashboard metrics shared by all requests for ``ttl`` seconds.
+
+    The version is a digest of the values, so it only changes when a count
+    does and is the same on every worker.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: tuple[str, dict] | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> tuple[str, dict]:
+        """(version, metrics)"""
+        value = self._value
+        if value is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return value
+        with self._lock:
+            if self._value is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._store(get_dashboard_metrics())
+            return self._value
+
+    def refresh(self) -> tuple[str, dict]:
+        """Recompute now, e.g. for the live stream's tick"""
+        metrics = get_dashboard_metrics()
+        with self._lock:
+            self._store(metrics)
+            return self._value
+
+    def _store(self, metrics: dict) -> None:
+        self._value = (content_version(sorted(metrics.items())), metrics)
+        self._loaded_at = time.monotonic()
+
 
 def get_dashboard_metrics() -> dict:
     """Cross-table query for dashboard metrics"""
-    with get_db_session() as db:
-        total_users = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
-        pending_resets = db.query(PasswordResetToken).filter(
-            PasswordResetToken.used == False,
-            PasswordResetToken.expires_at > datetime.utcnow()
-        ).count()
-        
+    with get_read_session() as db:
+        total_users = db.scalar(COUNT_USERS)
+        active_users = db.scalar(COUNT_ACTIVE_USERS)
+        pending_resets = db.scalar(COUNT_PENDING_RESETS, {"now": datetime.utcnow()})
+
         return {
             "total_users": total_users,
             "active_users": active_users,
@@ -21,23 +191,138 @@ def get_dashboard_metrics() -> dict:
         }
 
 
-def get_user_by_id(user_id: int) -> User | None:
+metrics_cache = MetricsCache(ttl=settings.dashboard_metrics_ttl_seconds)
+
+
+@traced("users.get_by_id")
+def get_user_by_id(user_id: int) -> UserSnapshot | None:
     """Get user by ID"""
-    with get_db_session() as db:
-        return db.query(User).filter(User.id == user_id).first()
+    with get_read_session() as db:
+        return _user_snapshot(db.execute(USER_BY_ID, {"user_id": user_id}).first())
 
 
-def get_user_by_email(email: str) -> User | None:
+@traced("users.get_by_email")
+def get_user_by_email(email: str) -> UserSnapshot | None:
     """Get user by email"""
+    with get_read_session() as db:
+        return _user_snapshot(db.execute(USER_BY_EMAIL, {"email": email}).first())
+
+
+def get_user_role_ids(user_id: int) -> list[int]:
+    """Get the ids of roles assigned directly to a user"""
+    with get_read_session() as db:
+        return list(db.execute(ROLE_IDS_BY_USER, {"user_id": user_id}).scalars())
+
+
+def set_user_role_ids(user_id: int, role_ids: set[int]) -> tuple[set[int], set[int]]:
+    """Replace a user's direct roles; returns the (granted, revoked) role ids"""
     with get_db_session() as db:
-        return db.query(User).filter(User.email == email).first()
+        current = set(db.execute(ROLE_IDS_BY_USER, {"user_id": user_id}).scalars())
+        granted, revoked = role_ids - current, current - role_ids
+        if revoked:
+            db.execute(delete(UserRole).where(UserRole.user_id == user_id, UserRole.role_id.in_(revoked)))
+        if granted:
+            db.execute(insert(UserRole), [{"user_id": user_id, "role_id": role_id} for role_id in granted])
+        if granted or revoked:
+            # updated_at is part of the /auth/me ETag
+            db.execute(update(User).where(User.id == user_id).values(updated_at=datetime.utcnow()))
+        db.commit()
+        return granted, revoked
 
 
-def create_user(email: str, hashed_password: str) -> User:
+def create_user(email: str, hashed_password: str) -> UserSnapshot:
     """Create a new user"""
     with get_db_session() as db:
         user = User(email=email, hashed_password=hashed_password)
         db.add(user)
         db.commit()
         db.refresh(user)
-        return user
\ No newline at end of file
+        return UserSnapshot(
+            id=user.id,
+            email=user.email,
+            hashed_password=user.hashed_password,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+def _email_filter(q: str, indexed: bool = True):
+    """Case-insensitive email match; ``indexed=False`` tests each row instead"""
+    if not indexed:
+        # No index applies to lower(email), so the planner keeps walking
+        # (created_at, id) and stops at LIMIT
+        email = func.lower(User.email)
+        if len(q) < MIN_SUBSTRING_SEARCH and engine.dialect.name == "sqlite":
+            return email.startswith(q.lower(), autoescape=True)
+        return email.contains(q.lower(), autoescape=True)
+    if engine.dialect.name == "postgresql":
+        # Served by the pg_trgm GIN index
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return User.email.ilike(f"%{escaped}%", escape="\\")
+    if engine.dialect.name == "sqlite" and len(q) >= MIN_SUBSTRING_SEARCH:
+        phrase = '"' + q.replace('"', '""') + '"'
+        return User.id.in_(
+            select(users_email_fts.c.rowid).where(users_email_fts.c.users_email_fts.op("MATCH")(phrase))
+        )
+    # Range scan on the NOCASE email index (migration 0008)
+    email = User.email.collate("NOCASE")
+    return (email >= q) & (email < q + "\U0010ffff")
+
+
+def email_matches_up_to(q: str, cap: int):
+    """Count of users matching ``q``, stopping at ``cap``"""
+    return select(func.count()).select_from(select(User.id).where(_email_filter(q)).limit(cap).subquery())
+
+
+def build_user_search(
+    q: str | None = None,
+    role_ids: list[int] | None = None,
+    active: bool | None = None,
+    after: tuple[datetime, int] | None = None,
+    limit: int = 50,
+    drive_by_role: bool = True,
+    drive_by_match: bool = True,
+):
+    """Newest-first user listing with keyset pagination on (created_at, id)"""
+    stmt = select(*USER_LIST_COLUMNS)
+    if q:
+        stmt = stmt.where(_email_filter(q, indexed=drive_by_match))
+    if role_ids is not None and drive_by_role:
+        stmt = stmt.where(User.id.in_(select(UserRole.user_id).where(UserRole.role_id.in_(role_ids))))
+    elif role_ids is not None:
+        stmt = stmt.where(exists().where(UserRole.user_id == User.id, UserRole.role_id.in_(role_ids)))
+    if active is not None:
+        stmt = stmt.where(User.is_active == active)
+    if after is not None:
+        stmt = stmt.where(tuple_(User.created_at, User.id) < tuple_(*after))
+    return stmt.order_by(User.created_at.desc(), User.id.desc()).limit(limit)
+
+
+def search_users(
+    q: str | None = None,
+    role_ids: list[int] | None = None,
+    active: bool | None = None,
+    after: tuple[datetime, int] | None = None,
+    limit: int = 50,
+) -> list:
+    """One page of (id, email, is_active, created_at) rows"""
+    with get_read_session() as db:
+        drive_by_role = drive_by_match = True
+        if role_ids:
+            members = db.scalar(ROLE_MEMBERS_UP_TO, {"role_ids": role_ids, "cap": ROLE_DRIVEN_MAX})
+            drive_by_role = members < ROLE_DRIVEN_MAX
+        if q:
+            drive_by_match = db.scalar(email_matches_up_to(q, MATCH_DRIVEN_MAX)) < MATCH_DRIVEN_MAX
+        return db.execute(build_user_search(q, role_ids, active, after, limit, drive_by_role, drive_by_match)).all()
+
+
+def get_role_ids_for_users(user_ids: list[int]) -> dict[int, list[int]]:
+    """Directly assigned role ids for several users in one query"""
+    if not user_ids:
+        return {}
+    result: dict[int, list[int]] = {user_id: [] for user_id in user_ids}
+    with get_read_session() as db:
+        for user_id, role_id in db.execute(ROLES_FOR_USERS, {"user_ids": user_ids}):
+            result[user_id].append(role_id)
+    return result
@@ -0,0 +1,210 @@
+"""Write-behind audit trail for auth activity.
+
+Handlers call ``audit_log.record(...)``, which only appends to an in-memory
+buffer; a background thread writes the buffer to ``audit_events`` in one
+transaction every ``AUDIT_FLUSH_INTERVAL_SECONDS``, or sooner once
+``AUDIT_BATCH_SIZE`` events are waiting. Logins therefore never wait on the
+database write lock for their audit row.
+
+The buffer holds at most ``AUDIT_BUFFER_SIZE`` events. If the database stays
+unavailable long enough to fill it, the oldest events are dropped and an
+``audit.dropped`` event with the count is written on the next successful
+flush, so the gap is visible in the trail itself.
+"""
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from ..config import settings
+from ..database import get_db_session, get_read_session
+from ..database.models import AuditEvent
+from ..logs import client_ip_var, request_id_var
+
+logger = logging.getLogger(__name__)
+
+LOGIN = "auth.login"
+LOGIN_FAILED = "auth.login_failed"
+REGISTER = "auth.register"
+OAUTH_LOGIN = "auth.oauth_login"
+OAUTH_LOGIN_FAILED = "auth.oauth_login_failed"
+PASSWORD_RESET_REQUESTED = "auth.password_reset_requested"
+PASSWORD_RESET = "auth.password_reset"
+PASSWORD_RESET_FAILED = "auth.password_reset_failed"
+REFRESH_TOKEN_REUSE = "auth.refresh_token_reuse"
+ROLE_GRANTED = "role.granted"
+ROLE_REVOKED = "role.revoked"
+DROPPED = "audit.dropped"
+
+AUDIT_COLUMNS = (
+    AuditEvent.id,
+    AuditEvent.occurred_at,
+    AuditEvent.event_type,
+    AuditEvent.user_id,
+    AuditEvent.actor_id,
+    AuditEvent.email,
+    AuditEvent.client_ip,
+    AuditEvent.request_id,
+    AuditEvent.details,
+)
+
+
+def _event(event_type: str, user_id, actor_id, email, details) -> dict:
+    # Every event has every key: the flush is one executemany
+    return {
+        "occurred_at": datetime.utcnow(),
+        "event_type": event_type,
+        "user_id": user_id,
+        "actor_id": actor_id,
+        "email": email,
+        "client_ip": client_ip_var.get(),
+        "request_id": request_id_var.get(),
+        "details": details or None,
+    }
+
+
+class AuditLog:
+    """Ring buffer of pending audit events and the thread that flushes it"""
+
+    def __init__(self, capacity: int, batch_size: int, flush_interval: float):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self._buffer: deque[dict] = deque()
+        self._unreported_drops = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def record(
+        self,
+        event_type: str,
+        *,
+        user_id: int | None = None,
+        actor_id: int | None = None,
+        email: str | None = None,
+        **details,
+    ) -> None:
+        """Queue an event; never blocks on the database"""
+        if not settings.audit_enabled:
+            return
+        event = _event(event_type, user_id, actor_id, email, details)
+        with self._lock:
+            self._append(event)
+            ready = len(self._buffer) >= self.batch_size
+        if ready:
+            self._wake.set()
+
+    def _append(self, event: dict) -> None:
+        if len(self._buffer) >= self.capacity:
+            self._buffer.popleft()
+            self.dropped += 1
+            self._unreported_drops += 1
+        self._buffer.append(event)
+
+    def flush(self) -> int:
+        """Write everything buffered in one transaction; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._buffer)
+                self._buffer.clear()
+                drops, self._unreported_drops = self._unreported_drops, 0
+            if drops:
+                batch.append(_event(DROPPED, None, None, None, {"count": drops}))
+            if not batch:
+                return 0
+
+            try:
+                with get_db_session() as db:
+                    db.execute(insert(AuditEvent), batch)
+                    db.commit()
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception("Audit flush failed; keeping events for the next attempt", extra={"events": len(batch)})
+                with self._lock:
+                    # Put the batch back in front of anything recorded meanwhile
+                    pending = list(self._buffer)
+                    self._buffer.clear()
+                    for event in batch + pending:
+                        self._append(event)
+                return 0
+
+            self.written += len(batch)
+            return len(batch)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the writer after a final flush"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+audit_log = AuditLog(
+    capacity=settings.audit_buffer_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+)
+
+
+def build_audit_search(
+    user_id: int | None = None,
+    event_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    before_id: int | None = None,
+    limit: int = 50,
+):
+    """Events newest first, keyset-paginated on id"""
+    stmt = select(*AUDIT_COLUMNS).order_by(AuditEvent.id.desc()).limit(limit)
+    if user_id is not None:
+        stmt = stmt.where(AuditEvent.user_id == user_id)
+    if event_type is not None:
+        stmt = stmt.where(AuditEvent.event_type == event_type)
+    if since is not None:
+        stmt = stmt.where(AuditEvent.occurred_at >= since)
+    if until is not None:
+        stmt = stmt.where(AuditEvent.occurred_at < until)
+    if before_id is not None:
+        stmt = stmt.where(AuditEvent.id < before_id)
+    return stmt
+
+
+def search_audit_events(**filters) -> list:
+    with get_read_session() as db:
+        return db.execute(build_audit_search(**filters)).all()
@@ -1,18 +1,131 @@
-import os
-import shutil
 import asyncio
+import fcntl
+import logging
+import os
+import sqlite3
+import subprocess
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from ..database.models import PasswordResetToken
-from ..database import get_db_session
+
+from sqlalchemy import bindparam, delete, func, select, update
+
 from ..config import settings
+from ..database import engine, get_db_session
+from ..database.models import PasswordResetToken, RefreshToken
+from .tracing import KIND_CLIENT, span, start_trace, traced
+
+logger = logging.getLogger(__name__)
+
+
+def _expired_batch(model, *where):
+    # SKIP LOCKED lets cleanup on several nodes split the rows instead of
+    # queueing behind each other (SQLite has no row locks and ignores it)
+    return (
+        select(model.id)
+        .where(model.expires_at < bindparam("now"), *where)
+        .limit(settings.db_cleanup_batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+
+EXPIRE_RESET_TOKENS = (
+    update(PasswordResetToken)
+    .where(PasswordResetToken.id.in_(_expired_batch(PasswordResetToken, PasswordResetToken.active == True)))
+    .values(active=False)
+    .execution_options(synchronize_session=False)
+)
+DELETE_EXPIRED_REFRESH_TOKENS = (
+    delete(RefreshToken)
+    .where(RefreshToken.id.in_(_expired_batch(RefreshToken)))
+    .execution_options(synchronize_session=False)
+)
+
+
+@contextmanager
+def job_lock(name: str):
+    """Yields whether this process may run the job ``name`` now.
+
+    On PostgreSQL this is a session advisory lock, so when several nodes run
+    the same loop only one of them does the work at a time. A SQLite
+    database belongs to one node, whose workers share a lock file next to it.
+    """
+    if engine.dialect.name != "postgresql":
+        db_path = engine.url.database
+        if not db_path or db_path == ":memory:":
+            yield True
+            return
+        with open(f"{db_path}.{name}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return
+    key = zlib.crc32(name.encode())
+    with engine.connect() as conn:
+        acquired = conn.scalar(select(func.pg_try_advisory_lock(key)))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.scalar(select(func.pg_advisory_unlock(key)))
+            conn.commit()
+
+
+def sqlite_backup(db_path: str, dest: str) -> None:
+    """Consistent copy of a live SQLite database, including WAL contents"""
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(dest)
+    try:
+        with target:
+            source.backup(target)
+    finally:
+        target.close()
+        source.close()
 
 
-def local_backup(db_path: str = "./data/service.db", backups_dir: str = "./data/backups") -> str:
-    """Create a local backup of the SQLite database"""
+def pg_dump_backup(dest: str) -> None:
+    """``pg_dump`` of the configured database in custom (compressed) format"""
+    url = engine.url
+    env = dict(os.environ)
+    if url.password:
+        # Keep the password out of the process list
+        env["PGPASSWORD"] = url.password
+    # libpq doesn't understand SQLAlchemy driver suffixes such as +psycopg
+    dsn = url.set(drivername="postgresql", password=None).render_as_string(hide_password=False)
+    with span("backup.pg_dump", KIND_CLIENT, **{"db.system": "postgresql"}):
+        subprocess.run(
+            ["pg_dump", "--format=custom", "--no-owner", "--no-acl", f"--file={dest}", f"--dbname={dsn}"],
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+
+
+BACKUPS_DIR = "./data/backups"
+BACKUP_INTERVAL = timedelta(days=1)
+
+
+@traced("backup.local")
+def local_backup(backups_dir: str = BACKUPS_DIR) -> str:
+    """Back up the configured database into ``backups_dir``; returns the file"""
     os.makedirs(backups_dir, exist_ok=True)
     ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    if engine.dialect.name == "postgresql":
+        dest = os.path.join(backups_dir, f"service-{ts}.dump")
+        pg_dump_backup(dest)
+        return dest
+    db_path = engine.url.database
+    if not db_path or db_path == ":memory:":
+        raise RuntimeError("In-memory SQLite databases can't be backed up")
     dest = os.path.join(backups_dir, f"service-{ts}.db")
-    shutil.copy2(db_path, dest)
+    sqlite_backup(db_path, dest)
     return dest
 
 
@@ -31,39 +144,84 @@ def upload_to_r2(filepath: str):
         )
         
         key = os.path.basename(filepath)
-        with open(filepath, "rb") as f:
-            s3.upload_fileobj(f, settings.r2_bucket, key)
-    except Exception as e:
-        print(f"R2 backup failed: {e}")
+        with span("backup.upload_r2", KIND_CLIENT, **{"r2.bucket": settings.r2_bucket, "r2.key": key}):
+            with open(filepath, "rb") as f:
+                s3.upload_fileobj(f, settings.r2_bucket, key)
+    except Exception:
+        logger.exception("R2 backup failed", extra={"path": filepath})
+
+
+def _last_backup_age(backups_dir: str = BACKUPS_DIR) -> timedelta | None:
+    try:
+        newest = max(
+            (entry.stat().st_mtime for entry in os.scandir(backups_dir) if entry.name.startswith("service-")),
+            default=None,
+        )
+    except FileNotFoundError:
+        return None
+    return datetime.now() - datetime.fromtimestamp(newest) if newest is not None else None
+
+
+def run_backup() -> None:
+    with job_lock("backup.daily") as acquired:
+        if not acquired:
+            logger.info("Backup already running in another worker or node; skipping")
+            return
+        # Every worker runs this loop; the first one in a day does the work
+        age = _last_backup_age()
+        if age is not None and age < BACKUP_INTERVAL * 0.9:
+            return
+        backup_path = local_backup()
+        logger.info("Created backup", extra={"path": backup_path})
+        upload_to_r2(backup_path)
 
 
 async def daily_backup_loop():
     """Run daily backups"""
     while True:
         try:
-            backup_path = local_backup()
-            print(f"Created backup: {backup_path}")
-            upload_to_r2(backup_path)
-        except Exception as e:
-            print(f"Backup failed: {e}")
+            # Daily, so always worth a trace
+            with start_trace("backup.daily", force_sample=True):
+                await asyncio.to_thread(run_backup)
+        except Exception:
+            logger.exception("Backup failed")
         
         await asyncio.sleep(60 * 60 * 24)  # 24 hours
 
 
+def _run_batches(statement, now: datetime) -> int:
+    """Apply ``statement`` one batch per transaction until it runs dry"""
+    total = 0
+    while True:
+        with get_db_session() as db:
+            count = db.execute(statement, {"now": now}).rowcount
+            db.commit()
+        total += count
+        if count < settings.db_cleanup_batch_size:
+            return total
+
+
+def delete_expired_tokens() -> tuple[int, int]:
+    """Deactivate expired reset tokens and delete expired refresh tokens"""
+    with job_lock("cleanup.expired_tokens") as acquired:
+        if not acquired:
+            return 0, 0
+        now = datetime.utcnow()
+        return _run_batches(EXPIRE_RESET_TOKENS, now), _run_batches(DELETE_EXPIRED_REFRESH_TOKENS, now)
+
+
 async def cleanup_expired_tokens():
-    """Clean up expired password reset tokens"""
+    """Clean up expired password reset and refresh tokens"""
     while True:
         try:
-            with get_db_session() as db:
-                expired = db.query(PasswordResetToken).filter(
-                    PasswordResetToken.expires_at < datetime.utcnow(),
-                    PasswordResetToken.active == True
-                )
-                count = expired.update({"active": False})
-                db.commit()
-                if count > 0:
-                    print(f"Cleaned up {count} expired tokens")
-        except Exception as e:
-            print(f"Token cleanup failed: {e}")
+            with start_trace("cleanup.expired_tokens"):
+                count, refresh_count = await asyncio.to_thread(delete_expired_tokens)
+                if count > 0 or refresh_count > 0:
+                    logger.info(
+                        "Cleaned up expired tokens",
+                        extra={"reset_tokens": count, "refresh_tokens": refresh_count},
+                    )
+        except Exception:
+            logger.exception("Token cleanup failed")
         
         await asyncio.sleep(3600)  # 1 hour
\ No newline at end of file
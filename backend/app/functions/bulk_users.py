@@ -0,0 +1,317 @@
+"""Bulk user export and import, shared by the admin endpoints and the CLI.
+
+Export streams users with their role names from a server-side cursor, so
+memory stays flat however many users there are. Import takes records in
+batches: passwords are hashed on a thread pool (bcrypt releases the GIL, so
+this uses every core), or pre-hashed bcrypt values are accepted as-is, and
+each batch is then checked and inserted in one short transaction. Rows that
+fail validation are reported by line number and skipped; the rest of the
+batch still goes in. If an email is registered concurrently, the insert is
+retried row by row so only that row is reported.
+"""
+import csv
+import io
+import json
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_db_session, get_read_session
+from ..database.models import User, UserRole
+from ..database.shared import ROLES_FOR_USERS, role_cache
+from ..middleware.auth import get_password_hash, get_pwd_context
+from .tracing import span
+
+EXPORT_FIELDS = ["id", "email", "is_active", "created_at", "roles"]
+MIN_PASSWORD_LENGTH = 8
+
+# One import at a time per worker: each already uses every core for hashing
+import_lock = threading.Lock()
+
+_email = TypeAdapter(EmailStr)
+_hash_pool: ThreadPoolExecutor | None = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        workers = settings.bulk_import_hash_workers or os.cpu_count() or 1
+        _hash_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-hash")
+    return _hash_pool
+
+
+# --- export -----------------------------------------------------------------
+
+def iter_export_rows(include_password_hashes: bool = False) -> Iterator[dict]:
+    """Every user as a dict, in id order, with direct role names"""
+    columns = [User.id, User.email, User.is_active, User.created_at]
+    if include_password_hashes:
+        columns.append(User.hashed_password)
+    stmt = select(*columns).order_by(User.id).execution_options(yield_per=settings.bulk_export_chunk_size)
+
+    with get_read_session() as db:
+        result = db.execute(stmt)
+        for rows in result.partitions():
+            roles = role_cache.get()
+            names: dict[int, list[str]] = {row.id: [] for row in rows}
+            for user_id, role_id in db.execute(ROLES_FOR_USERS, {"user_ids": list(names)}):
+                if role_id in roles:
+                    names[user_id].append(roles[role_id][0])
+            for row in rows:
+                item = {
+                    "id": row.id,
+                    "email": row.email,
+                    "is_active": row.is_active,
+                    "created_at": row.created_at.isoformat(),
+                    "roles": sorted(names[row.id]),
+                }
+                if include_password_hashes:
+                    item["hashed_password"] = row.hashed_password
+                yield item
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row) + "\n").encode()
+
+
+def iter_csv(rows: Iterable[dict], include_password_hashes: bool = False) -> Iterator[bytes]:
+    fields = EXPORT_FIELDS + (["hashed_password"] if include_password_hashes else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, "roles": ";".join(row["roles"])})
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# --- import -----------------------------------------------------------------
+
+@dataclass
+class ImportRecord:
+    line: int
+    data: dict
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def error(self, line: int, email: str | None, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.bulk_import_max_errors:
+            self.errors.append({"line": line, "email": email, "error": message})
+
+    def merge(self, other: "ImportResult") -> None:
+        self.created += other.created
+        for item in other.errors:
+            if len(self.errors) < settings.bulk_import_max_errors:
+                self.errors.append(item)
+        self.failed += other.failed
+
+
+def parse_ndjson_line(line: str) -> dict:
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    return data
+
+
+class CsvRecords:
+    """Turns CSV lines into dicts; the first line is the header"""
+
+    def __init__(self):
+        self.header: list[str] | None = None
+
+    def parse(self, line: str) -> dict | None:
+        values = next(csv.reader([line]))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self.header):
+            raise ValueError(f"expected {len(self.header)} columns, got {len(values)}")
+        # Empty cells mean "not given"
+        data = {name: value for name, value in zip(self.header, values) if value != ""}
+        if "roles" in data:
+            data["roles"] = [name for name in data["roles"].split(";") if name]
+        if "is_active" in data:
+            data["is_active"] = data["is_active"].strip().lower() not in ("false", "0", "no")
+        return data
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    raise ValueError("is_active must be a boolean")
+
+
+def _validate(record: ImportRecord, role_ids_by_name: dict[str, int]) -> dict:
+    """Normalized row, or ValueError with a message for the caller"""
+    data = record.data
+    try:
+        email = _email.validate_python(data.get("email"))
+    except ValidationError:
+        raise ValueError("invalid email")
+
+    password, hashed = data.get("password") or None, data.get("hashed_password") or None
+    if (password is None) == (hashed is None):
+        raise ValueError("give exactly one of password or hashed_password")
+    if password is not None and (not isinstance(password, str) or len(password) < MIN_PASSWORD_LENGTH):
+        raise ValueError(f"password must be at least {MIN_PASSWORD_LENGTH} characters")
+    if hashed is not None and (not isinstance(hashed, str) or get_pwd_context().identify(hashed) is None):
+        raise ValueError("hashed_password is not a supported hash")
+
+    role_names = data.get("roles") or []
+    if not isinstance(role_names, list):
+        raise ValueError("roles must be a list")
+    unknown = [name for name in role_names if name not in role_ids_by_name]
+    if unknown:
+        raise ValueError(f"unknown roles: {', '.join(map(str, unknown))}")
+
+    return {
+        "line": record.line,
+        "email": email,
+        "password": password,
+        "hashed_password": hashed,
+        "is_active": _parse_bool(data.get("is_active", True)),
+        "role_ids": sorted({role_ids_by_name[name] for name in role_names}),
+    }
+
+
+def import_batch(records: list[ImportRecord]) -> ImportResult:
+    """Validate and hash one batch, then check and insert it in a single short transaction"""
+    result = ImportResult()
+    role_ids_by_name = {name: role_id for role_id, (name, _) in role_cache.get().items()}
+
+    rows, seen = [], set()
+    for record in records:
+        try:
+            row = _validate(record, role_ids_by_name)
+        except ValueError as e:
+            result.error(record.line, record.data.get("email"), str(e))
+            continue
+        if row["email"] in seen:
+            result.error(record.line, row["email"], "duplicate email in this batch")
+            continue
+        seen.add(row["email"])
+        rows.append(row)
+    if not rows:
+        return result
+
+    # Hash before opening a transaction: bcrypt takes far longer than the
+    # insert, and an open transaction would pin a writer connection (and hold
+    # back rollup watermarks) all that time. Rows that turn out to be taken
+    # below were hashed for nothing, which is rare and harmless.
+    to_hash = [row for row in rows if row["password"] is not None]
+    with span("bulk_import.hash", rows=len(to_hash)):
+        for row, hashed in zip(to_hash, _pool().map(get_password_hash, [row["password"] for row in to_hash])):
+            row["hashed_password"] = hashed
+
+    with get_db_session() as db, span("bulk_import.insert", rows=len(rows)):
+        existing = set(db.scalars(select(User.email).where(User.email.in_([row["email"] for row in rows]))))
+        fresh = []
+        for row in rows:
+            if row["email"] in existing:
+                result.error(row["line"], row["email"], "email already registered")
+            else:
+                fresh.append(row)
+        if not fresh:
+            db.rollback()
+            return result
+
+        now = datetime.utcnow()
+        try:
+            _insert_users(db, fresh, now)
+            db.commit()
+        except IntegrityError:
+            # Someone registered one of these emails after the check above;
+            # retry one row per transaction so only the clashes are rejected
+            db.rollback()
+            fresh = _insert_one_by_one(db, fresh, now, result)
+        result.created += len(fresh)
+    return result
+
+
+def _insert_users(db: Session, rows: list[dict], now: datetime) -> None:
+    inserted = db.execute(
+        insert(User).returning(User.id, User.email),
+        [
+            {
+                "email": row["email"],
+                "hashed_password": row["hashed_password"],
+                "is_active": row["is_active"],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in rows
+        ],
+    ).all()
+    ids = {email: user_id for user_id, email in inserted}
+    links = [
+        {"user_id": ids[row["email"]], "role_id": role_id, "created_at": now}
+        for row in rows
+        for role_id in row["role_ids"]
+    ]
+    if links:
+        db.execute(insert(UserRole), links)
+
+
+def _insert_one_by_one(db: Session, rows: list[dict], now: datetime, result: ImportResult) -> list[dict]:
+    """Insert rows separately, reporting the ones that fail; returns those inserted"""
+    inserted = []
+    for row in rows:
+        try:
+            _insert_users(db, [row], now)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            taken = db.scalar(select(User.id).where(User.email == row["email"])) is not None
+            result.error(row["line"], row["email"], "email already registered" if taken else "could not be inserted")
+            continue
+        inserted.append(row)
+    return inserted
+
+
+def import_lines(lines: Iterable[str], fmt: str) -> ImportResult:
+    """Import from an iterable of text lines (the CLI path)"""
+    total = ImportResult()
+    parser = CsvRecords() if fmt == "csv" else None
+    batch: list[ImportRecord] = []
+    for number, line in enumerate(lines, start=1):
+        record = parse_record(parser, number, line, total)
+        if record is not None:
+            batch.append(record)
+        if len(batch) >= settings.bulk_import_batch_size:
+            total.merge(import_batch(batch))
+            batch = []
+    if batch:
+        total.merge(import_batch(batch))
+    return total
+
+
+def parse_record(parser: CsvRecords | None, number: int, line: str, result: ImportResult) -> ImportRecord | None:
+    """Parse one input line; errors are recorded on ``result``"""
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return None
+    try:
+        data = parser.parse(line) if parser is not None else parse_ndjson_line(line)
+    except (ValueError, csv.Error) as e:
+        result.error(number, None, f"unparseable line: {e}")
+        return None
+    return ImportRecord(number, data) if data is not None else None
@@ -0,0 +1,138 @@
+"""Content codings for response compression.
+
+gzip is always available. brotli and zstd are used when the ``brotli`` and
+``zstandard`` packages are installed. This module is shared by the
+compression middleware, the static precompression script and the
+compression benchmark.
+"""
+import zlib
+
+from ..config import settings
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+class GzipStream:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliStream:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdStream:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class Codec:
+    """One content coding at one level"""
+
+    def __init__(self, name: str, stream_cls, level: int):
+        self.name = name
+        self.level = level
+        self._stream_cls = stream_cls
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name}, {self.level})"
+
+    def stream(self):
+        return self._stream_cls(self.level)
+
+    def compress(self, data: bytes) -> bytes:
+        stream = self.stream()
+        return stream.compress(data) + stream.finish()
+
+
+# Precompressed static variants use these suffixes
+SUFFIXES = {"br": ".br", "zstd": ".zst", "gzip": ".gz"}
+
+
+def installed_encodings() -> list[str]:
+    return [name for name, module in (("br", brotli), ("zstd", zstandard), ("gzip", zlib)) if module is not None]
+
+
+def make_codec(name: str, level: int | None = None) -> Codec:
+    """A codec for ``name`` at ``level`` (or the configured level)"""
+    if name == "gzip":
+        return Codec(name, GzipStream, settings.compression_gzip_level if level is None else level)
+    if name == "br" and brotli is not None:
+        return Codec(name, BrotliStream, settings.compression_brotli_quality if level is None else level)
+    if name == "zstd" and zstandard is not None:
+        return Codec(name, ZstdStream, settings.compression_zstd_level if level is None else level)
+    raise ValueError(f"Unsupported or unavailable encoding: {name}")
+
+
+def configured_codecs() -> list[Codec]:
+    """COMPRESSION_ENCODINGS in preference order, minus the ones not installed"""
+    available = set(installed_encodings())
+    return [make_codec(name) for name in settings.compression_encodings if name in available]
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate(header: str | None, names: list[str]) -> str | None:
+    """The client's highest-q encoding among ``names``; ties go to the earlier name"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for name in names:
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
@@ -0,0 +1,271 @@
+"""Online data migrations: backfills that run in the background, in batches.
+
+Alembic migrations run before the app starts, so they should only change
+the schema. Work that grows with table size is registered here instead, for
+example backfilling a new column or rewriting values. It runs after
+startup, one keyset batch per transaction:
+
+    @data_migration("users.backfill_locale", count=lambda db: db.scalar(COUNT_USERS))
+    def backfill_locale(db, after: int, limit: int) -> tuple[int, int]:
+        '''Default locale for existing users'''
+        ids = db.scalars(select(User.id).where(User.id > after).order_by(User.id).limit(limit)).all()
+        if ids:
+            db.execute(update(User).where(User.id.in_(ids)).values(locale="en"))
+        return len(ids), ids[-1] if ids else after
+
+A batch function returns (rows processed, last key). Returning 0 rows
+marks the migration finished. Each batch commits in the same transaction
+as its checkpoint in ``data_migrations``, so a restart resumes where it
+stopped. Before running a batch, the runner claims it with a
+compare-and-set on the checkpoint, the same way rollups advance their
+watermarks. The claim is an UPDATE, so it takes the write lock on SQLite
+and the row lock on PostgreSQL. A runner that loses the claim rolls back
+and skips its turn, so every worker and node can run the loop and no
+batch is applied twice.
+
+After each batch the runner sleeps in proportion to the time the batch
+took (DATA_MIGRATION_DUTY_CYCLE), so live traffic always gets most of the
+database. Code that needs the migrated data calls ``is_complete(name)``
+or depends on ``require_data_migration(name)``.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_db_session, get_read_session
+from ..database.models import DataMigrationState
+from .tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DataMigration:
+    name: str
+    batch: Callable[[Session, int, int], tuple[int, int]]
+    count: Callable[[Session], int] | None = None
+    description: str = ""
+
+
+MIGRATIONS: dict[str, DataMigration] = {}
+
+
+def data_migration(name: str, count: Callable[[Session], int] | None = None):
+    """Register ``fn(db, after, limit) -> (rows, last_key)`` as an online data migration"""
+    def register(fn):
+        if name in MIGRATIONS:
+            raise ValueError(f"Duplicate data migration {name!r}")
+        description = fn.__doc__.strip().splitlines()[0] if fn.__doc__ else ""
+        MIGRATIONS[name] = DataMigration(name, fn, count, description)
+        return fn
+    return register
+
+
+STATE_FOR_UPDATE = (
+    select(DataMigrationState).where(DataMigrationState.name == bindparam("name")).with_for_update()
+)
+# Claiming first matters on SQLite: it ignores FOR UPDATE, and the UPDATE is
+# what takes the write lock before the batch reads anything
+CLAIM_BATCH = (
+    update(DataMigrationState)
+    .where(
+        DataMigrationState.name == bindparam("claim_name"),
+        DataMigrationState.last_key == bindparam("claim_last_key"),
+        DataMigrationState.finished_at.is_(None),
+    )
+    .values(updated_at=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
+FINISHED_AT = select(DataMigrationState.finished_at).where(DataMigrationState.name == bindparam("name"))
+ALL_STATES = select(DataMigrationState)
+
+
+def ensure_state_rows() -> None:
+    """Create checkpoint rows for newly registered migrations"""
+    if not MIGRATIONS:
+        return
+    with get_db_session() as db:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        db.execute(
+            dialect.insert(DataMigrationState).on_conflict_do_nothing(index_elements=[DataMigrationState.name]),
+            [{"name": name, "last_key": 0, "processed": 0} for name in MIGRATIONS],
+        )
+        db.commit()
+
+
+def run_batch(migration: DataMigration, batch_size: int) -> int | None:
+    """Apply the next batch and advance the checkpoint.
+
+    Returns rows processed, 0 once finished, or None when another runner
+    claimed this batch first.
+    """
+    with get_db_session() as db:
+        # On PostgreSQL a second node waits here and then continues from the
+        # new checkpoint
+        state = db.scalars(STATE_FOR_UPDATE, {"name": migration.name}).first()
+        if state is None or state.finished_at is not None:
+            return 0
+        now = datetime.utcnow()
+        claim = {"claim_name": migration.name, "claim_last_key": state.last_key, "now": now}
+        if not db.execute(CLAIM_BATCH, claim).rowcount:
+            db.rollback()
+            return None
+        if state.started_at is None:
+            state.started_at = now
+            if migration.count is not None:
+                state.total = migration.count(db)
+
+        rows, last_key = migration.batch(db, state.last_key, batch_size)
+        state.last_key = last_key
+        state.processed += rows
+        state.updated_at = datetime.utcnow()
+        state.error = None
+        if not rows:
+            state.finished_at = state.updated_at
+        db.commit()
+        return rows
+
+
+def record_error(name: str, error: Exception) -> None:
+    with get_db_session() as db:
+        db.execute(
+            update(DataMigrationState)
+            .where(DataMigrationState.name == name)
+            .values(error=(str(error) or type(error).__name__)[:500], updated_at=datetime.utcnow())
+        )
+        db.commit()
+
+
+def throttle_delay(elapsed: float) -> float:
+    """Pause after a batch that took ``elapsed`` seconds to stay within the duty cycle"""
+    duty = min(max(settings.data_migration_duty_cycle, 0.01), 1.0)
+    return max(settings.data_migration_min_pause_seconds, elapsed * (1 - duty) / duty)
+
+
+def run_to_completion(migration: DataMigration, batch_size: int, throttle: bool = True) -> int:
+    """Run ``migration`` in the calling thread until it finishes; returns rows processed"""
+    total = 0
+    while True:
+        start = time.perf_counter()
+        rows = run_batch(migration, batch_size)
+        if rows == 0:
+            return total
+        total += rows or 0
+        if throttle or rows is None:
+            time.sleep(throttle_delay(time.perf_counter() - start))
+
+
+async def data_migration_loop():
+    """Work through unfinished migrations, one throttled batch at a time"""
+    if not MIGRATIONS:
+        return
+    await asyncio.to_thread(ensure_state_rows)
+    remaining = list(MIGRATIONS.values())
+    while remaining:
+        for migration in list(remaining):
+            start = time.perf_counter()
+            try:
+                with start_trace("data_migration.batch", **{"data_migration.name": migration.name}):
+                    rows = await asyncio.to_thread(run_batch, migration, settings.data_migration_batch_size)
+            except Exception as e:
+                logger.exception("Data migration batch failed", extra={"migration": migration.name})
+                await asyncio.to_thread(record_error, migration.name, e)
+                await asyncio.sleep(settings.data_migration_retry_seconds)
+                continue
+            if rows == 0:
+                remaining.remove(migration)
+                logger.info("Data migration finished", extra={"migration": migration.name})
+                continue
+            await asyncio.sleep(throttle_delay(time.perf_counter() - start))
+
+
+def progress() -> list[dict]:
+    """Checkpoint, throughput and ETA for every registered migration"""
+    with get_read_session() as db:
+        states = {state.name: state for state in db.scalars(ALL_STATES)}
+    result = []
+    for name, migration in MIGRATIONS.items():
+        state = states.get(name)
+        item = {
+            "name": name,
+            "description": migration.description,
+            "status": "pending",
+            "processed": 0,
+            "total": None,
+            "percent": None,
+            "rows_per_second": None,
+            "eta_seconds": None,
+            "last_key": 0,
+            "error": None,
+            "started_at": None,
+            "finished_at": None,
+        }
+        if state is not None:
+            item.update(
+                processed=state.processed,
+                total=state.total,
+                last_key=state.last_key,
+                error=state.error,
+                started_at=state.started_at.isoformat() if state.started_at else None,
+                finished_at=state.finished_at.isoformat() if state.finished_at else None,
+            )
+            if state.finished_at is not None:
+                item["status"] = "done"
+            elif state.started_at is not None:
+                item["status"] = "failing" if state.error else "running"
+            if state.total:
+                item["percent"] = round(min(100.0, 100.0 * state.processed / state.total), 1)
+            if state.started_at and state.updated_at and state.updated_at > state.started_at:
+                rate = state.processed / (state.updated_at - state.started_at).total_seconds()
+                item["rows_per_second"] = round(rate, 1)
+                if state.total and rate > 0 and state.finished_at is None:
+                    item["eta_seconds"] = round(max(state.total - state.processed, 0) / rate)
+        result.append(item)
+    return result
+
+
+# Finished migrations never un-finish, so positive answers are kept for good;
+# negative ones are re-read at most every DATA_MIGRATION_GATE_TTL_SECONDS
+_completed: set[str] = set()
+_checked_at: dict[str, float] = {}
+
+
+def is_complete(name: str) -> bool:
+    """Whether the data migration ``name`` has finished (on any node)"""
+    if name in _completed:
+        return True
+    checked_at = _checked_at.get(name)
+    if checked_at is not None and time.monotonic() - checked_at < settings.data_migration_gate_ttl_seconds:
+        return False
+    with get_read_session() as db:
+        finished = db.scalar(FINISHED_AT, {"name": name}) is not None
+    if finished:
+        _completed.add(name)
+    else:
+        _checked_at[name] = time.monotonic()
+    return finished
+
+
+def require_data_migration(name: str):
+    """Dependency that answers 503 until the data migration ``name`` has finished"""
+    def check() -> None:
+        if not is_complete(name):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Temporarily unavailable: data migration {name} is still running",
+                headers={"Retry-After": str(int(settings.data_migration_gate_ttl_seconds) or 1)},
+            )
+    return check
+
+
+# Register data migrations below. Keep each one until every deployment has
+# finished it; its name is its checkpoint key.
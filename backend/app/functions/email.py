@@ -1,14 +1,7 @@
 import os
-from typing import Optional
-
-try:
-    import boto3
-    from botocore.exceptions import ClientError
-except Exception:  # pragma: no cover - boto3 may not be installed in all envs
-    boto3 = None
-    ClientError = Exception
 
 from ..config import settings
+from .tracing import KIND_CLIENT, span
 
 
 class EmailService:
@@ -16,13 +9,22 @@ class EmailService:
         self.from_email = settings.ses_from_email or os.getenv('SES_FROM_EMAIL') or ''
         self._enabled = bool(self.from_email and (settings.aws_access_key_id and settings.aws_secret_access_key))
         self._client = None
-        if self._enabled and boto3 is not None:
+
+    @property
+    def client(self):
+        """SES client, created on first send so boto3 stays out of app startup"""
+        if self._client is None and self._enabled:
+            try:
+                import boto3
+            except Exception:  # pragma: no cover - boto3 may not be installed in all envs
+                return None
             self._client = boto3.client(
                 'ses',
                 aws_access_key_id=settings.aws_access_key_id,
                 aws_secret_access_key=settings.aws_secret_access_key,
                 region_name=settings.aws_default_region or 'us-east-1',
             )
+        return self._client
 
     def _build_reset_html(self, reset_url: str) -> str:
         return f"""
@@ -38,18 +40,22 @@ class EmailService:
         html_body = self._build_reset_html(reset_url)
 
         # In non-configured environments, succeed to avoid blocking dev
-        if not self._enabled or self._client is None:
+        client = self.client
+        if not self._enabled or client is None:
             return True
 
+        from botocore.exceptions import ClientError
+
         try:
-            self._client.send_email(
-                Source=self.from_email,
-                Destination={'ToAddresses': [to_email]},
-                Message={
-                    'Subject': {'Data': subject},
-                    'Body': {'Html': {'Data': html_body}},
-                },
-            )
+            with span('email.send', KIND_CLIENT, **{'email.provider': 'ses', 'email.template': 'password_reset'}):
+                client.send_email(
+                    Source=self.from_email,
+                    Destination={'ToAddresses': [to_email]},
+                    Message={
+                        'Subject': {'Data': subject},
+                        'Body': {'Html': {'Data': html_body}},
+                    },
+                )
             return True
         except ClientError as e:  # pragma: no cover
             return False
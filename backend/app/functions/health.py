@@ -0,0 +1,66 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..database import get_db_session, get_read_session
+
+
+@dataclass
+class HealthState:
+    """Readiness as last observed by the background prober"""
+
+    warmed_up: bool = False
+    database_ok: bool = False
+    shutting_down: bool = False
+    error: str | None = None
+    checked_at: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and self.database_ok and not self.shutting_down
+
+    def as_dict(self) -> dict:
+        status = {"status": "ready" if self.ready else "not ready"}
+        if not self.warmed_up:
+            status["error"] = "warming up"
+        elif self.shutting_down:
+            status["error"] = "shutting down"
+        elif self.error:
+            status["error"] = self.error
+        return status
+
+
+health = HealthState()
+
+
+def probe_database() -> None:
+    """Round-trip a trivial query through the writer and a reader pool"""
+    with get_db_session() as db:
+        db.execute(text("SELECT 1"))
+    with get_read_session() as db:
+        db.execute(text("SELECT 1"))
+
+
+async def run_health_probe() -> None:
+    """Probe dependencies once and record the result in ``health``"""
+    try:
+        await asyncio.wait_for(
+            asyncio.to_thread(probe_database),
+            timeout=settings.health_probe_timeout_seconds,
+        )
+        health.database_ok = True
+        health.error = None
+    except Exception as e:
+        health.database_ok = False
+        health.error = str(e) or type(e).__name__
+    health.checked_at = time.time()
+
+
+async def health_probe_loop():
+    """Keep the cached health state current so /readyz never touches the database"""
+    while True:
+        await run_health_probe()
+        await asyncio.sleep(settings.health_probe_interval_seconds)
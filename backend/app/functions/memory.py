@@ -0,0 +1,180 @@
+import asyncio
+import gc
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Allocations made by the diagnostics themselves
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class AllocationSnapshot:
+    taken_at: float
+    traced_bytes: int
+    snapshot: tracemalloc.Snapshot = field(repr=False)
+
+
+class MemoryMonitor:
+    """RSS history and periodic tracemalloc snapshots for this worker.
+
+    Keeps the first snapshot as a baseline plus the most recent few, so
+    growth can be diffed both since start-up and since the previous interval.
+    """
+
+    def __init__(self, history: int, keep_snapshots: int):
+        self.rss_history: deque[tuple[float, int | None]] = deque(maxlen=history)
+        self.baseline: AllocationSnapshot | None = None
+        self.snapshots: deque[AllocationSnapshot] = deque(maxlen=keep_snapshots)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.memory_tracemalloc_frames)
+
+    def record_rss(self) -> None:
+        self.rss_history.append((time.time(), rss_bytes()))
+
+    def take_snapshot(self) -> AllocationSnapshot | None:
+        """Snapshot traced allocations; None when tracemalloc is off"""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        taken = AllocationSnapshot(time.time(), tracemalloc.get_traced_memory()[0], snapshot)
+        with self._lock:
+            if self.baseline is None:
+                self.baseline = taken
+            self.snapshots.append(taken)
+        return taken
+
+    def summary(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        history = list(self.rss_history)
+        growth = None
+        if len(history) >= 2 and history[0][1] and history[-1][1]:
+            hours = (history[-1][0] - history[0][0]) / 3600
+            if hours > 0:
+                growth = (history[-1][1] - history[0][1]) / hours
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "rss_bytes": rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "rss_growth_bytes_per_hour": round(growth) if growth is not None else None,
+            "rss_history": [{"at": at, "rss_bytes": rss} for at, rss in history],
+            "gc": {
+                "counts": list(gc.get_count()),
+                "thresholds": list(gc.get_threshold()),
+                "generations": gc.get_stats(),
+                "garbage": len(gc.garbage),
+            },
+            "tracemalloc": {
+                "enabled": tracemalloc.is_tracing(),
+                "traced_bytes": current,
+                "peak_traced_bytes": peak,
+                "snapshots": len(self.snapshots),
+            },
+        }
+
+    def top_allocations(self, limit: int, group_by: str = "lineno") -> dict:
+        """Largest allocation sites in the latest snapshot, and what grew since
+        the previous snapshot and since the baseline"""
+        with self._lock:
+            snapshots = list(self.snapshots)
+            baseline = self.baseline
+        if not snapshots:
+            return {"enabled": tracemalloc.is_tracing(), "snapshots": 0}
+
+        latest = snapshots[-1]
+        result = {
+            "enabled": tracemalloc.is_tracing(),
+            "snapshots": len(snapshots),
+            "taken_at": latest.taken_at,
+            "traced_bytes": latest.traced_bytes,
+            "top": [_stat(stat) for stat in latest.snapshot.statistics(group_by)[:limit]],
+        }
+        if len(snapshots) >= 2:
+            previous = snapshots[-2]
+            result["since_previous"] = {
+                "from": previous.taken_at,
+                "diff": [_diff(stat) for stat in latest.snapshot.compare_to(previous.snapshot, group_by)[:limit]],
+            }
+        if baseline is not None and baseline is not latest:
+            result["since_baseline"] = {
+                "from": baseline.taken_at,
+                "diff": [_diff(stat) for stat in latest.snapshot.compare_to(baseline.snapshot, group_by)[:limit]],
+            }
+        return result
+
+
+def _where(traceback: tracemalloc.Traceback) -> list[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def _stat(stat: tracemalloc.Statistic) -> dict:
+    return {"where": _where(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+
+
+def _diff(stat: tracemalloc.StatisticDiff) -> dict:
+    return {
+        "where": _where(stat.traceback),
+        "size_bytes": stat.size,
+        "size_diff_bytes": stat.size_diff,
+        "count": stat.count,
+        "count_diff": stat.count_diff,
+    }
+
+
+memory_monitor = MemoryMonitor(
+    history=settings.memory_history_size,
+    keep_snapshots=settings.memory_keep_snapshots,
+)
+
+
+async def memory_snapshot_loop():
+    """Record RSS and, if enabled, an allocation snapshot every interval"""
+    if settings.memory_tracemalloc_enabled:
+        memory_monitor.start_tracing()
+    while True:
+        try:
+            memory_monitor.record_rss()
+            # Snapshotting walks every traced block; keep it off the loop
+            await asyncio.to_thread(memory_monitor.take_snapshot)
+        except Exception:
+            logger.exception("Memory snapshot failed")
+        await asyncio.sleep(settings.memory_snapshot_interval_seconds)
@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import logging
+import time
+
+from ..config import settings
+from ..database.shared import metrics_cache
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsBroadcaster:
+    """Compute dashboard metrics once per tick and fan them out to subscribers.
+
+    Each subscriber gets a queue of size one that always holds the latest
+    value: a slow consumer skips intermediate ticks instead of buffering them
+    or holding up the others. The ticker only runs while someone listens.
+    """
+
+    def __init__(self, interval: float, max_subscribers: int):
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.latest: dict | None = None
+        self.latest_at = 0.0
+        self.skipped = 0
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def has_capacity(self) -> bool:
+        return not self.closed and len(self._subscribers) < self.max_subscribers
+
+    def subscribe(self) -> asyncio.Queue | None:
+        """A queue that receives every tick's metrics; None when at capacity"""
+        if not self.has_capacity():
+            return None
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        if self.latest is not None and time.monotonic() - self.latest_at < self.interval:
+            queue.put_nowait(self.latest)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            # A fresh context: the ticker outlives the subscriber's request, so
+            # it must not inherit its request id, trace span or DB session
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def _publish(self, value) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                # Latest wins for consumers that haven't read the last tick
+                queue.get_nowait()
+                self.skipped += 1
+            queue.put_nowait(value)
+
+    async def _run(self) -> None:
+        while self._subscribers and not self.closed:
+            try:
+                # Also primes the cache behind /api/dashboard/onload
+                _, self.latest = await asyncio.to_thread(metrics_cache.refresh)
+                self.latest_at = time.monotonic()
+                self._publish(self.latest)
+            except Exception:
+                logger.exception("Dashboard metrics tick failed")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """Stop ticking and end every open stream (None tells a stream to finish)"""
+        self.closed = True
+        self._publish(None)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+metrics_broadcaster = MetricsBroadcaster(
+    interval=settings.dashboard_stream_interval_seconds,
+    max_subscribers=settings.dashboard_stream_max_clients,
+)
@@ -0,0 +1,123 @@
+"""bcrypt cost calibration and background rehashing of outdated hashes.
+
+At startup the bcrypt cost is chosen so that one hash takes about
+PASSWORD_HASH_TARGET_MS on this machine. It is never lower than
+PASSWORD_BCRYPT_MIN_ROUNDS, so slow hardware doesn't weaken hashes. Each
+extra round doubles the work, so the cost is timed once at a cheap probe
+level and extrapolated.
+
+A successful login with a hash below the current cost schedules a rehash.
+It runs on a single background thread, so neither the login response nor
+the request workers pay for the new hash. The update only applies if the
+stored hash is still the one that was verified, so a password reset that
+happens meanwhile is never overwritten.
+"""
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, update
+
+from ..config import settings
+from ..database import get_db_session
+from ..database.models import User
+from ..middleware.auth import (
+    get_password_hash,
+    password_needs_rehash,
+    set_bcrypt_rounds,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cheap enough to time a few samples quickly, expensive enough to measure
+PROBE_ROUNDS = 8
+PROBE_SAMPLES = 5
+
+REHASH_PASSWORD = (
+    update(User)
+    .where(User.id == bindparam("user_id"), User.hashed_password == bindparam("old_hash"))
+    # The profile didn't change, so keep updated_at (and the /auth/me ETag)
+    .values(hashed_password=bindparam("new_hash"), updated_at=User.updated_at)
+    .execution_options(synchronize_session=False)
+)
+
+
+def calibrate_bcrypt_rounds(target_seconds: float, min_rounds: int, max_rounds: int) -> tuple[int, float]:
+    """(rounds, estimated seconds per hash) for the highest cost within ``target_seconds``"""
+    from passlib.hash import bcrypt
+
+    handler = bcrypt.using(rounds=PROBE_ROUNDS)
+    handler.hash("calibration")  # loads the backend
+    samples = []
+    for _ in range(PROBE_SAMPLES):
+        start = time.perf_counter()
+        handler.hash("calibration")
+        samples.append(time.perf_counter() - start)
+    per_round = statistics.median(samples) / 2 ** PROBE_ROUNDS
+
+    rounds = min_rounds
+    while rounds < max_rounds and per_round * 2 ** (rounds + 1) <= target_seconds:
+        rounds += 1
+    return rounds, per_round * 2 ** rounds
+
+
+def configure_password_hashing() -> int:
+    """Apply PASSWORD_BCRYPT_ROUNDS, or calibrate when it is 0; returns the rounds in use"""
+    if settings.password_bcrypt_rounds:
+        rounds = settings.password_bcrypt_rounds
+        set_bcrypt_rounds(rounds)
+        logger.info("Password hashing configured", extra={"bcrypt_rounds": rounds})
+        return rounds
+
+    rounds, seconds = calibrate_bcrypt_rounds(
+        settings.password_hash_target_ms / 1000,
+        settings.password_bcrypt_min_rounds,
+        settings.password_bcrypt_max_rounds,
+    )
+    set_bcrypt_rounds(rounds)
+    logger.info(
+        "Password hashing calibrated",
+        extra={
+            "bcrypt_rounds": rounds,
+            "estimated_ms": round(seconds * 1000, 1),
+            "target_ms": settings.password_hash_target_ms,
+        },
+    )
+    return rounds
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-rehash")
+_pending: set[int] = set()
+_pending_lock = threading.Lock()
+
+
+def _rehash(user_id: int, password: str, old_hash: str) -> None:
+    try:
+        new_hash = get_password_hash(password)
+        with get_db_session() as db:
+            updated = db.execute(
+                REHASH_PASSWORD, {"user_id": user_id, "old_hash": old_hash, "new_hash": new_hash}
+            ).rowcount
+            db.commit()
+        if updated:
+            logger.debug("Upgraded password hash", extra={"user_id": user_id})
+    except Exception:
+        logger.exception("Password rehash failed", extra={"user_id": user_id})
+    finally:
+        with _pending_lock:
+            _pending.discard(user_id)
+
+
+def rehash_after_login(user_id: int, password: str, hashed_password: str) -> bool:
+    """Queue a rehash if ``hashed_password`` is outdated; returns whether one was queued"""
+    if not settings.password_rehash_on_login or not password_needs_rehash(hashed_password):
+        return False
+    with _pending_lock:
+        # Skipped users are simply upgraded on a later login
+        if user_id in _pending or len(_pending) >= settings.password_rehash_max_pending:
+            return False
+        _pending.add(user_id)
+    _executor.submit(_rehash, user_id, password, hashed_password)
+    return True
@@ -0,0 +1,210 @@
+"""On-demand statistical profiling of single requests.
+
+A profile is taken only when a request asks for it; otherwise nothing here
+runs. The built-in sampler walks ``sys._current_frames()`` from a background
+thread, so it sees both the event loop and threadpool workers running sync
+handlers (and, on the loop thread, any other request running concurrently).
+If pyinstrument is installed it is used instead, since it attributes time to
+the request's own task. Profiles are saved as speedscope JSON
+(https://www.speedscope.app) in ``PROFILING_DIR`` so any worker can serve
+them.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+
+from ..config import settings
+
+# Leaf frames of threads that are blocked waiting, not doing work
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("handlers.py", "dequeue"),
+}
+
+_PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads every ``interval`` seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._frames: list[dict] = []
+        self._frame_index: dict[tuple, int] = {}
+        # thread id -> (samples, weights)
+        self._samples: dict[int, tuple[list, list]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.end_time = time.perf_counter()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self._record(thread_id, frame, weight)
+
+    def _record(self, thread_id: int, frame, weight: float) -> None:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self._frames)
+                self._frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        samples, weights = self._samples.setdefault(thread_id, ([], []))
+        samples.append(stack)
+        weights.append(weight)
+
+    def speedscope(self, name: str) -> dict:
+        """The recorded samples as a speedscope file, one profile per thread"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        duration = self.end_time - self.start_time
+        profiles = [
+            {
+                "type": "sampled",
+                "name": names.get(thread_id, f"thread {thread_id}"),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": samples,
+                "weights": weights,
+            }
+            for thread_id, (samples, weights) in sorted(
+                self._samples.items(), key=lambda item: -sum(item[1][1])
+            )
+        ]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self._frames},
+            "profiles": profiles,
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "app.functions.profiling",
+        }
+
+
+class PyinstrumentProfiler:
+    """pyinstrument in async mode, limited to the profiled request's task"""
+
+    def __init__(self, interval: float):
+        from pyinstrument import Profiler
+
+        self._profiler = Profiler(interval=interval, async_mode="enabled")
+
+    def start(self) -> None:
+        self._profiler.start()
+
+    def stop(self) -> None:
+        self._profiler.stop()
+
+    def speedscope(self, name: str) -> dict:
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        profile = json.loads(self._profiler.output(SpeedscopeRenderer()))
+        profile["name"] = name
+        return profile
+
+
+def create_profiler():
+    """The configured profiler; falls back to the built-in sampler"""
+    interval = settings.profiling_interval_ms / 1000
+    if settings.profiling_engine in ("auto", "pyinstrument"):
+        try:
+            return PyinstrumentProfiler(interval)
+        except ImportError:
+            if settings.profiling_engine == "pyinstrument":
+                raise
+    return SamplingProfiler(interval)
+
+
+# One profile at a time per worker: a sampler on an already sampled process
+# would only measure itself.
+profiling_lock = threading.Lock()
+
+
+def save_profile(profile_id: str, profile: dict, meta: dict) -> None:
+    """Write a profile and its metadata, keeping the newest PROFILING_MAX_PROFILES"""
+    os.makedirs(settings.profiling_dir, exist_ok=True)
+    base = os.path.join(settings.profiling_dir, profile_id)
+    with open(base + ".speedscope.json", "w", encoding="utf-8") as f:
+        json.dump(profile, f, separators=(",", ":"))
+    with open(base + ".meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    for stale in list_profiles()[settings.profiling_max_profiles:]:
+        delete_profile(stale["id"])
+
+
+def list_profiles() -> list[dict]:
+    """Metadata for stored profiles, newest first"""
+    if not os.path.isdir(settings.profiling_dir):
+        return []
+    profiles = []
+    for entry in os.scandir(settings.profiling_dir):
+        if entry.name.endswith(".meta.json"):
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda meta: meta["created_at"], reverse=True)
+
+
+def profile_path(profile_id: str) -> str | None:
+    """Path of a stored speedscope file, or None"""
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(settings.profiling_dir, profile_id + ".speedscope.json")
+    return path if os.path.isfile(path) else None
+
+
+def delete_profile(profile_id: str) -> None:
+    for suffix in (".speedscope.json", ".meta.json"):
+        try:
+            os.remove(os.path.join(settings.profiling_dir, profile_id + suffix))
+        except FileNotFoundError:
+            pass
+
+
+def profile_meta(profile_id: str, method: str, path: str, status: int, duration: float,
+                 trigger: str, engine: str, request_id: str | None) -> dict:
+    return {
+        "id": profile_id,
+        "created_at": datetime.now(UTC).isoformat(),
+        "method": method,
+        "path": path,
+        "status": status,
+        "duration_ms": round(duration * 1000, 2),
+        "trigger": trigger,
+        "engine": engine,
+        "request_id": request_id,
+        "pid": os.getpid(),
+    }
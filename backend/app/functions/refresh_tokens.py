@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, select, update
+
+from ..config import settings
+from ..database import get_db_session
+from ..database.models import RefreshToken
+from .audit import REFRESH_TOKEN_REUSE, audit_log
+
+logger = logging.getLogger(__name__)
+
+# Revocations are committed with app-side timestamps, so a slower worker can
+# commit one that is slightly older than our watermark; re-read this window.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Not grouped by family: that lets the planner walk the family index instead
+# of searching revoked_at; RevocationList.add keeps the max expiry per family.
+REVOKED_TOKENS_SINCE = select(RefreshToken.family_id, RefreshToken.expires_at).where(
+    RefreshToken.revoked_at >= bindparam("since")
+)
+ROTATE_TOKEN = (
+    update(RefreshToken)
+    .where(
+        RefreshToken.jti == bindparam("token_jti"),
+        RefreshToken.family_id == bindparam("token_family_id"),
+        RefreshToken.rotated_at.is_(None),
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > bindparam("now"),
+    )
+    .values(rotated_at=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
+ROTATED_AT_FOR_LIVE_TOKEN = select(RefreshToken.rotated_at).where(
+    RefreshToken.jti == bindparam("token_jti"),
+    RefreshToken.family_id == bindparam("token_family_id"),
+    RefreshToken.revoked_at.is_(None),
+)
+REVOKE_FAMILY = (
+    update(RefreshToken)
+    .where(RefreshToken.family_id == bindparam("token_family_id"), RefreshToken.revoked_at.is_(None))
+    .values(revoked_at=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
+
+
+class RevocationList:
+    """In-memory view of revoked refresh-token families.
+
+    Maps family id -> the latest expiry of any token in it, after which the
+    tokens are rejected anyway and the entry can be dropped. Synchronized
+    incrementally from ``refresh_tokens.revoked_at`` so checks never hit the
+    database.
+    """
+
+    def __init__(self):
+        self._families: dict[str, datetime] = {}
+        self._watermark: datetime | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def is_revoked(self, family_id: str) -> bool:
+        return family_id in self._families
+
+    def add(self, family_id: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._families[family_id] = max(expires_at, self._families.get(family_id, expires_at))
+
+    def sync(self) -> int:
+        """Pull revocations made since the last sync; returns how many tokens were seen"""
+        now = datetime.utcnow()
+        since = self._watermark - SYNC_OVERLAP if self._watermark else now - timedelta(days=settings.refresh_token_ttl_days)
+        with get_db_session() as db:
+            rows = db.execute(REVOKED_TOKENS_SINCE, {"since": since}).all()
+        for family_id, expires_at in rows:
+            self.add(family_id, expires_at)
+        self._watermark = now
+        self.prune(now)
+        return len(rows)
+
+    def prune(self, now: datetime) -> None:
+        with self._lock:
+            self._families = {k: v for k, v in self._families.items() if v > now}
+
+
+revocations = RevocationList()
+
+
+def record_refresh_token(jti: str, family_id: str, user_id: int, expires_at: datetime) -> None:
+    """Store a newly issued refresh token"""
+    with get_db_session() as db:
+        db.add(RefreshToken(jti=jti, family_id=family_id, user_id=user_id, expires_at=expires_at))
+        db.commit()
+
+
+def rotate_refresh_token_record(
+    old_jti: str, new_jti: str, family_id: str, user_id: int, expires_at: datetime
+) -> bool:
+    """Mark ``old_jti`` as rotated and store its successor in one transaction.
+
+    Returns False when the old token was already rotated or revoked. Reuse
+    within the grace window (two tabs refreshing at once) is allowed to mint
+    another successor; outside it, reuse is treated as token theft and the
+    whole family is revoked.
+    """
+    now = datetime.utcnow()
+    with get_db_session() as db:
+        params = {"token_jti": old_jti, "token_family_id": family_id, "now": now}
+        rotated = db.execute(ROTATE_TOKEN, params).rowcount
+
+        if not rotated:
+            previous_rotation = db.scalar(ROTATED_AT_FOR_LIVE_TOKEN, params)
+            grace = timedelta(seconds=settings.refresh_reuse_grace_seconds)
+            rotated = bool(previous_rotation and now - previous_rotation < grace)
+
+        if rotated:
+            db.add(RefreshToken(jti=new_jti, family_id=family_id, user_id=user_id, expires_at=expires_at))
+            db.commit()
+            return True
+
+    audit_log.record(REFRESH_TOKEN_REUSE, user_id=user_id, family_id=family_id)
+    revoke_refresh_family(family_id)
+    return False
+
+
+def revoke_refresh_family(family_id: str) -> None:
+    """Revoke every token in a family (logout, or reuse of a rotated token)"""
+    now = datetime.utcnow()
+    with get_db_session() as db:
+        db.execute(REVOKE_FAMILY, {"token_family_id": family_id, "now": now})
+        db.commit()
+    revocations.add(family_id, now + timedelta(days=settings.refresh_token_ttl_days))
+
+
+async def revocation_sync_loop():
+    """Pick up revocations made by other workers"""
+    while True:
+        await asyncio.sleep(settings.refresh_revocation_sync_seconds)
+        try:
+            await asyncio.to_thread(revocations.sync)
+        except Exception:
+            logger.exception("Refresh token revocation sync failed")
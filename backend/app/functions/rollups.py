@@ -0,0 +1,173 @@
+"""Hourly and daily counts for dashboard time series.
+
+A background job folds new source rows into ``metric_rollups``. For each
+metric it reads only rows past that metric's id watermark, adds them to
+their hour and day buckets, and moves the watermark forward. All of this
+happens in one transaction, so a count is never applied twice or lost.
+Advancing the watermark is a compare-and-set: if two workers both run the
+job, only one of them applies a batch. Range queries then read at most
+one row per bucket, however many users or events sit behind it.
+
+Ids are assigned at insert but only become visible at commit, so a slow
+transaction (a bulk import batch, or on PostgreSQL any concurrent writer)
+can commit an id below a watermark that has already passed it. Each batch
+therefore stops at the first row younger than ROLLUP_VISIBILITY_LAG_SECONDS;
+rows are counted once every transaction that could precede them has
+finished. The lag must exceed the longest write transaction plus the audit
+flush interval, otherwise late rows are still missed.
+"""
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..config import settings
+from ..database import get_db_session, get_read_session
+from ..database.models import AuditEvent, MetricRollup, RollupWatermark, User
+from .audit import LOGIN, OAUTH_LOGIN, PASSWORD_RESET
+from .tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+@dataclass(frozen=True)
+class RollupSource:
+    metric: str
+    statement: object
+
+
+def _source(metric: str, id_column, ts_column, *where) -> RollupSource:
+    statement = (
+        select(id_column, ts_column)
+        .where(id_column > bindparam("last_id"), *where)
+        .order_by(id_column)
+        .limit(settings.rollup_batch_size)
+    )
+    return RollupSource(metric, statement)
+
+
+# Audit rows are bucketed by when the event happened, not when the
+# write-behind flush inserted them; the watermark follows insertion order
+ROLLUP_SOURCES = (
+    _source("signups", User.id, User.created_at),
+    _source("logins", AuditEvent.id, AuditEvent.occurred_at, AuditEvent.event_type.in_([LOGIN, OAUTH_LOGIN])),
+    _source("password_resets", AuditEvent.id, AuditEvent.occurred_at, AuditEvent.event_type == PASSWORD_RESET),
+)
+METRICS = tuple(source.metric for source in ROLLUP_SOURCES)
+
+WATERMARK = select(RollupWatermark.last_id).where(RollupWatermark.metric == bindparam("metric"))
+ADVANCE_WATERMARK = (
+    update(RollupWatermark)
+    .where(RollupWatermark.metric == bindparam("wm_metric"), RollupWatermark.last_id == bindparam("wm_last_id"))
+    .values(last_id=bindparam("new_id"), updated_at=bindparam("now"))
+    .execution_options(synchronize_session=False)
+)
+ROLLUP_RANGE = select(MetricRollup.metric, MetricRollup.bucket, MetricRollup.count).where(
+    MetricRollup.metric.in_(bindparam("metrics", expanding=True)),
+    MetricRollup.granularity == bindparam("granularity"),
+    MetricRollup.bucket >= bindparam("start"),
+    MetricRollup.bucket < bindparam("end"),
+)
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if granularity == "day" else ts
+
+
+def _add_counts(db, counts: Counter) -> None:
+    """Add to existing bucket counts (INSERT ... ON CONFLICT DO UPDATE)"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(MetricRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MetricRollup.metric, MetricRollup.granularity, MetricRollup.bucket],
+        set_={"count": MetricRollup.count + stmt.excluded["count"]},
+    )
+    db.execute(
+        stmt,
+        [
+            {"metric": metric, "granularity": granularity, "bucket": bucket, "count": count}
+            for (metric, granularity, bucket), count in counts.items()
+        ],
+    )
+
+
+def roll_up(source: RollupSource) -> int:
+    """Fold the next batch of source rows into the rollups; returns rows consumed"""
+    with get_db_session() as db:
+        last_id = db.scalar(WATERMARK, {"metric": source.metric})
+        if last_id is None:
+            return 0
+        rows = db.execute(source.statement, {"last_id": last_id}).all()
+        # Leave recent rows, and everything after them, for a later run
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.rollup_visibility_lag_seconds)
+        visible = next((i for i, (_, ts) in enumerate(rows) if ts >= cutoff), len(rows))
+        rows = rows[:visible]
+        if not rows:
+            return 0
+
+        # Claim the batch first: whoever loses the compare-and-set backs off
+        params = {"wm_metric": source.metric, "wm_last_id": last_id, "new_id": rows[-1][0], "now": datetime.utcnow()}
+        if not db.execute(ADVANCE_WATERMARK, params).rowcount:
+            db.rollback()
+            return 0
+
+        counts: Counter = Counter()
+        for _, ts in rows:
+            for granularity in GRANULARITIES:
+                counts[(source.metric, granularity, bucket_start(ts, granularity))] += 1
+        _add_counts(db, counts)
+        db.commit()
+        return len(rows)
+
+
+def run_rollups() -> dict[str, int]:
+    """Catch every metric up to its source table"""
+    consumed = {}
+    for source in ROLLUP_SOURCES:
+        total = 0
+        while True:
+            count = roll_up(source)
+            total += count
+            if count < settings.rollup_batch_size:
+                break
+        consumed[source.metric] = total
+    return consumed
+
+
+async def rollup_loop():
+    """Keep the rollups within ROLLUP_INTERVAL_SECONDS of their sources"""
+    while True:
+        try:
+            with start_trace("rollups.update"):
+                consumed = await asyncio.to_thread(run_rollups)
+            if any(consumed.values()):
+                logger.debug("Rolled up metrics", extra=consumed)
+        except Exception:
+            logger.exception("Metric rollup failed")
+        await asyncio.sleep(settings.rollup_interval_seconds)
+
+
+def get_timeseries(metrics: list[str], granularity: str, start: datetime, end: datetime) -> list[dict]:
+    """One point per bucket in [start, end), zero-filled"""
+    step = GRANULARITIES[granularity]
+    start = bucket_start(start, granularity)
+    with get_read_session() as db:
+        rows = db.execute(
+            ROLLUP_RANGE,
+            {"metrics": metrics, "granularity": granularity, "start": start, "end": end},
+        ).all()
+    counts = {(metric, bucket): count for metric, bucket, count in rows}
+
+    points = []
+    bucket = start
+    while bucket < end:
+        points.append({"bucket": bucket.isoformat(), **{metric: counts.get((metric, bucket), 0) for metric in metrics}})
+        bucket += step
+    return points
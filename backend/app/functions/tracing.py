@@ -0,0 +1,336 @@
+"""In-process tracing with OpenTelemetry-compatible output.
+
+Spans are kept per trace while a request runs. When the root span ends, the
+trace is exported if it was head-sampled (``TRACING_SAMPLE_RATE``, or the
+sampled flag of an incoming W3C ``traceparent``), or if it turned out slow
+(``TRACING_SLOW_MS``) or failed, so the tail is always captured. Exports are
+batched on a background thread as OTLP/JSON ``ExportTraceServiceRequest``
+documents, appended to a JSONL file or POSTed to a collector's
+``/v1/traces`` endpoint.
+
+With tracing disabled, ``span()`` costs one context variable lookup.
+"""
+import asyncio
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Bounds memory for requests that run many queries
+MAX_SPANS_PER_TRACE = 1000
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Trace:
+    """Spans recorded for one trace in this process"""
+
+    __slots__ = ("trace_id", "sampled", "spans", "finished")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: list[Span] = []
+        self.finished = False
+
+
+class Span:
+    __slots__ = ("name", "trace", "span_id", "parent_id", "kind", "attributes",
+                 "start_ns", "end_ns", "status", "status_message")
+
+    def __init__(self, name: str, trace: Trace, parent_id: str | None, kind: int, attributes: dict):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if not self.end_ns:
+            self.end_ns = time.time_ns()
+            if not self.trace.finished and len(self.trace.spans) < MAX_SPANS_PER_TRACE:
+                self.trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        """W3C header value for propagating this span to a downstream service"""
+        return f"00-{self.trace.trace_id}-{self.span_id}-{'01' if self.trace.sampled else '00'}"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status, "message": self.status_message} if self.status_message else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    encoded = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            encoded.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            encoded.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            encoded.append({"key": key, "value": {"stringValue": str(value)}})
+    return encoded
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def start_span(name: str, kind: int = KIND_INTERNAL, **attributes) -> Span | None:
+    """Start a child of the current span without making it current.
+
+    For leaf spans opened and closed by separate callbacks (SQLAlchemy cursor
+    events). Returns None outside a trace; the caller must ``end()`` it.
+    """
+    parent = _current_span.get()
+    if parent is None or parent.trace.finished:
+        return None
+    return Span(name, parent.trace, parent.span_id, kind, attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Record a child span of the current span; a no-op outside a trace"""
+    child = start_span(name, kind, **attributes)
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.record_error(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, bool] | None:
+    """(trace id, parent span id, sampled) from a W3C traceparent header"""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+@contextmanager
+def start_trace(name: str, traceparent: str | None = None, kind: int = KIND_INTERNAL,
+                force_sample: bool = False, **attributes):
+    """Open the root span of a trace (or continue a remote one).
+
+    Yields None when tracing is disabled. On exit the trace is handed to the
+    exporter if it was sampled, slow or failed.
+    """
+    if not settings.tracing_enabled:
+        yield None
+        return
+
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+        sampled = random.random() < settings.tracing_sample_rate
+    trace = Trace(trace_id, sampled or force_sample)
+    root = Span(name, trace, parent_id, kind, attributes)
+
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as exc:
+        root.record_error(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end()
+        trace.finished = True
+        if trace.sampled or root.status == STATUS_ERROR or root.duration_ms >= settings.tracing_slow_ms:
+            get_exporter().submit(trace.spans)
+
+
+def traced(name: str | None = None, kind: int = KIND_INTERNAL):
+    """Decorator form of ``span()`` for sync and async functions"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class BatchExporter:
+    """Ships finished traces in batches from a background thread.
+
+    The queue is bounded; when the exporter falls behind, new traces are
+    dropped and counted rather than slowing down requests.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = object()
+        self.exported = 0
+        self.dropped = 0
+        self._client = None
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans: list[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Flush what is queued and stop the thread"""
+        self._queue.put(self._stop)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        batch: list[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is self._stop:
+                self._flush(batch)
+                return
+            if item:
+                batch.extend(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: list[Span]) -> None:
+        if not batch:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": settings.tracing_service_name})},
+                "scopeSpans": [{"scope": {"name": "app"}, "spans": [s.to_otlp() for s in batch]}],
+            }]
+        }
+        try:
+            if settings.tracing_exporter == "otlp":
+                self._post(payload)
+            else:
+                self._append(payload)
+            self.exported += len(batch)
+        except Exception:
+            self.dropped += len(batch)
+            logger.exception("Trace export failed", extra={"spans": len(batch)})
+
+    def _append(self, payload: dict) -> None:
+        path = settings.tracing_file_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+    def _post(self, payload: dict) -> None:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.Client(timeout=5)
+        response = self._client.post(settings.tracing_otlp_endpoint, json=payload)
+        response.raise_for_status()
+
+
+_exporter: BatchExporter | None = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> BatchExporter:
+    """The process-wide exporter, started on the first exported trace"""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = BatchExporter(
+                    batch_size=settings.tracing_batch_size,
+                    flush_interval=settings.tracing_flush_interval_seconds,
+                    max_queue=settings.tracing_max_queue,
+                )
+                atexit.register(shutdown_tracing)
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans"""
+    global _exporter
+    with _exporter_lock:
+        exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.shutdown()
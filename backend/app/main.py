@@ -1,24 +1,122 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from mimetypes import guess_type
+from pathlib import Path
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from pathlib import Path
-import asyncio
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
 
+from .config import settings
+from .functions.audit import audit_log
+from .functions.backups import cleanup_expired_tokens, daily_backup_loop
+from .functions.compression import SUFFIXES, parse_accept_encoding
+from .functions.data_migrations import data_migration_loop
+from .functions.health import health, health_probe_loop, run_health_probe
+from .functions.memory import memory_snapshot_loop
+from .functions.metrics_stream import metrics_broadcaster
+from .functions.refresh_tokens import revocation_sync_loop
+from .functions.rollups import rollup_loop
+from .functions.tracing import shutdown_tracing
+from .functions.warmup import warm_up
+from .logs import setup_logging
+from .middleware.compression import setup_compression
 from .middleware.cors import setup_cors
 from .middleware.errors import global_exception_handler
-from .pages.auth import login, register, logout, reset, google, utils
-from .pages import dashboard
-from .functions.backups import daily_backup_loop, cleanup_expired_tokens
-from .database import get_db_session
-from .config import settings
+from .middleware.load_shedding import setup_load_shedding
+from .middleware.profiling import setup_profiling
+from .middleware.request_context import setup_request_context
+from .middleware.session import setup_db_session
+from .middleware.tracing import setup_tracing
+from .pages import batch, dashboard
+from .pages.admin import audit, data_migrations, memory, profiles, users
+from .pages.auth import google, login, logout, register, reset, utils
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up before accepting traffic, then run background tasks"""
+    try:
+        timings = await asyncio.to_thread(warm_up)
+        logger.info("Warm-up complete", extra={f"{k}_ms": round(v * 1000, 1) for k, v in timings.items()})
+    except Exception:
+        # Readiness is decided by the prober below; a cold cache is not fatal
+        logger.exception("Warm-up failed")
+    await run_health_probe()
+    health.warmed_up = True
+    audit_log.start()
+
+    tasks = [
+        asyncio.create_task(health_probe_loop()),
+        asyncio.create_task(revocation_sync_loop()),
+        asyncio.create_task(memory_snapshot_loop()),
+        asyncio.create_task(rollup_loop()),
+    ]
+    if settings.data_migrations_enabled:
+        tasks.append(asyncio.create_task(data_migration_loop()))
+    if settings.enable_backups:
+        tasks.append(asyncio.create_task(daily_backup_loop()))
+    tasks.append(asyncio.create_task(cleanup_expired_tokens()))
+
+    try:
+        yield
+    finally:
+        health.shutting_down = True
+        await metrics_broadcaster.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # After the tasks, so events recorded while they wind down are written
+        await asyncio.to_thread(audit_log.shutdown)
+        await asyncio.to_thread(shutdown_tracing)
+        # Logging is drained by its atexit hook, so uvicorn's own shutdown
+        # lines (and any later lifespan in this process) still get written
+
 
 app = FastAPI(
     title="Service Template",
     description="A comprehensive service template with authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+OPENAPI_PATH = Path(__file__).resolve().parents[1] / "openapi.json"
+
+
+def prebuilt_openapi() -> dict:
+    """Serve the build-time OpenAPI export instead of generating it on first /docs hit"""
+    if app.openapi_schema is None:
+        if settings.openapi_prebuilt and OPENAPI_PATH.is_file():
+            app.openapi_schema = json.loads(OPENAPI_PATH.read_text(encoding="utf-8"))
+        else:
+            return FastAPI.openapi(app)
+    return app.openapi_schema
+
+
+app.openapi = prebuilt_openapi
+
+# Middleware added last runs first: the request context wraps everything so
+# every response gets a request id and an access log line; compression sits
+# right inside it so every body, including errors, is compressed; the trace
+# span covers queueing in load shedding; CORS wraps load shedding so shed
+# responses carry CORS headers, and shed requests never take a DB connection.
+setup_db_session(app)
+setup_load_shedding(app)
 setup_cors(app)
+setup_tracing(app)
+setup_profiling(app)
+setup_compression(app)
+setup_request_context(app)
 
 app.add_exception_handler(Exception, global_exception_handler)
 
@@ -32,6 +130,13 @@ app.include_router(logout.router, prefix="/api")
 app.include_router(reset.router, prefix="/api")
 app.include_router(dashboard.router, prefix="/api")
 app.include_router(google.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+if settings.enable_admin_panel:
+    app.include_router(profiles.router, prefix="/api")
+    app.include_router(memory.router, prefix="/api")
+    app.include_router(users.router, prefix="/api")
+    app.include_router(audit.router, prefix="/api")
+    app.include_router(data_migrations.router, prefix="/api")
 
 
 class SPAStaticFiles(StaticFiles):
@@ -39,8 +144,33 @@ class SPAStaticFiles(StaticFiles):
 
     If a static file is not found and the request accepts HTML, return index.html
     so the client-side router can handle deep links like /auth/login.
+    Serves precompressed ``.br``/``.zst``/``.gz`` siblings (written at build
+    time by app.scripts.precompress_static) to clients that accept them.
     """
 
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        accepted = parse_accept_encoding(request_headers.get("accept-encoding", ""))
+        for encoding in settings.compression_encodings:
+            if encoding not in SUFFIXES or accepted.get(encoding, accepted.get("*", 0.0)) <= 0:
+                continue
+            variant = f"{full_path}{SUFFIXES[encoding]}"
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            response = FileResponse(
+                variant,
+                status_code=status_code,
+                stat_result=variant_stat,
+                media_type=guess_type(str(full_path))[0] or "text/plain",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return super().file_response(full_path, stat_result, scope, status_code)
+
     async def get_response(self, path: str, scope):
         try:
             return await super().get_response(path, scope)
@@ -61,32 +191,21 @@ class SPAStaticFiles(StaticFiles):
 
             raise
 
-static_dir = Path(__file__).parent / "static"
-if static_dir.exists():
-    app.mount("/", SPAStaticFiles(directory=static_dir, html=True), name="static")
-
 
+# Health endpoints are registered before the catch-all static mount, which
+# would otherwise shadow them. Both are async so they skip the threadpool.
 @app.get("/livez")
-def livez():
+async def livez():
     """Liveness check"""
     return {"status": "ok"}
 
 
 @app.get("/readyz")
-def readyz():
-    """Readiness check"""
-    try:
-        with get_db_session() as db:
-            db.execute("SELECT 1")
-        return {"status": "ready"}
-    except Exception as e:
-        return {"status": "not ready", "error": str(e)}
+async def readyz():
+    """Readiness check, served from the state kept by the background prober"""
+    return JSONResponse(health.as_dict(), status_code=200 if health.ready else 503)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Start background tasks"""
-    if settings.enable_backups:
-        asyncio.create_task(daily_backup_loop())
-    
-    asyncio.create_task(cleanup_expired_tokens())
+static_dir = Path(__file__).parent / "static"
+if static_dir.exists():
+    app.mount("/", SPAStaticFiles(directory=static_dir, html=True), name="static")
@@ -1,29 +1,82 @@
-from fastapi import HTTPException, Request, Depends, Response
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional
-from ..config import settings
-from ..database.models import User, Role, UserRole
-from ..database import get_db_session
-from ..database.shared import get_user_by_id
+from functools import cache
+
+from fastapi import Depends, HTTPException, Request, Response
+from jose import JWTError
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..config import settings
+from ..database.shared import (
+    UserSnapshot,
+    get_user_by_id,
+    get_user_role_ids,
+    role_cache,
+)
+from ..functions.refresh_tokens import (
+    record_refresh_token,
+    revocations,
+    revoke_refresh_family,
+    rotate_refresh_token_record,
+)
+from ..functions.tracing import traced
 
 ALGORITHM = "HS256"
 
 
+# PASSWORD_BCRYPT_ROUNDS, or the cost chosen by startup calibration
+# (app.functions.passwords); None means passlib's default
+_bcrypt_rounds: int | None = settings.password_bcrypt_rounds or None
+
+
+@cache
+def get_pwd_context():
+    """Password hashing context, built on first use to keep passlib off the import path"""
+    from passlib.context import CryptContext
+
+    if _bcrypt_rounds is None:
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
+    # min_rounds makes needs_update() flag hashes made at a lower cost
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=_bcrypt_rounds,
+        bcrypt__min_rounds=_bcrypt_rounds,
+    )
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    """Hash new passwords at ``rounds`` and treat cheaper hashes as outdated"""
+    global _bcrypt_rounds
+    _bcrypt_rounds = rounds
+    get_pwd_context.cache_clear()
+
+
+@cache
+def _jwt():
+    """python-jose's jwt module, imported on first use (it loads the crypto backends)"""
+    from jose import jwt
+
+    return jwt
+
+
+@traced("password.verify")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
+@traced("password.hash")
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash uses an outdated scheme or a lower cost than the current one"""
+    return get_pwd_context().needs_update(hashed_password)
 
-def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None) -> str:
+
+def create_access_token(user_id: int, expires_delta: timedelta | None = None) -> str:
     """Create an access token"""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -31,20 +84,71 @@ def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None)
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_ttl_minutes)
     
     to_encode = {"sub": str(user_id), "exp": expire}
-    return jwt.encode(to_encode, settings.jwt_secret, algorithm=ALGORITHM)
+    return _jwt().encode(to_encode, settings.jwt_secret, algorithm=ALGORITHM)
+
+
+def _encode_refresh_token(user_id: int, jti: str, family_id: str, expire: datetime) -> str:
+    to_encode = {"sub": str(user_id), "exp": expire, "type": "refresh", "jti": jti, "fam": family_id}
+    return _jwt().encode(to_encode, settings.jwt_secret, algorithm=ALGORITHM)
 
 
 def create_refresh_token(user_id: int) -> str:
-    """Create a refresh token"""
+    """Create a refresh token that starts a new server-side token family"""
     expire = datetime.utcnow() + timedelta(days=settings.refresh_token_ttl_days)
-    to_encode = {"sub": str(user_id), "exp": expire, "type": "refresh"}
-    return jwt.encode(to_encode, settings.jwt_secret, algorithm=ALGORITHM)
+    jti, family_id = secrets.token_urlsafe(16), secrets.token_urlsafe(16)
+    record_refresh_token(jti, family_id, user_id, expire)
+    return _encode_refresh_token(user_id, jti, family_id, expire)
 
 
-def set_auth_cookies(response: Response, user_id: int) -> None:
-    """Set auth cookies for the provided user"""
+def _decode_refresh_token(refresh_token: str) -> dict:
+    try:
+        payload = decode_token(refresh_token)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token type")
+    if not payload.get("jti") or not payload.get("fam"):
+        # Issued before refresh tokens were tracked server-side
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+
+@traced("auth.rotate_refresh_token")
+def rotate_refresh_token(refresh_token: str) -> tuple[int, str]:
+    """Exchange a refresh token for its successor in the same family.
+
+    Revoked families are rejected from memory; reuse of an already rotated
+    token revokes the family.
+    """
+    payload = _decode_refresh_token(refresh_token)
+    if revocations.is_revoked(payload["fam"]):
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    user_id = int(payload["sub"])
+    expire = datetime.utcnow() + timedelta(days=settings.refresh_token_ttl_days)
+    new_jti = secrets.token_urlsafe(16)
+    if not rotate_refresh_token_record(payload["jti"], new_jti, payload["fam"], user_id, expire):
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    return user_id, _encode_refresh_token(user_id, new_jti, payload["fam"], expire)
+
+
+def revoke_refresh_token(refresh_token: str) -> None:
+    """Revoke the family of a refresh token, ignoring tokens that don't decode"""
+    try:
+        payload = _decode_refresh_token(refresh_token)
+    except HTTPException:
+        return
+    revoke_refresh_family(payload["fam"])
+
+
+@traced("auth.set_cookies")
+def set_auth_cookies(response: Response, user_id: int, refresh_token: str | None = None) -> None:
+    """Set auth cookies for the provided user, starting a new token family
+    unless a rotated ``refresh_token`` is given"""
     access_token = create_access_token(user_id)
-    refresh_token = create_refresh_token(user_id)
+    if refresh_token is None:
+        refresh_token = create_refresh_token(user_id)
 
     secure_cookie = bool(getattr(settings, "cookie_secure", False))
     if not secure_cookie:
@@ -70,23 +174,33 @@ def set_auth_cookies(response: Response, user_id: int) -> None:
     )
 
 
+def decode_token(token: str) -> dict:
+    """Decode and validate a token, raising JWTError when it is invalid"""
+    return _jwt().decode(token, settings.jwt_secret, algorithms=[ALGORITHM])
+
+
 def verify_token(token: str) -> bool:
     """Verify if a token is valid"""
     try:
-        jwt.decode(token, settings.jwt_secret, algorithms=[ALGORITHM])
+        decode_token(token)
         return True
     except JWTError:
         return False
 
 
-def get_current_user(request: Request) -> User:
+def get_current_user(request: Request) -> UserSnapshot:
     """Validate access token from HttpOnly cookie and load user from DB"""
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        # Sub-request of /api/batch, which has already authenticated
+        return user
+
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id: int = int(payload["sub"])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -98,20 +212,27 @@ def get_current_user(request: Request) -> User:
     return user
 
 
+@traced("auth.roles")
 def get_user_roles_with_hierarchy(user_id: int) -> set[str]:
     """Get all roles for a user, including inherited roles from hierarchy"""
-    with get_db_session() as db:
-        user_roles = db.query(Role).join(UserRole).filter(UserRole.user_id == user_id).all()
-        
-        all_roles = set()
-        for role in user_roles:
-            all_roles.add(role.name)
-            current = role
-            while current.parent:
-                current = current.parent
-                all_roles.add(current.name)
-        
-        return all_roles
+    role_ids = get_user_role_ids(user_id)
+    roles = role_cache.get()
+    if any(role_id not in roles for role_id in role_ids):
+        # A role was created after the cache was loaded
+        role_cache.invalidate()
+        roles = role_cache.get()
+
+    all_roles = set()
+    for role_id in role_ids:
+        current = roles.get(role_id)
+        seen = set()
+        while current is not None and role_id not in seen:
+            seen.add(role_id)
+            name, role_id = current
+            all_roles.add(name)
+            current = roles.get(role_id) if role_id is not None else None
+
+    return all_roles
 
 
 def has_permission(user_id: int, required_role: str) -> bool:
@@ -122,14 +243,14 @@ def has_permission(user_id: int, required_role: str) -> bool:
 
 def require_role(required_role: str):
     """Decorator for role-based authorization with hierarchy support"""
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: UserSnapshot = Depends(get_current_user)):
         if not has_permission(current_user.id, required_role):
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return current_user
     return role_checker
 
 
-def optional_user(request: Request) -> Optional[User]:
+def optional_user(request: Request) -> UserSnapshot | None:
     """Get current user if authenticated, None otherwise"""
     try:
         return get_current_user(request)
@@ -0,0 +1,141 @@
+from ..config import settings
+from ..functions.compression import configured_codecs, negotiate
+
+# Statuses whose bodies must not be re-encoded (or that have none)
+_SKIP_STATUSES = {204, 206, 304}
+
+
+def _media_type(headers: list) -> str:
+    for key, value in headers:
+        if key == b"content-type":
+            return value.decode("latin-1").split(";", 1)[0].strip().lower()
+    return ""
+
+
+class CompressingSend:
+    """Wraps ``send`` for one response, compressing the body if it qualifies"""
+
+    def __init__(self, send, codec, content_types: frozenset, min_size: int):
+        self.send = send
+        self.codec = codec
+        self.content_types = content_types
+        self.min_size = min_size
+        self.start = None
+        self.stream = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers", []))
+            names = {key for key, _ in headers}
+            cache_control = b"".join(value for key, value in headers if key == b"cache-control")
+            if (
+                message["status"] in _SKIP_STATUSES
+                or message["status"] < 200
+                or b"content-encoding" in names
+                or b"no-transform" in cache_control
+                or _media_type(headers) not in self.content_types
+            ):
+                self.passthrough = True
+                await self.send(message)
+                return
+
+            # Cacheable intermediaries must key compressible responses on it
+            headers = _add_vary(headers)
+            if self.codec is None or (
+                b"content-length" in names and int(dict(headers)[b"content-length"]) < self.min_size
+            ):
+                self.passthrough = True
+                await self.send({**message, "headers": headers})
+                return
+            self.start = {**message, "headers": headers}
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None:
+            if not more_body and len(body) < self.min_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.stream = self.codec.stream()
+            headers = [(k, v) for k, v in self.start["headers"] if k != b"content-length"]
+            headers = [(k, _weaken(v) if k == b"etag" else v) for k, v in headers]
+            headers.append((b"content-encoding", self.codec.name.encode()))
+            if not more_body:
+                compressed = self.stream.compress(body) + self.stream.finish()
+                headers.append((b"content-length", str(len(compressed)).encode()))
+                await self.send({**self.start, "headers": headers})
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send({**self.start, "headers": headers})
+
+        # Streaming: emit whatever the compressor has produced so far. No
+        # per-chunk flush, so small chunks (e.g. one NDJSON row each) still
+        # compress well; event streams are not in the default allowlist.
+        chunk = self.stream.compress(body)
+        if not more_body:
+            chunk += self.stream.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+def _add_vary(headers: list) -> list:
+    for i, (key, value) in enumerate(headers):
+        if key == b"vary":
+            if b"accept-encoding" in value.lower() or value.strip() == b"*":
+                return headers
+            headers = list(headers)
+            headers[i] = (key, value + b", Accept-Encoding")
+            return headers
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+
+def _weaken(etag: bytes) -> bytes:
+    """A re-encoded body is no longer byte-identical to the strong validator"""
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+class CompressionMiddleware:
+    """Compress responses with the best coding the client accepts.
+
+    Only bodies of at least ``COMPRESSION_MIN_SIZE`` bytes with a media type
+    in ``COMPRESSION_CONTENT_TYPES`` are compressed; responses that already
+    have a Content-Encoding (precompressed static files) or say no-transform
+    pass through. Streaming bodies are compressed as they go.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.codecs = {codec.name: codec for codec in configured_codecs()}
+        self.content_types = frozenset(t.lower() for t in settings.compression_content_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.codecs:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        name = negotiate(accept_encoding, list(self.codecs))
+        codec = self.codecs[name] if name is not None else None
+        await self.app(scope, receive, CompressingSend(send, codec, self.content_types, settings.compression_min_size))
+
+
+def setup_compression(app):
+    """Install response compression"""
+    if settings.compression_enabled:
+        app.add_middleware(CompressionMiddleware)
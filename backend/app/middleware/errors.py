@@ -1,12 +1,17 @@
-from fastapi import Request, HTTPException
+import logging
+import uuid
+
+from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
-import uuid
+
+logger = logging.getLogger(__name__)
 
 
 async def global_exception_handler(request: Request, exc: Exception):
     """Centralized error handling with consistent response format"""
-    request_id = str(uuid.uuid4())
+    # Runs outside the middleware stack, so read the id from request state
+    request_id = getattr(request.state, "request_id", None) or uuid.uuid4().hex
 
     if isinstance(exc, HTTPException):
         status_code = exc.status_code
@@ -18,11 +23,22 @@ async def global_exception_handler(request: Request, exc: Exception):
         status_code = 500
         message = "An unexpected error occurred"
 
+    logger.log(
+        logging.ERROR if status_code >= 500 else logging.WARNING,
+        "Unhandled %s on %s %s",
+        type(exc).__name__,
+        request.method,
+        request.url.path,
+        exc_info=exc if status_code >= 500 else None,
+        extra={"request_id": request_id, "status": status_code},
+    )
+
     return JSONResponse(
         status_code=status_code,
         content={
             "detail": message,
             "request_id": request_id,
             "status_code": status_code
-        }
+        },
+        headers={"X-Request-ID": request_id},
     )
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+
+from ..config import settings
+
+# Cost classes: starting in-flight limit, adaptive bounds and the latency the
+# limiter steers towards. Password hashing is CPU bound, so it starts at one
+# request per core.
+COST_CLASSES = {
+    "hashing": {"limit": os.cpu_count() or 2, "min_limit": 1, "max_limit": 64, "target_latency": 0.5},
+    "heavy": {"limit": 16, "min_limit": 2, "max_limit": 128, "target_latency": 0.25},
+    "standard": {"limit": 64, "min_limit": 8, "max_limit": 512, "target_latency": 0.1},
+}
+
+# First matching prefix wins; None means exempt from limiting
+ROUTE_CLASSES = [
+    ("/livez", None),
+    ("/readyz", None),
+    ("/api/auth/login/onsubmit", "hashing"),
+    ("/api/auth/register/onsubmit", "hashing"),
+    ("/api/auth/reset/onsubmit/confirm", "hashing"),
+    ("/api/dashboard/onload", "heavy"),
+    # Long-lived; capped by DASHBOARD_STREAM_MAX_CLIENTS instead
+    ("/api/dashboard/stream", None),
+    ("/api/batch", "heavy"),
+    # Long-running and admin-only; imports are serialized per worker instead
+    ("/api/admin/users/export", None),
+    ("/api/admin/users/import", None),
+]
+DEFAULT_CLASS = "standard"
+
+
+def classify(path: str) -> str | None:
+    """Cost class for a request path, or None if it is exempt"""
+    for prefix, cost_class in ROUTE_CLASSES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return cost_class
+    return DEFAULT_CLASS
+
+
+class AdaptiveLimiter:
+    """In-flight limit with a short bounded wait queue (AIMD on latency).
+
+    While the smoothed latency stays under target and the limit is saturated,
+    the limit grows by one per adjustment interval. Once latency passes the
+    target it shrinks by 10%, so queueing moves out of the server and into
+    shed requests instead of growing tail latency.
+    """
+
+    ADJUST_INTERVAL = 1.0
+    SMOOTHING = 0.2
+
+    def __init__(self, name: str, limit: int, min_limit: int, max_limit: int,
+                 target_latency: float, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.latency = target_latency / 2
+        self.shed = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._saturated = False
+        self._last_adjust = time.monotonic()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting briefly in the queue; False means shed"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        self._saturated = True
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up
+                self.release(None)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.shed += 1
+                return False
+            raise
+        return True
+
+    def release(self, latency: float | None) -> None:
+        self.in_flight -= 1
+        if latency is not None:
+            self._observe(latency)
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _observe(self, latency: float) -> None:
+        self.latency += self.SMOOTHING * (latency - self.latency)
+        now = time.monotonic()
+        if now - self._last_adjust < self.ADJUST_INTERVAL:
+            return
+        if self.latency > self.target_latency:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        elif self._saturated:
+            self.limit = min(self.max_limit, self.limit + 1)
+        self._saturated = False
+        self._last_adjust = now
+
+    def retry_after(self) -> int:
+        """Seconds until a queued request would likely get a slot"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self.latency * backlog / max(int(self.limit), 1)))
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "latency_ms": round(self.latency * 1000, 1),
+            "shed": self.shed,
+        }
+
+
+class LoadSheddingMiddleware:
+    """Per-cost-class concurrency limits; excess requests get 503 + Retry-After"""
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = {
+            name: AdaptiveLimiter(
+                name,
+                max_queue=settings.load_shedding_queue_size,
+                queue_timeout=settings.load_shedding_queue_timeout_seconds,
+                **config,
+            )
+            for name, config in COST_CLASSES.items()
+        }
+        limiters.update(self.limiters)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cost_class = classify(scope["path"])
+        if cost_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[cost_class]
+        if not await limiter.acquire():
+            await self._shed(send, limiter)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+    async def _shed(self, send, limiter: AdaptiveLimiter) -> None:
+        body = json.dumps({
+            "detail": "Server is overloaded, retry later",
+            "status_code": 503,
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(limiter.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Limiters by cost class, filled in when the middleware is built
+limiters: dict[str, AdaptiveLimiter] = {}
+
+
+def setup_load_shedding(app):
+    """Install adaptive per-route concurrency limits"""
+    if settings.load_shedding_enabled:
+        app.add_middleware(LoadSheddingMiddleware)
@@ -0,0 +1,99 @@
+import asyncio
+import random
+import time
+import uuid
+
+from jose import JWTError
+from starlette.requests import Request
+
+from ..config import settings
+from ..functions.profiling import (
+    create_profiler,
+    profile_meta,
+    profiling_lock,
+    save_profile,
+)
+from .auth import decode_token, has_permission
+
+
+def _is_admin(scope) -> bool:
+    token = Request(scope).cookies.get("access_token")
+    if not token:
+        return False
+    try:
+        user_id = int(decode_token(token)["sub"])
+    except (JWTError, KeyError, ValueError):
+        return False
+    return has_permission(user_id, "admin")
+
+
+class ProfilingMiddleware:
+    """Profile a request when an admin sends the profiling header, or at
+    ``PROFILING_SAMPLE_RATE``. The profile id is returned as X-Profile-Id.
+
+    Requests that trigger neither pass straight through; the header is only
+    checked against the caller's roles when it is present.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = settings.profiling_header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = None
+        if any(key == self.header for key, _ in scope["headers"]):
+            if await asyncio.to_thread(_is_admin, scope):
+                trigger = "header"
+        elif settings.profiling_sample_rate and random.random() < settings.profiling_sample_rate:
+            trigger = "sampled"
+
+        if trigger is None or not profiling_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, trigger)
+        finally:
+            profiling_lock.release()
+
+    async def _profile(self, scope, receive, send, trigger: str) -> None:
+        profile_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = create_profiler()
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - start
+            name = f"{scope['method']} {scope['path']}"
+            meta = profile_meta(
+                profile_id,
+                scope["method"],
+                scope["path"],
+                status,
+                duration,
+                trigger,
+                type(profiler).__name__,
+                scope.get("state", {}).get("request_id"),
+            )
+            # The response has been sent; build and write the file off the loop
+            await asyncio.to_thread(lambda: save_profile(profile_id, profiler.speedscope(name), meta))
+
+
+def setup_profiling(app):
+    """Install on-demand request profiling"""
+    if settings.profiling_enabled:
+        app.add_middleware(ProfilingMiddleware)
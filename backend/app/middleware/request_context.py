@@ -0,0 +1,92 @@
+import logging
+import random
+import re
+import time
+import uuid
+
+from ..config import settings
+from ..logs import client_ip_var, request_id_var
+
+logger = logging.getLogger("app.access")
+
+# Accept caller-supplied ids only if they look like ids
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestContextMiddleware:
+    """Assign a request id, echo it as X-Request-ID, and write the access log.
+
+The request id and client address are also exposed as context variables
+for log records and audit events.
+
+    Requests to high-volume paths (``ACCESS_LOG_SAMPLED_PATHS``) are logged at
+    ``ACCESS_LOG_SAMPLE_RATE``; errors and slow requests are always logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.sampled_paths = frozenset(settings.access_log_sampled_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        ip_token = client_ip_var.set(scope["client"][0] if scope.get("client") else None)
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if settings.access_log_enabled:
+                self._log(scope, status, time.perf_counter() - start)
+            request_id_var.reset(token)
+            client_ip_var.reset(ip_token)
+
+    def _log(self, scope, status: int, duration: float) -> None:
+        path = scope["path"]
+        if (
+            path in self.sampled_paths
+            and status < 500
+            and duration * 1000 < settings.access_log_slow_ms
+            and random.random() >= settings.access_log_sample_rate
+        ):
+            return
+        logger.info(
+            "%s %s %s",
+            scope["method"],
+            path,
+            status,
+            extra={
+                "method": scope["method"],
+                "path": path,
+                "status": status,
+                "duration_ms": round(duration * 1000, 2),
+                "client": scope["client"][0] if scope.get("client") else None,
+            },
+        )
+
+
+def setup_request_context(app):
+    """Install request-id propagation and access logging"""
+    app.add_middleware(RequestContextMiddleware)
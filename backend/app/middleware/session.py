@@ -0,0 +1,60 @@
+import math
+
+from ..config import settings
+from ..database import request_session_scope
+
+# Set on responses to requests that committed a write while read replicas
+# are configured; its presence routes that client's reads to the writer
+STICKY_COOKIE = "rw_sticky"
+
+
+def _has_sticky_cookie(headers: list) -> bool:
+    prefix = STICKY_COOKIE.encode() + b"="
+    for key, value in headers:
+        if key == b"cookie" and any(part.strip().startswith(prefix) for part in value.split(b";")):
+            return True
+    return False
+
+
+def _sticky_cookie_header() -> tuple[bytes, bytes]:
+    max_age = math.ceil(settings.read_your_writes_seconds)
+    secure = "; Secure" if settings.cookie_secure else ""
+    return b"set-cookie", f"{STICKY_COOKIE}=1; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax{secure}".encode()
+
+
+class DBSessionMiddleware:
+    """Check out one database connection per request, shared by all helpers.
+
+    The connection is released as soon as the response starts, so streaming
+    bodies don't pin it; anything that touches the database after that gets
+    a short-lived session of its own.
+
+    With read replicas, a request that commits marks its client sticky for
+    READ_YOUR_WRITES_SECONDS so its next reads don't hit a lagging replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.replicas = bool(settings.database_read_urls) and settings.read_your_writes_seconds > 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with request_session_scope() as db_scope:
+            db_scope.sticky = self.replicas and _has_sticky_cookie(scope["headers"])
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    if self.replicas and db_scope.wrote:
+                        message = {**message, "headers": [*message.get("headers", []), _sticky_cookie_header()]}
+                    db_scope.close()
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def setup_db_session(app):
+    """Install the request-scoped database session middleware"""
+    app.add_middleware(DBSessionMiddleware)
@@ -0,0 +1,57 @@
+from ..config import settings
+from ..functions.tracing import KIND_SERVER, STATUS_ERROR, start_trace
+
+# Probes would only add noise to the sampled traces, and a stream's duration
+# says nothing about latency
+UNTRACED_PATHS = frozenset({"/livez", "/readyz", "/api/dashboard/stream"})
+
+
+class TracingMiddleware:
+    """Open a server span per request, continuing an incoming W3C traceparent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        with start_trace(
+            f"{method} {scope['path']}",
+            traceparent,
+            kind=KIND_SERVER,
+            **{
+                "http.method": method,
+                "http.target": scope["path"],
+                "request.id": scope.get("state", {}).get("request_id"),
+            },
+        ) as root:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.status = STATUS_ERROR
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    # Name by route template so traces group across ids
+                    root.name = f"{method} {route.path}"
+                    root.set_attribute("http.route", route.path)
+
+
+def setup_tracing(app):
+    """Install request tracing"""
+    if settings.tracing_enabled:
+        app.add_middleware(TracingMiddleware)
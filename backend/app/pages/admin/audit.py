@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+
+from ...database.shared import UserSnapshot
+from ...functions.audit import audit_log, search_audit_events
+from ...middleware.auth import require_role
+
+router = APIRouter()
+
+
+class AuditEventItem(BaseModel):
+    id: int
+    occurred_at: str
+    event_type: str
+    user_id: int | None = None
+    actor_id: int | None = None
+    email: str | None = None
+    client_ip: str | None = None
+    request_id: str | None = None
+    details: dict[str, Any] | None = None
+
+
+class AuditEventPage(BaseModel):
+    items: list[AuditEventItem]
+    next_cursor: int | None = None
+
+
+@router.get("/admin/audit", response_model=AuditEventPage)
+async def admin_audit_events(
+    user_id: int | None = None,
+    event_type: str | None = Query(None, max_length=64),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: int | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: UserSnapshot = Depends(require_role("admin")),
+):
+    """
+    Audit events newest first, filtered by subject user, type and time.
+    Events reach the table a few seconds after they happen (write-behind).
+    """
+    rows = search_audit_events(
+        user_id=user_id,
+        event_type=event_type,
+        since=since,
+        until=until,
+        before_id=cursor,
+        limit=limit + 1,
+    )
+    page, more = rows[:limit], len(rows) > limit
+    items = [
+        AuditEventItem(**{**row._asdict(), "occurred_at": row.occurred_at.isoformat()})
+        for row in page
+    ]
+    return AuditEventPage(items=items, next_cursor=page[-1].id if more else None)
+
+
+@router.get("/admin/audit/status")
+async def admin_audit_status(current_user: UserSnapshot = Depends(require_role("admin"))):
+    """Write-behind buffer counters for this worker"""
+    return audit_log.stats()
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+
+from ...database.shared import UserSnapshot
+from ...functions.data_migrations import progress
+from ...middleware.auth import require_role
+
+router = APIRouter()
+
+
+class DataMigrationStatus(BaseModel):
+    name: str
+    description: str
+    status: str
+    processed: int
+    total: int | None = None
+    percent: float | None = None
+    rows_per_second: float | None = None
+    eta_seconds: int | None = None
+    last_key: int
+    error: str | None = None
+    started_at: str | None = None
+    finished_at: str | None = None
+
+
+@router.get("/admin/data-migrations", response_model=list[DataMigrationStatus])
+async def admin_data_migrations(current_user: UserSnapshot = Depends(require_role("admin"))):
+    """Progress of every registered online data migration"""
+    return progress()
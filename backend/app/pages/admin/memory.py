@@ -0,0 +1,36 @@
+import asyncio
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...database.shared import UserSnapshot
+from ...functions.memory import memory_monitor
+from ...middleware.auth import require_role
+
+router = APIRouter()
+
+
+@router.get("/admin/memory")
+async def admin_memory(current_user: UserSnapshot = Depends(require_role("admin"))):
+    """RSS, GC and tracemalloc status of the worker that serves this request"""
+    return memory_monitor.summary()
+
+
+@router.get("/admin/memory/allocations")
+async def admin_memory_allocations(
+    limit: int = Query(25, ge=1, le=200),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    current_user: UserSnapshot = Depends(require_role("admin")),
+):
+    """Top allocation sites of the latest snapshot, with diffs to the previous and first"""
+    return await asyncio.to_thread(memory_monitor.top_allocations, limit, group_by)
+
+
+@router.post("/admin/memory/snapshot")
+async def admin_memory_snapshot(current_user: UserSnapshot = Depends(require_role("admin"))):
+    """Take an allocation snapshot now instead of waiting for the next interval"""
+    memory_monitor.record_rss()
+    snapshot = await asyncio.to_thread(memory_monitor.take_snapshot)
+    if snapshot is None:
+        raise HTTPException(status_code=409, detail="tracemalloc is not enabled (MEMORY_TRACEMALLOC_ENABLED)")
+    return {"taken_at": snapshot.taken_at, "traced_bytes": snapshot.traced_bytes}
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from ...database.shared import UserSnapshot
+from ...functions.profiling import list_profiles, profile_path
+from ...middleware.auth import require_role
+
+router = APIRouter()
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    created_at: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    trigger: str
+    engine: str
+    request_id: str | None = None
+    pid: int
+
+
+@router.get("/admin/profiles", response_model=list[ProfileInfo])
+async def admin_list_profiles(current_user: UserSnapshot = Depends(require_role("admin"))):
+    """List stored request profiles, newest first"""
+    return list_profiles()
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def admin_get_profile(profile_id: str, current_user: UserSnapshot = Depends(require_role("admin"))):
+    """Download a profile as speedscope JSON (open it at https://www.speedscope.app)"""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path,
+        media_type="application/json",
+        filename=f"{profile_id}.speedscope.json",
+    )
@@ -0,0 +1,255 @@
+import asyncio
+import base64
+import codecs
+import json
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ...config import settings
+from ...database.shared import (
+    UserSnapshot,
+    get_role_ids_for_users,
+    get_user_by_id,
+    get_user_role_ids,
+    role_cache,
+    search_users,
+    set_user_role_ids,
+)
+from ...functions.audit import ROLE_GRANTED, ROLE_REVOKED, audit_log
+from ...functions.bulk_users import (
+    CsvRecords,
+    ImportRecord,
+    ImportResult,
+    import_batch,
+    import_lock,
+    iter_csv,
+    iter_export_rows,
+    iter_ndjson,
+    parse_record,
+)
+from ...middleware.auth import get_user_roles_with_hierarchy, require_role
+
+router = APIRouter()
+
+
+class AdminUser(BaseModel):
+    id: int
+    email: str
+    is_active: bool
+    created_at: str
+    roles: list[str]
+
+
+class AdminUserPage(BaseModel):
+    items: list[AdminUser]
+    next_cursor: str | None = None
+
+
+class AdminUserDetail(AdminUser):
+    effective_roles: list[str]
+    updated_at: str
+
+
+class RoleAssignment(BaseModel):
+    roles: list[str]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    email: str | None = None
+    error: str
+
+
+class ImportSummary(BaseModel):
+    created: int
+    failed: int
+    errors: list[ImportRowError]
+
+
+def encode_cursor(created_at: datetime, user_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), user_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def role_ids_granting(role_name: str) -> list[int]:
+    """Ids of roles that are, or inherit from, ``role_name``"""
+    roles = role_cache.get()
+    granting = []
+    for role_id in roles:
+        current, seen = role_id, set()
+        while current is not None and current not in seen and current in roles:
+            seen.add(current)
+            name, parent_id = roles[current]
+            if name == role_name:
+                granting.append(role_id)
+                break
+            current = parent_id
+    return granting
+
+
+def role_names(role_ids: list[int]) -> list[str]:
+    roles = role_cache.get()
+    return sorted(roles[role_id][0] for role_id in role_ids if role_id in roles)
+
+
+@router.get("/admin/users", response_model=AdminUserPage)
+async def admin_list_users(
+    q: str | None = Query(None, min_length=1, max_length=254, description="Email substring (prefix if shorter than 3)"),
+    role: str | None = Query(None, description="Users holding this role, directly or by inheritance"),
+    active: bool | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserSnapshot = Depends(require_role("admin")),
+):
+    """
+    List users newest first, with search and filters.
+    Keyset pagination: pass ``next_cursor`` back as ``cursor``.
+    """
+    role_ids = None
+    if role is not None:
+        role_ids = role_ids_granting(role)
+        if not role_ids:
+            return AdminUserPage(items=[])
+
+    after = decode_cursor(cursor) if cursor else None
+    rows = search_users(q=q, role_ids=role_ids, active=active, after=after, limit=limit + 1)
+    page, more = rows[:limit], len(rows) > limit
+
+    user_roles = get_role_ids_for_users([row.id for row in page])
+    items = [
+        AdminUser(
+            id=row.id,
+            email=row.email,
+            is_active=row.is_active,
+            created_at=row.created_at.isoformat(),
+            roles=role_names(user_roles[row.id]),
+        )
+        for row in page
+    ]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if more else None
+    return AdminUserPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/admin/users/export")
+async def admin_export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: UserSnapshot = Depends(require_role("admin")),
+):
+    """
+    Stream every user with their roles as NDJSON or CSV.
+    Rows come from a server-side cursor, so memory use does not grow with the table.
+    Password hashes are never exported over HTTP; use app.scripts.bulk_users.
+    """
+    rows = iter_export_rows()
+    if format == "csv":
+        body, media_type = iter_csv(rows), "text/csv"
+    else:
+        body, media_type = iter_ndjson(rows), "application/x-ndjson"
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users-{stamp}.{format}"'},
+    )
+
+
+@router.post("/admin/users/import", response_model=ImportSummary)
+async def admin_import_users(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: UserSnapshot = Depends(require_role("admin")),
+):
+    """
+    Create users from a streamed NDJSON or CSV body.
+    Each record needs ``email`` and either ``password`` or ``hashed_password``;
+    ``roles`` and ``is_active`` are optional. Bad rows are reported and skipped.
+    """
+    if not import_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Another import is already running")
+    try:
+        total = ImportResult()
+        parser = CsvRecords() if format == "csv" else None
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending, number = "", 0
+        batch: list[ImportRecord] = []
+
+        async def flush():
+            nonlocal batch
+            if batch:
+                total.merge(await asyncio.to_thread(import_batch, batch))
+                batch = []
+
+        async for chunk in request.stream():
+            try:
+                pending += decoder.decode(chunk)
+            except UnicodeDecodeError:
+                raise HTTPException(status_code=400, detail="Body must be UTF-8")
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                number += 1
+                record = parse_record(parser, number, line, total)
+                if record is not None:
+                    batch.append(record)
+                if len(batch) >= settings.bulk_import_batch_size:
+                    await flush()
+        if pending:
+            record = parse_record(parser, number + 1, pending, total)
+            if record is not None:
+                batch.append(record)
+        await flush()
+        errors = sorted(total.errors, key=lambda item: item["line"])
+        return ImportSummary(created=total.created, failed=total.failed, errors=errors)
+    finally:
+        import_lock.release()
+
+
+@router.get("/admin/users/{user_id}", response_model=AdminUserDetail)
+async def admin_get_user(user_id: int, current_user: UserSnapshot = Depends(require_role("admin"))):
+    """Get one user with direct and inherited roles"""
+    user = get_user_by_id(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return AdminUserDetail(
+        id=user.id,
+        email=user.email,
+        is_active=user.is_active,
+        created_at=user.created_at.isoformat(),
+        updated_at=user.updated_at.isoformat(),
+        roles=role_names(get_user_role_ids(user.id)),
+        effective_roles=sorted(get_user_roles_with_hierarchy(user.id)),
+    )
+
+
+@router.put("/admin/users/{user_id}/roles", response_model=AdminUserDetail)
+async def admin_set_user_roles(
+    user_id: int,
+    data: RoleAssignment,
+    current_user: UserSnapshot = Depends(require_role("admin")),
+):
+    """Replace a user's directly assigned roles; each grant and revoke is audited"""
+    if get_user_by_id(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    role_ids_by_name = {name: role_id for role_id, (name, _) in role_cache.get().items()}
+    unknown = sorted(set(data.roles) - set(role_ids_by_name))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown roles: {', '.join(unknown)}")
+
+    granted, revoked = set_user_role_ids(user_id, {role_ids_by_name[name] for name in data.roles})
+    for role in role_names(list(granted)):
+        audit_log.record(ROLE_GRANTED, user_id=user_id, actor_id=current_user.id, role=role)
+    for role in role_names(list(revoked)):
+        audit_log.record(ROLE_REVOKED, user_id=user_id, actor_id=current_user.id, role=role)
+    return await admin_get_user(user_id, current_user)
@@ -1,13 +1,13 @@
 import secrets
-from typing import Optional
 from urllib.parse import urlencode
 
-import httpx
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import RedirectResponse
 
 from ...config import settings
 from ...database.shared import create_user, get_user_by_email
+from ...functions.audit import OAUTH_LOGIN, OAUTH_LOGIN_FAILED, audit_log
+from ...functions.tracing import KIND_CLIENT, span
 from ...middleware.auth import get_password_hash, set_auth_cookies
 
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
@@ -32,14 +32,14 @@ def _cookie_secure_flag() -> bool:
     return secure
 
 
-def _sanitize_redirect(redirect: Optional[str]) -> str:
+def _sanitize_redirect(redirect: str | None) -> str:
     if not redirect or not redirect.startswith("/"):
         return "/dashboard"
     return redirect
 
 
 @router.get("/auth/google/login")
-async def google_login(redirect: Optional[str] = None):
+async def google_login(redirect: str | None = None):
     """Initiate Google OAuth flow"""
     if not _oauth_enabled():
         raise HTTPException(status_code=503, detail="Google OAuth is not configured")
@@ -83,9 +83,9 @@ async def google_login(redirect: Optional[str] = None):
 @router.get("/auth/google/callback")
 async def google_callback(
     request: Request,
-    code: Optional[str] = None,
-    state: Optional[str] = None,
-    error: Optional[str] = None,
+    code: str | None = None,
+    state: str | None = None,
+    error: str | None = None,
 ):
     """Handle Google OAuth callback"""
     if not _oauth_enabled():
@@ -103,6 +103,8 @@ async def google_callback(
 
     redirect_path = _sanitize_redirect(request.cookies.get("google_oauth_redirect"))
 
+    import httpx  # deferred: only the OAuth callback needs an HTTP client
+
     token_payload = {
         "client_id": settings.google_client_id,
         "client_secret": settings.google_client_secret,
@@ -112,7 +114,10 @@ async def google_callback(
     }
 
     async with httpx.AsyncClient(timeout=10) as client:
-        token_response = await client.post(GOOGLE_TOKEN_URL, data=token_payload)
+        with span("http.client POST", KIND_CLIENT, **{"http.url": GOOGLE_TOKEN_URL}) as client_span:
+            token_response = await client.post(GOOGLE_TOKEN_URL, data=token_payload)
+            if client_span is not None:
+                client_span.set_attribute("http.status_code", token_response.status_code)
 
     if token_response.status_code != 200:
         raise HTTPException(
@@ -127,10 +132,13 @@ async def google_callback(
         raise HTTPException(status_code=400, detail="Missing access token from Google")
 
     async with httpx.AsyncClient(timeout=10) as client:
-        userinfo_response = await client.get(
-            GOOGLE_USERINFO_URL,
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
+        with span("http.client GET", KIND_CLIENT, **{"http.url": GOOGLE_USERINFO_URL}) as client_span:
+            userinfo_response = await client.get(
+                GOOGLE_USERINFO_URL,
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            if client_span is not None:
+                client_span.set_attribute("http.status_code", userinfo_response.status_code)
 
     if userinfo_response.status_code != 200:
         raise HTTPException(
@@ -151,14 +159,17 @@ async def google_callback(
         domain = email.split("@")[-1].lower()
         allowed = {d.lower() for d in settings.google_allowed_domains}
         if domain not in allowed:
+            audit_log.record(OAUTH_LOGIN_FAILED, email=email, provider="google", reason="domain_not_allowed")
             raise HTTPException(status_code=403, detail="Email domain is not permitted")
 
     user = get_user_by_email(email)
-    if not user:
+    created = user is None
+    if created:
         random_secret = secrets.token_urlsafe(48)
         user = create_user(email=email, hashed_password=get_password_hash(random_secret))
 
     if not user.is_active:
+        audit_log.record(OAUTH_LOGIN_FAILED, user_id=user.id, email=email, provider="google", reason="disabled")
         raise HTTPException(status_code=403, detail="Account is disabled")
 
     target_url = settings.frontend_url.rstrip("/") + redirect_path
@@ -180,4 +191,5 @@ async def google_callback(
     )
 
     set_auth_cookies(response, user.id)
+    audit_log.record(OAUTH_LOGIN, user_id=user.id, email=email, provider="google", created=created)
     return response
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
-from .me import UserResponse as AuthUser
+
+from ...database.shared import get_user_by_email
+from ...functions.audit import LOGIN, LOGIN_FAILED, audit_log
+from ...functions.passwords import rehash_after_login
 from ...middleware.auth import (
-    verify_password,
     get_user_roles_with_hierarchy,
     set_auth_cookies,
+    verify_password,
 )
-from ...database.shared import get_user_by_email
+from .me import UserResponse as AuthUser
 
 router = APIRouter()
 
@@ -26,12 +29,17 @@ async def login_onsubmit(credentials: LoginRequest, response: Response):
     """Handle user login"""
     user = get_user_by_email(credentials.email)
     if not user or not verify_password(credentials.password, user.hashed_password):
+        audit_log.record(LOGIN_FAILED, user_id=user.id if user else None, email=credentials.email, reason="invalid_credentials")
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if not user.is_active:
+        audit_log.record(LOGIN_FAILED, user_id=user.id, email=user.email, reason="disabled")
         raise HTTPException(status_code=401, detail="Account is disabled")
     
+    # Upgrades a hash made at an older, cheaper cost off the request path
+    rehash_after_login(user.id, credentials.password, user.hashed_password)
     set_auth_cookies(response, user.id)
+    audit_log.record(LOGIN, user_id=user.id, email=user.email)
     
     roles = list(get_user_roles_with_hierarchy(user.id))
 
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Request, Response
+
 from ...config import settings
+from ...middleware.auth import revoke_refresh_token
 
 router = APIRouter()
 
 
 @router.post("/auth/logout/onsubmit")
-async def logout(response: Response):
-    """Logout user by clearing cookies"""
+async def logout(request: Request, response: Response):
+    """Logout user by revoking the refresh token family and clearing cookies"""
+    refresh_token = request.cookies.get("refresh_token")
+    if refresh_token:
+        revoke_refresh_token(refresh_token)
     response.delete_cookie("access_token", samesite="lax", secure=getattr(settings, "cookie_secure", False))
     response.delete_cookie("refresh_token", samesite="lax", secure=getattr(settings, "cookie_secure", False))
     return {"message": "Logged out successfully"}
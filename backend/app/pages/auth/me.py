@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
+
+from ...database.shared import UserSnapshot
 from ...middleware.auth import get_current_user, get_user_roles_with_hierarchy
-from ...database.models import User
 
 router = APIRouter()
 
@@ -15,7 +16,7 @@ class UserResponse(BaseModel):
 
 
 @router.get("/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserSnapshot = Depends(get_current_user)):
     """Get current user information"""
     roles = list(get_user_roles_with_hierarchy(current_user.id))
     
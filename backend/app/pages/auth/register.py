@@ -1,14 +1,16 @@
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel, EmailStr
-from .me import UserResponse as AuthUser
+
+from ...config import settings
+from ...database.shared import create_user, get_user_by_email
+from ...functions.audit import REGISTER, audit_log
 from ...middleware.auth import (
-    get_password_hash,
     create_access_token,
     create_refresh_token,
+    get_password_hash,
     get_user_roles_with_hierarchy,
 )
-from ...database.shared import get_user_by_email, create_user
-from ...config import settings
+from .me import UserResponse as AuthUser
 
 router = APIRouter()
 
@@ -39,6 +41,7 @@ async def register_onsubmit(user_data: RegisterRequest, response: Response):
     
     hashed_password = get_password_hash(user_data.password)
     user = create_user(user_data.email, hashed_password)
+    audit_log.record(REGISTER, user_id=user.id, email=user.email)
 
     # Generate tokens and set cookies for automatic login
     access_token = create_access_token(user.id)
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 from secrets import token_urlsafe
 
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, EmailStr
+from sqlalchemy import bindparam, select
+
+from ...config import settings
 from ...database import get_db_session
-from ...database.models import User, PasswordResetToken
+from ...database.models import PasswordResetToken, User
 from ...database.shared import get_user_by_email
-from ...middleware.auth import get_password_hash
+from ...functions.audit import (
+    PASSWORD_RESET,
+    PASSWORD_RESET_FAILED,
+    PASSWORD_RESET_REQUESTED,
+    audit_log,
+)
 from ...functions.email import email_service
-from ...config import settings
-
+from ...middleware.auth import get_password_hash
 
 router = APIRouter()
 
+RESET_TOKEN_BY_VALUE = select(PasswordResetToken).where(PasswordResetToken.token == bindparam("token"))
+
 
 class ResetRequest(BaseModel):
     email: EmailStr
@@ -29,6 +38,7 @@ async def request_password_reset(payload: ResetRequest):
         raise HTTPException(status_code=403, detail="Password reset is disabled")
 
     user = get_user_by_email(payload.email)
+    audit_log.record(PASSWORD_RESET_REQUESTED, user_id=user.id if user else None, email=payload.email)
 
     # Always respond success to avoid user enumeration
     if not user:
@@ -58,11 +68,12 @@ async def confirm_password_reset(payload: ResetConfirm):
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
 
     with get_db_session() as db:
-        prt = db.query(PasswordResetToken).filter(PasswordResetToken.token == payload.token).first()
+        prt = db.execute(RESET_TOKEN_BY_VALUE, {"token": payload.token}).scalars().first()
         if not prt or not prt.active or prt.used or (prt.expires_at and prt.expires_at < datetime.utcnow()):
+            audit_log.record(PASSWORD_RESET_FAILED, user_id=prt.user_id if prt else None, reason="invalid_token")
             raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-        user = db.query(User).filter(User.id == prt.user_id).first()
+        user = db.get(User, prt.user_id)
         if not user:
             raise HTTPException(status_code=400, detail="Invalid token")
 
@@ -70,6 +81,7 @@ async def confirm_password_reset(payload: ResetConfirm):
         prt.used = True
         prt.active = False
         db.commit()
+        audit_log.record(PASSWORD_RESET, user_id=user.id, email=user.email)
 
     return {"success": True, "message": "Password has been reset"}
 
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, Request, Response, HTTPException
-from jose import jwt, JWTError
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
 
-from ...middleware.auth import get_current_user, get_user_roles_with_hierarchy, create_access_token, verify_token
-from ...database.models import User
-from ...config import settings
+from ...database.shared import UserSnapshot, role_cache
+from ...functions.http_cache import cache_headers, etag_matches, not_modified, weak_etag
+from ...middleware.auth import (
+    get_current_user,
+    get_user_roles_with_hierarchy,
+    rotate_refresh_token,
+    set_auth_cookies,
+)
 
 router = APIRouter()
 
@@ -17,9 +21,19 @@ class UserResponse(BaseModel):
     created_at: str | None = None
 
 
-@router.get("/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Get current user information"""
+@router.get("/auth/me", response_model=UserResponse, responses={304: {"description": "Not modified"}})
+async def get_current_user_info(
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """Get current user information (supports If-None-Match)"""
+    # Role assignments bump updated_at; the role cache version covers the hierarchy
+    etag = weak_etag("me", current_user.id, current_user.updated_at.isoformat(), role_cache.version())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+
     roles = list(get_user_roles_with_hierarchy(current_user.id))
 
     return UserResponse(
@@ -33,29 +47,12 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 @router.post("/auth/refresh")
 async def refresh_token(request: Request, response: Response):
-    """Refresh access token using refresh token from cookie"""
+    """Rotate the refresh token from the cookie and issue a new access token"""
     refresh_token = request.cookies.get("refresh_token")
-    if not refresh_token or not verify_token(refresh_token):
-        raise HTTPException(status_code=401, detail="Invalid refresh token")
-
-    try:
-        payload = jwt.decode(refresh_token, settings.jwt_secret, algorithms=["HS256"])
-        user_id = int(payload["sub"])
-        token_type = payload.get("type")
-
-        if token_type != "refresh":
-            raise HTTPException(status_code=401, detail="Invalid token type")
-
-    except JWTError:
+    if not refresh_token:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    new_access_token = create_access_token(user_id)
-    response.set_cookie(
-        "access_token",
-        new_access_token,
-        httponly=True,
-        max_age=settings.access_token_ttl_minutes * 60,
-        samesite="lax"
-    )
+    user_id, new_refresh_token = rotate_refresh_token(refresh_token)
+    set_auth_cookies(response, user_id, refresh_token=new_refresh_token)
 
-    return {"success": True}
\ No newline at end of file
+    return {"success": True}
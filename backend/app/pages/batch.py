@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, Field
+from starlette.middleware.exceptions import ExceptionMiddleware
+
+from ..config import settings
+from ..database import request_session_scope
+from ..database.shared import UserSnapshot
+from ..functions.tracing import span
+from ..middleware.auth import get_current_user
+
+router = APIRouter()
+
+# Page routes that may be called through /api/batch. Routes that set or clear
+# auth cookies (login, logout, refresh) are deliberately absent: a batch
+# returns bodies only.
+BATCHABLE_ROUTES = {
+    ("GET", "/api/auth/me"),
+    ("GET", "/api/dashboard/onload"),
+    ("POST", "/api/dashboard/onsubmit"),
+}
+
+# Headers a sub-request inherits from the batch request
+_INHERITED_HEADERS = {b"cookie", b"user-agent", b"x-request-id", b"accept-language"}
+
+
+class BatchItem(BaseModel):
+    id: str = Field(..., max_length=64)
+    method: Literal["GET", "POST"] = "GET"
+    path: str
+    body: Any | None = None
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem]
+
+
+class BatchItemResult(BaseModel):
+    id: str
+    status: int
+    body: Any | None = None
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchItemResult]
+
+
+async def _dispatch(request: Request, user: UserSnapshot, item: BatchItem) -> BatchItemResult:
+    """Run one sub-request through the router, skipping the middleware stack"""
+    path, _, query = item.path.partition("?")
+    body = json.dumps(item.body).encode() if item.body is not None else b""
+    headers = [(k, v) for k, v in request.scope["headers"] if k in _INHERITED_HEADERS]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": request.scope["scheme"],
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "app": request.app,
+        # get_current_user() returns this user instead of decoding the cookie again
+        "state": {**request.scope.get("state", {}), "user": user},
+    }
+
+    async def receive():
+        nonlocal body
+        chunk, body = body, b""
+        return {"type": "http.request", "body": chunk, "more_body": False}
+
+    status = 500
+    chunks: list[bytes] = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    app = ExceptionMiddleware(request.app.router, handlers=request.app.exception_handlers)
+    # Concurrent sub-requests must not share the batch request's session;
+    # the nested scope still carries its read-your-writes state
+    with span(f"batch {item.method} {path}"), request_session_scope():
+        await app(scope, receive, send)
+
+    raw = b"".join(chunks)
+    try:
+        payload = json.loads(raw) if raw else None
+    except ValueError:
+        payload = raw.decode("utf-8", "replace")
+    return BatchItemResult(id=item.id, status=status, body=payload)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch(
+    request: Request,
+    data: BatchRequest,
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    Run several page calls in one round trip.
+    Authenticates once and runs the sub-requests concurrently in-process.
+    """
+    if not data.requests:
+        return BatchResponse(responses=[])
+    if len(data.requests) > settings.batch_max_requests:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_requests} requests per batch")
+    if len({item.id for item in data.requests}) != len(data.requests):
+        raise HTTPException(status_code=400, detail="Request ids must be unique")
+    for item in data.requests:
+        if (item.method, item.path.partition("?")[0]) not in BATCHABLE_ROUTES:
+            raise HTTPException(status_code=400, detail=f"{item.method} {item.path} cannot be batched")
+
+    results = await asyncio.gather(*(_dispatch(request, current_user, item) for item in data.requests))
+    return BatchResponse(responses=list(results))
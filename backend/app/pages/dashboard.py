@@ -1,7 +1,17 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from datetime import UTC, datetime, timedelta
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from ..database.models import User
-from ..database.shared import get_dashboard_metrics
+
+from ..config import settings
+from ..database.shared import UserSnapshot, metrics_cache
+from ..functions.http_cache import cache_headers, etag_matches, not_modified, weak_etag
+from ..functions.metrics_stream import metrics_broadcaster
+from ..functions.rollups import GRANULARITIES, METRICS, get_timeseries
 from ..middleware.auth import get_current_user
 
 router = APIRouter()
@@ -24,13 +34,29 @@ class DashboardData(BaseModel):
     system_metrics: DashboardSystemMetrics
 
 
-@router.get("/dashboard/onload", response_model=DashboardData)
-async def dashboard_onload(current_user: User = Depends(get_current_user)):
+class DashboardTimeseries(BaseModel):
+    granularity: str
+    metrics: list[str]
+    points: list[dict[str, int | str]]
+
+
+@router.get("/dashboard/onload", response_model=DashboardData, responses={304: {"description": "Not modified"}})
+async def dashboard_onload(
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
+):
     """
     Gather all data needed for dashboard display.
     Single endpoint to minimize frontend API calls.
+    Supports If-None-Match; metrics are shared between requests for DASHBOARD_METRICS_TTL_SECONDS.
     """
-    system_metrics = get_dashboard_metrics()
+    metrics_version, system_metrics = metrics_cache.get()
+    etag = weak_etag("dashboard", current_user.id, current_user.updated_at.isoformat(), metrics_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+
     user_stats = DashboardUserStats(
         user_id=current_user.id,
         email=current_user.email,
@@ -43,7 +69,75 @@ async def dashboard_onload(current_user: User = Depends(get_current_user)):
 @router.post("/dashboard/onsubmit")
 async def dashboard_onsubmit(
     action_data: dict,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     """Handle dashboard actions (e.g., updating preferences)"""
     return {"success": True, "message": "Dashboard action completed"}
+
+
+@router.get("/dashboard/timeseries", response_model=DashboardTimeseries)
+async def dashboard_timeseries(
+    metrics: list[Literal["signups", "logins", "password_resets"]] = Query(list(METRICS)),
+    granularity: Literal["hour", "day"] = "day",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    Signups, logins and password resets per hour or day over [start, end).
+    Served from rollup tables, so cost depends on the number of buckets only.
+    Defaults to the last 30 days; the newest buckets lag by up to ROLLUP_INTERVAL_SECONDS.
+    """
+    # Rollup buckets are naive UTC, like every other timestamp in the database
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(UTC).replace(tzinfo=None)
+    if start is not None and start.tzinfo is not None:
+        start = start.astimezone(UTC).replace(tzinfo=None)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / GRANULARITIES[granularity] > settings.rollup_max_points:
+        raise HTTPException(status_code=400, detail=f"At most {settings.rollup_max_points} points per request")
+
+    metrics = list(dict.fromkeys(metrics))
+    points = get_timeseries(metrics, granularity, start, end)
+    return DashboardTimeseries(granularity=granularity, metrics=metrics, points=points)
+
+
+@router.get("/dashboard/stream")
+async def dashboard_stream(request: Request, current_user: UserSnapshot = Depends(get_current_user)):
+    """
+    Stream live system metrics as server-sent events.
+    All clients share one metrics query per tick.
+    """
+    if not metrics_broadcaster.has_capacity():
+        raise HTTPException(status_code=503, detail="Too many live dashboard connections")
+
+    async def events():
+        # Tell EventSource how long to wait before reconnecting
+        yield f"retry: {int(settings.dashboard_stream_interval_seconds * 1000)}\n\n"
+        # Subscribe only once the body is being sent: a response that is never
+        # streamed (client gone, send failed) then never holds a slot
+        queue = metrics_broadcaster.subscribe()
+        if queue is None:
+            return
+        try:
+            while not await request.is_disconnected():
+                try:
+                    metrics = await asyncio.wait_for(queue.get(), settings.dashboard_stream_heartbeat_seconds)
+                except TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                if metrics is None:
+                    break
+                yield f"event: metrics\ndata: {json.dumps(metrics)}\n\n"
+        finally:
+            metrics_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
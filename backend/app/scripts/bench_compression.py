@@ -0,0 +1,134 @@
+"""CPU cost versus bytes saved for each response coding and level.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bench_compression [--encodings gzip br zstd] [--seconds 0.3]
+
+Compresses representative payloads at several levels:
+- a small /api/auth/me body
+- an admin users page of 200 rows
+- a 5,000-row NDJSON user export
+- the OpenAPI document
+- the largest built JS bundle, if the frontend has been built
+
+For each combination it reports the compressed size, the ratio, the time per
+response and the input throughput. It then runs a 20 KiB JSON response
+through CompressionMiddleware to show the whole per-request cost, and
+compares that with passing the response through uncompressed. brotli and zstd
+rows only appear when their packages are installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from app.config import settings  # noqa: E402
+from app.functions.compression import installed_encodings, make_codec  # noqa: E402
+from app.middleware.compression import CompressionMiddleware  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 6, 11], "zstd": [1, 3, 9, 19]}
+
+
+def payloads() -> dict[str, bytes]:
+    now = datetime(2026, 1, 1)
+    users = [
+        {
+            "id": i,
+            "email": f"user{i}@example.com",
+            "is_active": i % 10 != 0,
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+            "roles": ["user"] if i % 50 else ["admin", "user"],
+        }
+        for i in range(5000)
+    ]
+    result = {
+        "auth/me": json.dumps({**users[1], "roles": ["user"]}).encode(),
+        "admin users page": json.dumps({"items": users[:200], "next_cursor": "WyIyMDI2LTAxLTAxVDAwOjAwOjAwIiwgMjAwXQ"}).encode(),
+        "user export (ndjson)": "".join(json.dumps(user) + "\n" for user in users).encode(),
+    }
+    openapi = BACKEND_DIR / "openapi.json"
+    if openapi.is_file():
+        result["openapi.json"] = openapi.read_bytes()
+    bundles = sorted((BACKEND_DIR / "app" / "static").rglob("*.js"), key=lambda p: p.stat().st_size)
+    if bundles:
+        result[f"static {bundles[-1].name}"] = bundles[-1].read_bytes()
+    return result
+
+
+def time_per_call(fn, seconds: float) -> float:
+    fn()
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed / calls
+
+
+def bench_codecs(data: dict[str, bytes], encodings: list[str], seconds: float) -> None:
+    for name, body in data.items():
+        print(f"\n{name}: {len(body):,} bytes")
+        print(f"  {'coding':<10} {'bytes':>10} {'ratio':>7} {'ms/resp':>9} {'MB/s':>8}")
+        for encoding in encodings:
+            for level in LEVELS[encoding]:
+                codec = make_codec(encoding, level)
+                size = len(codec.compress(body))
+                per_call = time_per_call(lambda: codec.compress(body), seconds)
+                print(
+                    f"  {encoding + '-' + str(level):<10} {size:>10,} {len(body) / size:>6.1f}x "
+                    f"{per_call * 1000:>9.3f} {len(body) / per_call / 1e6:>8.1f}"
+                )
+
+
+def bench_middleware(body: bytes, encodings: list[str], seconds: float) -> None:
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    loop = asyncio.new_event_loop()
+    print(f"\nmiddleware, {len(body):,} byte JSON response (configured levels)")
+    for accept in ["identity"] + encodings:
+        settings.compression_encodings = [accept] if accept != "identity" else ["gzip"]
+        middleware = CompressionMiddleware(app)
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/admin/users",
+            "headers": [(b"accept-encoding", accept.encode())],
+        }
+        per_call = time_per_call(lambda: loop.run_until_complete(middleware(scope, receive, send)), seconds)
+        print(f"  {accept:<10} {per_call * 1e6:>9.0f} us/request")
+    loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--encodings", nargs="+", default=installed_encodings(), choices=list(LEVELS))
+    parser.add_argument("--seconds", type=float, default=0.3, help="time spent per measurement")
+    args = parser.parse_args()
+
+    encodings = [name for name in args.encodings if name in installed_encodings()]
+    data = payloads()
+    bench_codecs(data, encodings, args.seconds)
+    bench_middleware(data["admin users page"], encodings, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Caller-side cost of logging, and per-request cost of the access log.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bench_logging [--iterations 20000]
+
+Compares a log call through a synchronous StreamHandler (JSON formatting and
+the write happen on the calling thread, i.e. the event loop) against the
+queue handler the app uses, with output going to /dev/null. Then measures
+RequestContextMiddleware around a trivial ASGI app with the access log on and
+off, and reports microseconds per call/request.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueListener
+
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from app.config import settings  # noqa: E402
+from app.logs import ContextQueueHandler, JsonFormatter, request_id_var  # noqa: E402
+from app.middleware.request_context import RequestContextMiddleware  # noqa: E402
+
+
+def bench_logger(handler: logging.Handler, iterations: int) -> float:
+    logger = logging.getLogger(f"bench.{type(handler).__name__}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    request_id_var.set("bench-request")
+    start = time.perf_counter()
+    for i in range(iterations):
+        logger.info("user %s logged in", i, extra={"path": "/api/auth/login/onsubmit", "status": 200})
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def bench_requests(app, iterations: int) -> float:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/dashboard/onload",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    sink = logging.StreamHandler(devnull)
+    sink.setFormatter(JsonFormatter())
+
+    sync_us = bench_logger(sink, args.iterations)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, sink)
+    listener.start()
+    queued_us = bench_logger(ContextQueueHandler(log_queue), args.iterations)
+    drain_start = time.perf_counter()
+    listener.stop()
+    drain_s = time.perf_counter() - drain_start
+
+    print(f"{'log call':28s} {'us/call':>8s}")
+    print(f"{'sync StreamHandler':28s} {sync_us:8.2f}")
+    print(f"{'queue handler (caller side)':28s} {queued_us:8.2f}")
+    print(f"(listener drained the backlog in {drain_s * 1000:.0f}ms off the caller's thread)\n")
+
+    # Access log lines go through the queue, as in the app
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, sink)
+    listener.start()
+    access = logging.getLogger("app.access")
+    access.handlers = [ContextQueueHandler(log_queue)]
+    access.propagate = False
+    access.setLevel(logging.INFO)
+
+    baseline_us = asyncio.run(bench_requests(trivial_app, args.iterations))
+    middleware = RequestContextMiddleware(trivial_app)
+    settings.access_log_enabled = False
+    off_us = asyncio.run(bench_requests(middleware, args.iterations))
+    settings.access_log_enabled = True
+    on_us = asyncio.run(bench_requests(middleware, args.iterations))
+    listener.stop()
+    devnull.close()
+
+    print(f"{'request path':28s} {'us/req':>8s} {'overhead':>9s}")
+    print(f"{'bare ASGI app':28s} {baseline_us:8.2f} {0:9.2f}")
+    print(f"{'request id, access log off':28s} {off_us:8.2f} {off_us - baseline_us:9.2f}")
+    print(f"{'request id, access log on':28s} {on_us:8.2f} {on_us - baseline_us:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Count connection-pool checkouts per request for the auth and dashboard pages.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bench_pool_checkouts [--requests 50]
+
+Runs the app in-process against a throwaway SQLite database and prints pool
+checkouts per request, once with the request-scoped session and once with
+the same helpers called outside any request scope for comparison.
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmpdir.name) / 'bench.db'}"
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+os.environ.setdefault("ENABLE_BACKUPS", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import Base, engine, pool_stats  # noqa: E402
+from app.database.shared import get_user_by_email, get_user_by_id  # noqa: E402
+from app.main import app  # noqa: E402
+from app.middleware.auth import get_user_roles_with_hierarchy  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def checkouts_per_call(fn, count: int) -> float:
+    before = pool_stats["checkouts"]
+    for _ in range(count):
+        fn()
+    return (pool_stats["checkouts"] - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    with TestClient(app) as client:
+        client.post("/api/auth/register/onsubmit", json={"email": EMAIL, "password": PASSWORD})
+        user_id = get_user_by_email(EMAIL).id
+
+        print("Request-scoped session (checkouts per request):")
+        cases = {
+            "GET  /api/auth/me": lambda: client.get("/api/auth/me"),
+            "GET  /api/dashboard/onload": lambda: client.get("/api/dashboard/onload"),
+            "POST /api/auth/login/onsubmit": lambda: client.post(
+                "/api/auth/login/onsubmit", json={"email": EMAIL, "password": PASSWORD}
+            ),
+        }
+        for label, fn in cases.items():
+            print(f"  {label:32s} {checkouts_per_call(fn, args.requests):.2f}")
+
+    def me_without_scope():
+        get_user_by_id(user_id)
+        get_user_roles_with_hierarchy(user_id)
+
+    print("\nWithout a request scope (the same helpers /auth/me runs):")
+    print(f"  {'user lookup + role resolution':32s} {checkouts_per_call(me_without_scope, args.requests):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Per-call Python overhead of legacy Query lookups versus prebuilt statements.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bench_statements [--iterations 20000]
+
+Runs each hot auth lookup both ways against a throwaway SQLite database,
+reusing one session so only statement construction, cache-key generation and
+result handling differ, and reports microseconds per call.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmpdir.name) / 'bench.db'}"
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from app.database import Base, engine, get_db_session  # noqa: E402
+from app.database.models import PasswordResetToken, Role, User, UserRole  # noqa: E402
+from app.database.shared import (  # noqa: E402
+    ROLE_IDS_BY_USER,
+    USER_BY_EMAIL,
+    USER_BY_ID,
+    USER_COLUMNS,
+)
+from app.pages.auth.reset import RESET_TOKEN_BY_VALUE  # noqa: E402
+
+EMAIL = "bench@example.com"
+TOKEN = "bench-reset-token"
+
+
+def seed() -> None:
+    Base.metadata.create_all(engine)
+    with get_db_session() as db:
+        user = User(email=EMAIL, hashed_password="x")
+        role = Role(name="member")
+        db.add_all([user, role])
+        db.flush()
+        db.add(UserRole(user_id=user.id, role_id=role.id))
+        db.add(PasswordResetToken(
+            user_id=user.id,
+            token=TOKEN,
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+        ))
+        db.commit()
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    seed()
+    with get_db_session() as db:
+        cases = {
+            "user by id": (
+                lambda: db.query(*USER_COLUMNS).filter(User.id == 1).first(),
+                lambda: db.execute(USER_BY_ID, {"user_id": 1}).first(),
+            ),
+            "user by email": (
+                lambda: db.query(*USER_COLUMNS).filter(User.email == EMAIL).first(),
+                lambda: db.execute(USER_BY_EMAIL, {"email": EMAIL}).first(),
+            ),
+            "role ids for user": (
+                lambda: db.query(Role).join(UserRole).filter(UserRole.user_id == 1).all(),
+                lambda: list(db.execute(ROLE_IDS_BY_USER, {"user_id": 1}).scalars()),
+            ),
+            "reset token": (
+                lambda: db.query(PasswordResetToken).filter(PasswordResetToken.token == TOKEN).first(),
+                lambda: db.execute(RESET_TOKEN_BY_VALUE, {"token": TOKEN}).scalars().first(),
+            ),
+        }
+
+        print(f"{'lookup':20s} {'legacy us':>10s} {'prebuilt us':>12s} {'saved':>8s}")
+        for label, (legacy, prebuilt) in cases.items():
+            legacy(), prebuilt()  # warm the compiled cache for both
+            legacy_us = per_call_us(legacy, args.iterations)
+            prebuilt_us = per_call_us(prebuilt, args.iterations)
+            print(f"{label:20s} {legacy_us:10.1f} {prebuilt_us:12.1f} {legacy_us - prebuilt_us:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
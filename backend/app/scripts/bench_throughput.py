@@ -0,0 +1,193 @@
+"""Requests per second by worker count, through the production launcher.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bench_throughput [--workers 1 2 4] [--duration 10] \\
+        [--connections 64] [--clients 2] [--path /api/auth/me]
+
+For each worker count:
+1. Start ``app.scripts.serve`` on a free port against a throwaway SQLite
+   database.
+2. Register one user and wait for the server to be ready.
+3. Drive ``--path`` with that user's cookies over ``--connections``
+   keep-alive connections, spread across ``--clients`` load-generator
+   processes, for ``--duration`` seconds after a short warm-up.
+
+It reports throughput, speed-up over the first worker count, and
+p50/p99 latency. The default worker counts double up to the number of
+usable cores. The load generator shares the machine, so give it cores of
+its own (``--clients``) or read the numbers as relative scaling, not
+absolute capacity. The bcrypt cost is fixed at 4 rounds, so setting up
+the benchmark user stays cheap.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .serve import usable_cpus
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, db_path: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "JWT_SECRET": os.environ.get("JWT_SECRET", "bench-secret"),
+        "ENABLE_BACKUPS": "false",
+        "LOG_LEVEL": "WARNING",
+        "ACCESS_LOG_ENABLED": "false",
+        "PASSWORD_BCRYPT_ROUNDS": "4",
+        # Measure the workers, not the limiter in front of them
+        "LOAD_SHEDDING_ENABLED": "false",
+    }
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=env, check=True,
+                   capture_output=True)
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.scripts.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+def login(url: str) -> dict:
+    with httpx.Client(base_url=url, timeout=10) as client:
+        client.post("/api/auth/register/onsubmit", json={"email": EMAIL, "password": PASSWORD})
+        response = client.post("/api/auth/login/onsubmit", json={"email": EMAIL, "password": PASSWORD})
+        response.raise_for_status()
+        return dict(client.cookies)
+
+
+async def _drive(url: str, path: str, cookies: dict, connections: int, warmup: float, duration: float):
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    latencies: list[float] = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=url, cookies=cookies, limits=limits, timeout=30) as client:
+        start = time.monotonic()
+        measure_from, stop_at = start + warmup, start + warmup + duration
+
+        async def connection():
+            nonlocal errors
+            while True:
+                sent = time.monotonic()
+                if sent >= stop_at:
+                    return
+                try:
+                    response = await client.get(path)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                done = time.monotonic()
+                if sent >= measure_from:
+                    if ok:
+                        latencies.append(done - sent)
+                    else:
+                        errors += 1
+
+        await asyncio.gather(*(connection() for _ in range(connections)))
+    return latencies, errors
+
+
+def load_client(args: tuple) -> tuple[list[float], int]:
+    """One load-generator process"""
+    return asyncio.run(_drive(*args))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float("nan")
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(workers, port, Path(tmp) / "bench.db")
+        try:
+            wait_ready(url)
+            cookies = login(url)
+            per_client = max(1, args.connections // args.clients)
+            work = [(url, args.path, cookies, per_client, args.warmup, args.duration)] * args.clients
+            with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+                results = pool.map(load_client, work)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    latencies = sorted(latency for result in results for latency in result[0])
+    return {
+        "workers": workers,
+        "rps": len(latencies) / args.duration,
+        "p50": percentile(latencies, 0.5) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "errors": sum(result[1] for result in results),
+    }
+
+
+def default_worker_counts() -> list[int]:
+    cpus = max(1, int(usable_cpus()))
+    counts, n = [], 1
+    while n < cpus:
+        counts.append(n)
+        n *= 2
+    return counts + [cpus]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=default_worker_counts())
+    parser.add_argument("--path", default="/api/auth/me", help="authenticated GET to drive")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each run")
+    parser.add_argument("--connections", type=int, default=64, help="concurrent keep-alive connections")
+    parser.add_argument("--clients", type=int, default=max(1, int(usable_cpus()) // 2),
+                        help="load-generator processes")
+    args = parser.parse_args()
+
+    print(f"{usable_cpus():g} usable cpus, {args.clients} client processes, {args.connections} connections, "
+          f"GET {args.path}, {args.duration:g}s per run")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args)
+        baseline = baseline or result["rps"]
+        print(f"{workers:>7} {result['rps']:>9.0f} {result['rps'] / baseline:>7.2f}x "
+              f"{result['p50']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
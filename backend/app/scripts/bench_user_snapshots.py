@@ -0,0 +1,93 @@
+"""Compare detached ORM ``User`` loads with ``UserSnapshot`` column selects.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bench_user_snapshots [--users 2000] [--lookups 20000]
+
+Seeds a throwaway SQLite database, then reports lookup throughput and the
+memory retained by holding every user as an ORM instance versus a snapshot.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmpdir.name) / 'bench.db'}"
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from app.database import Base, engine, get_db_session  # noqa: E402
+from app.database.models import User  # noqa: E402
+from app.database.shared import get_user_by_id  # noqa: E402
+
+
+def orm_user_by_id(user_id: int) -> User | None:
+    """The previous implementation: a full ORM load, detached on session close"""
+    with get_db_session() as db:
+        return db.query(User).filter(User.id == user_id).first()
+
+
+def seed(count: int) -> None:
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with get_db_session() as db:
+        db.execute(
+            User.__table__.insert(),
+            [
+                {
+                    "email": f"user{i}@example.com",
+                    "hashed_password": "$2b$12$" + "x" * 53,
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(count)
+            ],
+        )
+        db.commit()
+
+
+def throughput(lookup, ids: list[int]) -> float:
+    start = time.perf_counter()
+    for user_id in ids:
+        lookup(user_id)
+    return len(ids) / (time.perf_counter() - start)
+
+
+def retained_bytes(lookup, ids: list[int]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    held = [lookup(user_id) for user_id in ids]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    seed(args.users)
+    ids = [(i % args.users) + 1 for i in range(args.lookups)]
+    all_ids = list(range(1, args.users + 1))
+
+    # Warm both paths so mapper configuration and statement compilation aren't measured
+    orm_user_by_id(1)
+    get_user_by_id(1)
+
+    print(f"{'':12s} {'lookups/s':>12s} {'bytes/user held':>16s}")
+    for label, lookup in (("ORM User", orm_user_by_id), ("UserSnapshot", get_user_by_id)):
+        rate = throughput(lookup, ids)
+        per_user = retained_bytes(lookup, all_ids) / args.users
+        print(f"{label:12s} {rate:12.0f} {per_user:16.0f}")
+
+
+if __name__ == "__main__":
+    main()
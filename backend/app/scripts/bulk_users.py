@@ -0,0 +1,88 @@
+"""Bulk user export and import against the configured database.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.bulk_users export [--format csv] [--include-password-hashes] [-o users.ndjson]
+    uv run python -m app.scripts.bulk_users import users.ndjson [--format csv] [--batch-size 1000] [--workers 8]
+
+Same code paths as ``/api/admin/users/export`` and ``/api/admin/users/import``,
+without the HTTP hop. Export writes to stdout unless ``-o`` is given; import
+reads from a file or ``-`` for stdin. Import records need ``email`` and either
+``password`` (hashed here, in parallel) or ``hashed_password`` (an existing
+bcrypt hash, e.g. from an export with ``--include-password-hashes``); ``roles``
+and ``is_active`` are optional. Rejected rows are printed to stderr as JSON;
+the exit status is 1 if any row failed.
+"""
+import argparse
+import json
+import sys
+import time
+
+from ..config import settings
+
+
+def export(args) -> None:
+    from ..functions.bulk_users import iter_csv, iter_export_rows, iter_ndjson
+
+    rows = iter_export_rows(args.include_password_hashes)
+    chunks = iter_csv(rows, args.include_password_hashes) if args.format == "csv" else iter_ndjson(rows)
+    out = open(args.output, "wb") if args.output != "-" else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+def import_(args) -> int:
+    if args.batch_size:
+        settings.bulk_import_batch_size = args.batch_size
+    if args.workers:
+        settings.bulk_import_hash_workers = args.workers
+
+    from ..functions.bulk_users import import_lines
+
+    started = time.perf_counter()
+    source = open(args.path, encoding="utf-8", newline="") if args.path != "-" else sys.stdin
+    try:
+        result = import_lines(source, args.format)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    elapsed = time.perf_counter() - started
+
+    for error in sorted(result.errors, key=lambda item: item["line"]):
+        print(json.dumps(error), file=sys.stderr)
+    if result.failed > len(result.errors):
+        print(f"... {result.failed - len(result.errors)} more errors not shown", file=sys.stderr)
+    rate = result.created / elapsed if elapsed else 0.0
+    print(f"created {result.created}, failed {result.failed} in {elapsed:.1f}s ({rate:.0f} users/s)")
+    return 1 if result.failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write all users with their roles")
+    export_parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    export_parser.add_argument("--include-password-hashes", action="store_true",
+                               help="include bcrypt hashes so the file can be re-imported as-is")
+    export_parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+
+    import_parser = commands.add_parser("import", help="create users from a file")
+    import_parser.add_argument("path", help="NDJSON or CSV file, or - for stdin")
+    import_parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    import_parser.add_argument("--batch-size", type=int, help="rows per transaction (default: BULK_IMPORT_BATCH_SIZE)")
+    import_parser.add_argument("--workers", type=int, help="hashing threads (default: one per core)")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args)
+    else:
+        sys.exit(import_(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Inspect or run the online data migrations.
+
+Usage (from backend/, after ``alembic upgrade head``):
+
+    uv run python -m app.scripts.data_migrations status
+    uv run python -m app.scripts.data_migrations run [NAME ...] [--batch-size 5000] [--no-throttle]
+
+``status`` prints each registered migration's checkpoint and progress.
+``run`` applies unfinished migrations in the foreground. It uses the same
+batches and checkpoints as the app's background loop, so it can run
+alongside a live deployment or resume after an interrupted run. With
+``--no-throttle`` it skips the pauses between batches, which is meant for
+maintenance windows.
+"""
+import argparse
+import sys
+import time
+
+from ..config import settings
+
+
+def status(args) -> None:
+    from ..functions.data_migrations import progress
+
+    rows = progress()
+    if not rows:
+        print("no data migrations registered")
+        return
+    for item in rows:
+        done = f"{item['processed']:,}"
+        if item["total"] is not None:
+            done += f" / {item['total']:,} ({item['percent']}%)"
+        line = f"{item['name']:<40} {item['status']:<8} {done}"
+        if item["rows_per_second"] is not None:
+            line += f"  {item['rows_per_second']:,.0f} rows/s"
+        if item["eta_seconds"] is not None:
+            line += f"  eta {item['eta_seconds']}s"
+        print(line)
+        if item["error"]:
+            print(f"    last error: {item['error']}")
+
+
+def run(args) -> int:
+    from ..functions.data_migrations import (
+        MIGRATIONS,
+        ensure_state_rows,
+        run_to_completion,
+    )
+
+    unknown = [name for name in args.names if name not in MIGRATIONS]
+    if unknown:
+        print(f"unknown data migration(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    ensure_state_rows()
+    for name in args.names or list(MIGRATIONS):
+        started = time.perf_counter()
+        rows = run_to_completion(MIGRATIONS[name], args.batch_size, throttle=not args.no_throttle)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {rows:,} rows in {elapsed:.1f}s")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="show progress")
+    run_parser = commands.add_parser("run", help="run unfinished migrations in the foreground")
+    run_parser.add_argument("names", nargs="*", help="only these migrations (default: all)")
+    run_parser.add_argument("--batch-size", type=int, default=settings.data_migration_batch_size)
+    run_parser.add_argument("--no-throttle", action="store_true", help="don't pause between batches")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        status(args)
+    else:
+        sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Query-plan regression suite and index advisor.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.explain_queries [--rows 5000] [--revision head]
+
+Migrates a throwaway SQLite database to ``--revision``, seeds it, runs
+ANALYZE, then runs every hot-path statement through EXPLAIN QUERY PLAN.
+Exits non-zero if a query reads a whole table (``SCAN``, with or without an
+index) when it isn't allowed to, and suggests an index for each one. Index
+searches that could be narrowed by a partial index on the query's boolean
+filters are reported as advisories.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmpdir.name) / 'explain.db'}"
+os.environ.setdefault("JWT_SECRET", "explain-secret")
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.sql import operators  # noqa: E402
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, False_, Null, True_  # noqa: E402
+from sqlalchemy.sql.schema import Column  # noqa: E402
+from sqlalchemy.sql.visitors import iterate  # noqa: E402
+
+from app.database import engine, shared  # noqa: E402
+from app.functions import audit, backups, refresh_tokens, rollups  # noqa: E402
+from app.pages.auth import reset  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+EQUALITY_OPERATORS = {operators.eq, operators.is_}
+RANGE_OPERATORS = {operators.gt, operators.ge, operators.lt, operators.le}
+
+
+@dataclass
+class HotQuery:
+    name: str
+    source: str
+    statement: object
+    # Intentional full scans, e.g. count(*) over a whole table
+    allow_scan: bool = False
+
+
+HOT_QUERIES = [
+    HotQuery("user by id", "database/shared.py, middleware/auth.py", shared.USER_BY_ID),
+    HotQuery("user by email", "database/shared.py", shared.USER_BY_EMAIL),
+    HotQuery("role ids for user", "database/shared.py, middleware/auth.py", shared.ROLE_IDS_BY_USER),
+    HotQuery("role cache load", "database/shared.py", shared.ALL_ROLES, allow_scan=True),
+    HotQuery("dashboard: total users", "database/shared.py", shared.COUNT_USERS, allow_scan=True),
+    HotQuery("dashboard: active users", "database/shared.py", shared.COUNT_ACTIVE_USERS),
+    HotQuery("dashboard: pending resets", "database/shared.py", shared.COUNT_PENDING_RESETS),
+    HotQuery("reset token lookup", "pages/auth/reset.py", reset.RESET_TOKEN_BY_VALUE),
+    HotQuery("refresh rotation", "middleware/auth.py", refresh_tokens.ROTATE_TOKEN),
+    HotQuery("refresh reuse check", "middleware/auth.py", refresh_tokens.ROTATED_AT_FOR_LIVE_TOKEN),
+    HotQuery("refresh family revoke", "middleware/auth.py", refresh_tokens.REVOKE_FAMILY),
+    # Walks the created_at index in order and stops at LIMIT
+    HotQuery("admin users: first page", "pages/admin/users.py", shared.build_user_search(), allow_scan=True),
+    HotQuery(
+        "admin users: next page",
+        "pages/admin/users.py",
+        shared.build_user_search(after=(datetime(2026, 1, 1), 1)),
+    ),
+    HotQuery(
+        "admin users: email search",
+        "pages/admin/users.py",
+        shared.build_user_search(q="example", after=(datetime(2026, 1, 1), 1)),
+    ),
+    HotQuery(
+        "admin users: common email search",
+        "pages/admin/users.py",
+        shared.build_user_search(q="example", after=(datetime(2026, 1, 1), 1), drive_by_match=False),
+    ),
+    HotQuery(
+        "admin users: email prefix",
+        "pages/admin/users.py",
+        shared.build_user_search(q="us"),
+    ),
+    HotQuery(
+        "admin users: common email prefix",
+        "pages/admin/users.py",
+        shared.build_user_search(q="us", drive_by_match=False),
+        # Most users match, so walking created_at until LIMIT is the cheap plan
+        allow_scan=True,
+    ),
+    HotQuery(
+        "admin users: email match probe",
+        "pages/admin/users.py",
+        shared.email_matches_up_to("example", shared.MATCH_DRIVEN_MAX),
+    ),
+    HotQuery(
+        "admin users: rare role",
+        "pages/admin/users.py",
+        shared.build_user_search(role_ids=[2], active=True),
+    ),
+    HotQuery(
+        "admin users: common role",
+        "pages/admin/users.py",
+        shared.build_user_search(role_ids=[1], active=True, drive_by_role=False),
+        # Most users match, so walking created_at until LIMIT is the cheap plan
+        allow_scan=True,
+    ),
+    HotQuery(
+        "admin users: role size probe",
+        "pages/admin/users.py",
+        shared.ROLE_MEMBERS_UP_TO.params(role_ids=[1, 2], cap=shared.ROLE_DRIVEN_MAX),
+    ),
+    HotQuery("admin users: page roles", "pages/admin/users.py", shared.ROLES_FOR_USERS.params(user_ids=[1, 2, 3])),
+    HotQuery("audit: latest", "pages/admin/audit.py", audit.build_audit_search(before_id=100)),
+    HotQuery("audit: by user", "pages/admin/audit.py", audit.build_audit_search(user_id=1, before_id=100)),
+    HotQuery("audit: by type", "pages/admin/audit.py", audit.build_audit_search(event_type="auth.login_failed")),
+    HotQuery(
+        "audit: time range",
+        "pages/admin/audit.py",
+        audit.build_audit_search(since=datetime(2026, 1, 1), until=datetime(2026, 1, 2)),
+    ),
+    *(
+        HotQuery(f"rollup source: {source.metric}", "functions/rollups.py", source.statement.params(last_id=0))
+        for source in rollups.ROLLUP_SOURCES
+    ),
+    HotQuery("rollup watermark", "functions/rollups.py", rollups.WATERMARK),
+    HotQuery(
+        "dashboard timeseries",
+        "pages/dashboard.py",
+        rollups.ROLLUP_RANGE.params(
+            metrics=list(rollups.METRICS), granularity="day", start=datetime(2026, 1, 1), end=datetime(2026, 2, 1)
+        ),
+    ),
+    HotQuery("revocation sync", "functions/refresh_tokens.py", refresh_tokens.REVOKED_TOKENS_SINCE),
+    HotQuery("expire reset tokens", "functions/backups.py", backups.EXPIRE_RESET_TOKENS),
+    HotQuery("delete expired refresh tokens", "functions/backups.py", backups.DELETE_EXPIRED_REFRESH_TOKENS),
+]
+
+
+def migrate(revision: str) -> None:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    command.upgrade(config, revision)
+
+
+def seed(rows: int) -> None:
+    """Insert a representative spread of rows so ANALYZE gives realistic stats"""
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO users (email, hashed_password, is_active, created_at, updated_at) "
+                "VALUES (:email, 'x', :active, :ts, :ts)"
+            ),
+            [{"email": f"user{i}@example.com", "active": i % 10 != 0, "ts": now - timedelta(minutes=i)} for i in range(rows)],
+        )
+        conn.execute(text("INSERT INTO roles (name) VALUES ('user')"))
+        conn.execute(text("INSERT INTO roles (name, parent_role_id) VALUES ('admin', 1)"))
+        conn.execute(
+            text("INSERT INTO user_roles (user_id, role_id) VALUES (:user_id, :role_id)"),
+            [{"user_id": i + 1, "role_id": 1 if i % 50 else 2} for i in range(rows)],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO password_reset_tokens (user_id, token, expires_at, used, active) "
+                "VALUES (:user_id, :token, :expires_at, :used, :active)"
+            ),
+            [
+                {
+                    "user_id": i % rows + 1,
+                    "token": f"reset-{i}",
+                    "expires_at": now + timedelta(hours=1 - i % 48),
+                    "used": i % 3 == 0,
+                    "active": i % 3 != 0,
+                }
+                for i in range(rows)
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO refresh_tokens (jti, family_id, user_id, expires_at, rotated_at, revoked_at) "
+                "VALUES (:jti, :family_id, :user_id, :expires_at, :rotated_at, :revoked_at)"
+            ),
+            [
+                {
+                    "jti": f"jti-{i}",
+                    "family_id": f"family-{i // 4}",
+                    "user_id": i % rows + 1,
+                    "expires_at": now + timedelta(days=30 - i % 40),
+                    "rotated_at": now if i % 4 else None,
+                    "revoked_at": now if i % 97 == 0 else None,
+                }
+                for i in range(rows * 2)
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO audit_events (occurred_at, event_type, user_id, email) "
+                "VALUES (:ts, :event_type, :user_id, :email)"
+            ),
+            [
+                {
+                    "ts": now - timedelta(seconds=rows * 4 - i),
+                    "event_type": ("auth.login", "auth.login_failed", "auth.register", "role.granted")[i % 4],
+                    "user_id": i % rows + 1,
+                    "email": f"user{i % rows}@example.com",
+                }
+                for i in range(rows * 4)
+            ],
+        )
+        conn.execute(text("ANALYZE"))
+
+
+def explain(statement) -> list[str]:
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    # Plans don't depend on parameter values here, so bind NULLs
+    params = tuple(None for _ in compiled.positiontup or ())
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+
+def is_partial_index(name: str) -> bool:
+    with engine.connect() as conn:
+        sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).scalar()
+    return bool(sql and " WHERE " in sql.upper())
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Tables read in full, directly or through an unconstrained index walk.
+
+    Virtual tables always report SCAN; an FTS5 MATCH lookup shows up as an
+    ``M`` constraint in the index string and is not a full read. Scans of
+    subquery results (co-routines, materialized views) read only what the
+    subquery produced, whose own plan lines are checked separately.
+    """
+    subqueries = {line.split()[1] for line in plan if line.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    return [
+        line.split()[1]
+        for line in plan
+        if line.startswith("SCAN ")
+        and "CONSTANT ROW" not in line
+        and line.split()[1] not in subqueries
+        and not re.search(r"VIRTUAL TABLE INDEX \d+:\S*M", line)
+    ]
+
+
+def _constant(element) -> str | None:
+    if isinstance(element, (True_, False_)):
+        return "1" if isinstance(element, True_) else "0"
+    if isinstance(element, Null):
+        return "NULL"
+    if isinstance(element, BindParameter) and isinstance(element.value, bool):
+        return "1" if element.value else "0"
+    return None
+
+
+def suggest_index(statement, table: str) -> str | None:
+    """Derive an index for ``table`` from the statement's WHERE clause.
+
+    Equality columns lead, then one range column; predicates against boolean
+    constants become the partial-index WHERE clause instead of key columns.
+    """
+    where = getattr(statement, "whereclause", None)
+    if where is None:
+        return None
+
+    equality, ranges, partial = [], [], []
+    for element in iterate(where):
+        if not isinstance(element, BinaryExpression) or not isinstance(element.left, Column):
+            continue
+        column = element.left
+        if column.table.name != table:
+            continue
+        constant = _constant(element.right)
+        if element.operator in EQUALITY_OPERATORS and constant not in (None, "NULL"):
+            partial.append(f"{column.name} = {constant}")
+        elif element.operator in EQUALITY_OPERATORS and constant == "NULL":
+            partial.append(f"{column.name} IS NULL")
+        elif element.operator in EQUALITY_OPERATORS:
+            equality.append(column.name)
+        elif element.operator in RANGE_OPERATORS:
+            ranges.append(column.name)
+
+    columns = equality + ranges[:1]
+    if not columns and partial:
+        # Only boolean filters: index the flag itself
+        columns = [predicate.split()[0] for predicate in partial]
+        partial = []
+    if not columns:
+        return None
+    name = f"ix_{table}_{'_'.join(columns)}"
+    if partial:
+        name += "_where_" + "_".join(predicate.split()[0] for predicate in partial)
+    sql = f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+    if partial:
+        sql += f" WHERE {' AND '.join(partial)}"
+    return sql
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="users to seed")
+    parser.add_argument("--revision", default="head", help="alembic revision to check")
+    args = parser.parse_args()
+
+    migrate(args.revision)
+    seed(args.rows)
+
+    failures = 0
+    for query in HOT_QUERIES:
+        plan = explain(query.statement)
+        scans = full_scans(plan)
+        status = "ok"
+        if scans:
+            status = "scan (allowed)" if query.allow_scan else "FULL SCAN"
+        print(f"[{status}] {query.name}  ({query.source})")
+        for line in plan:
+            print(f"    {line}")
+        if scans and not query.allow_scan:
+            failures += 1
+            for table in scans:
+                suggestion = suggest_index(query.statement, table)
+                print(f"    suggest: {suggestion or 'no index derivable from WHERE clause'}")
+        for line in plan:
+            # Range searches through a full (non-partial) index may be narrowed further
+            if not line.startswith("SEARCH ") or "INDEX" not in line or not any(op in line for op in "<>"):
+                continue
+            index_name = line.split("INDEX ", 1)[1].split()[0]
+            if is_partial_index(index_name):
+                continue
+            suggestion = suggest_index(query.statement, line.split()[1])
+            if suggestion and " WHERE " in suggestion:
+                print(f"    consider: {suggestion}")
+
+    print(f"\n{len(HOT_QUERIES)} queries checked, {failures} with unexpected full scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import json
 from pathlib import Path
-from fastapi.openapi.utils import get_openapi
+
+from fastapi import FastAPI
+
 from app.main import app
 
 
 def main() -> None:
-    openapi_schema = app.openapi()
+    # Bypass the prebuilt-schema override so the export reflects the current routes
+    openapi_schema = FastAPI.openapi(app)
     out_path = Path(__file__).resolve().parents[2] / "openapi.json"
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8") as f:
@@ -0,0 +1,74 @@
+"""Write precompressed siblings of the built frontend assets.
+
+Usage (from backend/, after copying the frontend build to app/static):
+
+    uv run python -m app.scripts.precompress_static [app/static] [--min-size 1024]
+
+For every text asset (js, css, html, svg, json, ...) at least ``--min-size``
+bytes long, writes ``<file>.gz`` at maximum level, plus ``<file>.br`` and
+``<file>.zst`` when the brotli / zstandard packages are installed. Each
+variant is only kept if it is actually smaller. The static handler serves
+these directly, so the expensive levels are paid once at build time instead
+of on every request.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from ..functions.compression import SUFFIXES, installed_encodings, make_codec
+
+EXTENSIONS = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".txt", ".xml", ".map", ".webmanifest"}
+# Build time, so use the slowest, smallest settings
+MAX_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+MIN_SAVING = 0.05
+
+
+def precompress(path: Path, codecs, min_size: int) -> dict[str, int]:
+    data = path.read_bytes()
+    sizes = {}
+    if len(data) < min_size:
+        return sizes
+    for codec in codecs:
+        target = path.with_name(path.name + SUFFIXES[codec.name])
+        compressed = codec.compress(data)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            target.write_bytes(compressed)
+            os.utime(target, (path.stat().st_atime, path.stat().st_mtime))
+            sizes[codec.name] = len(compressed)
+        elif target.exists():
+            target.unlink()
+    return sizes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", nargs="?", default=str(Path(__file__).resolve().parents[1] / "static"))
+    parser.add_argument("--min-size", type=int, default=1024, help="skip smaller files (bytes)")
+    args = parser.parse_args()
+
+    root = Path(args.directory)
+    if not root.is_dir():
+        print(f"{root} does not exist; nothing to do", file=sys.stderr)
+        return
+
+    codecs = [make_codec(name, MAX_LEVELS[name]) for name in installed_encodings()]
+    totals = {codec.name: 0 for codec in codecs}
+    original = files = 0
+    for path in sorted(root.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in EXTENSIONS:
+            continue
+        sizes = precompress(path, codecs, args.min_size)
+        if sizes:
+            files += 1
+            original += path.stat().st_size
+            for name, size in sizes.items():
+                totals[name] += size
+
+    print(f"{files} files, {original / 1024:.1f} KiB")
+    for name, size in totals.items():
+        print(f"  {name:5} {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Import-time and startup profile for the backend.
+
+Usage (from backend/):
+
+    uv run python -m app.scripts.profile_startup [--top 20]
+
+Reports the slowest imports pulled in by ``import app.main`` (via
+``python -X importtime`` in a fresh interpreter), whether optional heavy
+dependencies were loaded eagerly, and wall-clock timings for app import,
+OpenAPI generation and the startup phase.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Dependencies that should only load when the feature using them runs
+LAZY_MODULES = ("boto3", "botocore", "passlib.context", "jose.jwt", "httpx")
+
+
+def _profile_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("JWT_SECRET", "profile-secret")
+    # Background jobs would copy the database during the startup measurement
+    env.setdefault("ENABLE_BACKUPS", "false")
+    return env
+
+
+def import_times() -> list[tuple[str, int, int]]:
+    """Run ``import app.main`` under -X importtime and return (module, self_us, cumulative_us)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=_profile_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def startup_times() -> dict[str, float]:
+    """Time app import, OpenAPI generation and the startup phase in this process"""
+    os.environ.update(_profile_env())
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    timings = {}
+    start = time.perf_counter()
+    from app.main import app
+    timings["import app.main"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app.openapi()
+    timings["first app.openapi()"] = time.perf_counter() - start
+
+    async def run_startup():
+        async with app.router.lifespan_context(app):
+            timings["startup phase"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(run_startup())
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=20, help="number of imports to list")
+    args = parser.parse_args()
+
+    rows = import_times()
+    total = next((cum for name, _, cum in rows if name == "app.main"), 0)
+    loaded = {name for name, _, _ in rows}
+
+    print(f"import app.main (fresh interpreter): {total / 1000:.1f} ms\n")
+    print(f"Top {args.top} imports by cumulative time:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+    print("\nOptional heavy dependencies at import time:")
+    for name in LAZY_MODULES:
+        print(f"  {name:16s} {'EAGER' if name in loaded else 'lazy'}")
+
+    print("\nStartup timings (this process):")
+    for label, seconds in startup_times().items():
+        print(f"  {label:22s} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
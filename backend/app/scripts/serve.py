@@ -0,0 +1,190 @@
+"""Production server: uvicorn with a worker pool sized for this machine.
+
+Usage (from backend/, after ``alembic upgrade head``):
+
+    uv run python -m app.scripts.serve [--workers N] [--host 0.0.0.0] [--port 5656] [--dry-run]
+
+Settings come from SERVER_* (see .env.example); flags override them.
+- Workers: SERVER_WORKERS_PER_CORE per usable core. Usable cores take
+  CPU affinity and cgroup quotas into account. The count is lowered when
+  the memory limit can't hold SERVER_WORKER_MEMORY_MB per worker.
+- Event loop and HTTP parser: uvloop and httptools when they are
+  installed.
+- The socket backlog and keep-alive timeout come from settings.
+- Each worker is recycled after SERVER_MAX_REQUESTS requests, plus up to
+  SERVER_MAX_REQUESTS_JITTER more, and is respawned by the supervisor.
+- The bcrypt cost is calibrated once here and handed to every worker, so
+  they all hash at the same cost.
+
+Signals to the launcher:
+- SIGHUP restarts the workers one at a time. Each worker finishes its
+  in-flight requests (up to SERVER_GRACEFUL_TIMEOUT_SECONDS) and exits
+  before its replacement starts, so the pool runs one worker short while
+  that replacement warms up. The supervisor keeps the listening socket,
+  so with a single worker new connections wait in the backlog until the
+  replacement is ready.
+- SIGTTIN and SIGTTOU add or remove a worker.
+- SIGTERM shuts everything down gracefully.
+
+``--dry-run`` logs the chosen configuration without starting the server.
+"""
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import random
+from functools import partial
+
+from ..config import settings
+from ..logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+APP = "app.main:app"
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def usable_cpus() -> float:
+    """Cores this process may use: affinity mask, capped by a cgroup CPU quota"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = None
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")  # cgroup v2: "<quota|max> <period>"
+    if cpu_max is not None:
+        limit, _, period = cpu_max.partition(" ")
+        if limit != "max" and period:
+            quota = int(limit) / int(period)
+    else:  # cgroup v1
+        limit, period = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+    return min(cpus, quota) if quota else cpus
+
+
+def memory_limit() -> int | None:
+    """Bytes available to this container (cgroup limit) or machine"""
+    physical = None
+    if hasattr(os, "sysconf") and "SC_PHYS_PAGES" in os.sysconf_names:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value = _read(path)
+        if value and value.isdigit():
+            # An unlimited v1 cgroup reports a huge sentinel instead of "max"
+            limit = int(value)
+            return min(limit, physical) if physical else limit
+    return physical
+
+
+def plan_workers(cpus: float, memory: int | None) -> tuple[int, str]:
+    """(workers, what decided it)"""
+    if settings.server_workers > 0:
+        return settings.server_workers, "SERVER_WORKERS"
+    workers, reason = max(1, math.floor(cpus * settings.server_workers_per_core)), "cpu"
+    if memory is not None:
+        by_memory = max(1, memory // (settings.server_worker_memory_mb * 2**20))
+        if by_memory < workers:
+            workers, reason = by_memory, "memory"
+    if settings.server_max_workers > 0 and settings.server_max_workers < workers:
+        workers, reason = settings.server_max_workers, "SERVER_MAX_WORKERS"
+    return workers, reason
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def calibrate_password_cost() -> None:
+    """Pick the bcrypt cost once for all workers (they inherit the environment)"""
+    if settings.password_bcrypt_rounds:
+        return
+    from ..functions.passwords import calibrate_bcrypt_rounds
+
+    rounds, seconds = calibrate_bcrypt_rounds(
+        settings.password_hash_target_ms / 1000,
+        settings.password_bcrypt_min_rounds,
+        settings.password_bcrypt_max_rounds,
+    )
+    os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(rounds)
+    logger.info("Password hashing calibrated", extra={"bcrypt_rounds": rounds, "estimated_ms": round(seconds * 1000, 1)})
+
+
+def run_worker(config, jitter: int, sockets=None) -> None:
+    """Worker process entry point; spreads recycling with a per-worker jitter"""
+    import uvicorn
+
+    if config.limit_max_requests and jitter:
+        config.limit_max_requests += random.randint(0, jitter)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=0, help="override the computed worker count")
+    parser.add_argument("--dry-run", action="store_true", help="log the configuration and exit")
+    args = parser.parse_args()
+
+    setup_logging()
+    cpus, memory = usable_cpus(), memory_limit()
+    workers, reason = (args.workers, "--workers") if args.workers > 0 else plan_workers(cpus, memory)
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    max_requests = settings.server_max_requests or None
+
+    logger.info(
+        "Server configuration",
+        extra={
+            "bind": f"{args.host}:{args.port}",
+            "workers": workers,
+            "workers_decided_by": reason,
+            "usable_cpus": round(cpus, 2),
+            "memory_mb": memory // 2**20 if memory else None,
+            "loop": loop,
+            "http": http,
+            "keepalive_seconds": settings.server_keepalive_seconds,
+            "backlog": settings.server_backlog,
+            "max_requests": max_requests,
+            "max_requests_jitter": settings.server_max_requests_jitter if max_requests else None,
+            "graceful_timeout_seconds": settings.server_graceful_timeout_seconds,
+        },
+    )
+    if args.dry_run:
+        return
+
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    calibrate_password_cost()
+    config = uvicorn.Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_seconds,
+        limit_max_requests=max_requests,
+        # app.logs configures logging in every worker; access lines come
+        # from our middleware
+        log_config=None,
+        access_log=False,
+        server_header=False,
+    )
+    # Always supervised, even with one worker, so recycled or crashed
+    # workers are replaced and SIGHUP restarts work
+    sock = config.bind_socket()
+    Multiprocess(config, target=partial(run_worker, config, settings.server_max_requests_jitter), sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Soak test: drive the auth endpoints for a long time and track worker memory.
+
+Usage (from backend/, against a running server):
+
+    uv run python -m app.scripts.soak_test --url http://localhost:8000 \\
+        --duration 4h --users 20 --admin-email admin@example.com --admin-password ...
+
+Each virtual user registers once, then loops login -> me -> dashboard ->
+refresh -> logout. Memory is sampled every ``--sample-every`` seconds from
+``/api/admin/memory`` (needs an admin account; each call reports whichever
+worker served it, so samples are grouped by pid) and/or from ``/proc`` for
+the given ``--pid`` values. At the end it prints the RSS growth per worker as
+a least-squares slope in MiB/hour, which separates a steady leak from
+warm-up noise. ``--csv`` writes the raw samples.
+"""
+import argparse
+import asyncio
+import csv
+import re
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+PASSWORD = "soak-test-password"
+
+
+def parse_duration(value: str) -> float:
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", value)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors = 0
+
+    def record(self, name: str, status: int, latency: float) -> None:
+        self.latencies[name].append(latency)
+        self.statuses[name][status] += 1
+
+    def report(self) -> None:
+        print(f"{'endpoint':12s} {'requests':>9s} {'p50 ms':>8s} {'p99 ms':>8s}  statuses")
+        for name, values in self.latencies.items():
+            values = sorted(values)
+            p50 = values[len(values) // 2] * 1000
+            p99 = values[min(len(values) - 1, int(len(values) * 0.99))] * 1000
+            statuses = ", ".join(f"{code}: {count}" for code, count in sorted(self.statuses[name].items()))
+            print(f"{name:12s} {len(values):9d} {p50:8.1f} {p99:8.1f}  {statuses}")
+        print(f"transport errors: {self.errors}")
+
+
+async def call(client: httpx.AsyncClient, stats: Stats, name: str, method: str, path: str, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError:
+        stats.errors += 1
+        return None
+    stats.record(name, response.status_code, time.perf_counter() - start)
+    return response
+
+
+async def virtual_user(url: str, stats: Stats, deadline: float, pause: float) -> None:
+    email = f"soak-{uuid.uuid4().hex[:12]}@example.com"
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        await call(client, stats, "register", "POST", "/api/auth/register/onsubmit",
+                   json={"email": email, "password": PASSWORD})
+        while time.monotonic() < deadline:
+            client.cookies.clear()
+            await call(client, stats, "login", "POST", "/api/auth/login/onsubmit",
+                       json={"email": email, "password": PASSWORD})
+            await call(client, stats, "me", "GET", "/api/auth/me")
+            await call(client, stats, "dashboard", "GET", "/api/dashboard/onload")
+            await call(client, stats, "refresh", "POST", "/api/auth/refresh")
+            await call(client, stats, "logout", "POST", "/api/auth/logout/onsubmit")
+            await asyncio.sleep(pause)
+
+
+def proc_rss(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def sample_memory(args, samples: list[tuple[float, str, int]], deadline: float) -> None:
+    admin = None
+    if args.admin_email:
+        admin = httpx.AsyncClient(base_url=args.url, timeout=30)
+        response = await admin.post("/api/auth/login/onsubmit",
+                                    json={"email": args.admin_email, "password": args.admin_password})
+        response.raise_for_status()
+
+    start = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic() - start
+            if admin is not None:
+                # Several polls so each worker behind the listener gets sampled
+                for _ in range(args.admin_polls):
+                    response = await admin.get("/api/admin/memory")
+                    if response.status_code == 401:
+                        await admin.post("/api/auth/refresh")
+                        response = await admin.get("/api/admin/memory")
+                    if response.status_code == 200:
+                        data = response.json()
+                        if data["rss_bytes"] is not None:
+                            samples.append((now, f"worker {data['pid']}", data["rss_bytes"]))
+            for pid in args.pid:
+                rss = proc_rss(pid)
+                if rss is not None:
+                    samples.append((now, f"pid {pid}", rss))
+
+            latest = {}
+            for _, source, rss in samples:
+                latest[source] = rss
+            print(f"[{now / 60:7.1f} min] " + "  ".join(f"{s}: {r / 2**20:.1f} MiB" for s, r in sorted(latest.items())))
+            if time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(min(args.sample_every, max(0.0, deadline - time.monotonic())))
+    finally:
+        if admin is not None:
+            await admin.aclose()
+
+
+def slope_per_hour(points: list[tuple[float, int]]) -> float:
+    """Least-squares slope of RSS over time, in bytes per hour"""
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_r = sum(r for _, r in points) / n
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    if var == 0:
+        return 0.0
+    return sum((t - mean_t) * (r - mean_r) for t, r in points) / var * 3600
+
+
+def report_memory(samples: list[tuple[float, str, int]]) -> None:
+    by_source: dict[str, list[tuple[float, int]]] = defaultdict(list)
+    for t, source, rss in samples:
+        by_source[source].append((t, rss))
+    print(f"\n{'source':16s} {'samples':>7s} {'first MiB':>10s} {'last MiB':>9s} {'peak MiB':>9s} {'MiB/hour':>9s}")
+    for source, points in sorted(by_source.items()):
+        first, last = points[0][1], points[-1][1]
+        peak = max(r for _, r in points)
+        slope = slope_per_hour(points) if len(points) >= 2 else 0.0
+        print(f"{source:16s} {len(points):7d} {first / 2**20:10.1f} {last / 2**20:9.1f} "
+              f"{peak / 2**20:9.1f} {slope / 2**20:9.2f}")
+
+
+async def run(args) -> None:
+    stats = Stats()
+    samples: list[tuple[float, str, int]] = []
+    deadline = time.monotonic() + args.duration
+    users = [
+        asyncio.create_task(virtual_user(args.url, stats, deadline, args.pause))
+        for _ in range(args.users)
+    ]
+    await sample_memory(args, samples, deadline)
+    await asyncio.gather(*users)
+
+    print()
+    stats.report()
+    report_memory(samples)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["seconds", "source", "rss_bytes"])
+            writer.writerows(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=parse_duration, default="1h", help="e.g. 90s, 30m, 4h")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds between a user's iterations")
+    parser.add_argument("--sample-every", type=float, default=60.0, help="seconds between memory samples")
+    parser.add_argument("--admin-email", help="admin account for /api/admin/memory")
+    parser.add_argument("--admin-password")
+    parser.add_argument("--admin-polls", type=int, default=4, help="memory polls per sample (spreads over workers)")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="server pid to read RSS from /proc")
+    parser.add_argument("--csv", help="write raw memory samples to this file")
+    args = parser.parse_args()
+    if not args.admin_email and not args.pid:
+        parser.error("give --admin-email/--admin-password or at least one --pid to sample memory")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
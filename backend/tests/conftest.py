@@ -0,0 +1,13 @@
+import os
+import tempfile
+from pathlib import Path
+
+# The app builds its engines at import time, so every test module must agree
+# on the database before anything imports it: TEST_POSTGRES_URL when given,
+# otherwise a throwaway SQLite file. A small cleanup batch makes batching
+# observable.
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = os.environ.get("TEST_POSTGRES_URL") or f"sqlite:///{Path(_tmpdir.name) / 'test.db'}"
+os.environ["DATABASE_READ_URLS"] = "[]"
+os.environ["DB_CLEANUP_BATCH_SIZE"] = "10"
+os.environ.setdefault("JWT_SECRET", "test-secret")
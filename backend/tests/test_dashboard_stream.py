@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.functions.metrics_stream import MetricsBroadcaster
+from app.pages import dashboard
+
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    broadcaster = MetricsBroadcaster(interval=60, max_subscribers=2)
+    monkeypatch.setattr(dashboard, "metrics_broadcaster", broadcaster)
+    # Each test's asyncio.run() cancels the ticker when its loop ends
+    return broadcaster
+
+
+def test_dropped_stream_holds_no_slot(broadcaster):
+    async def drop_responses():
+        for _ in range(3):
+            # e.g. the client left before the first chunk was sent
+            await dashboard.dashboard_stream(ConnectedRequest(), current_user=None)
+
+    asyncio.run(drop_responses())
+    assert len(broadcaster) == 0
+    assert broadcaster._task is None
+
+
+def test_stream_releases_slot_when_closed(broadcaster):
+    async def stream_and_close():
+        response = await dashboard.dashboard_stream(ConnectedRequest(), current_user=None)
+        body = response.body_iterator
+        assert (await body.__anext__()).startswith("retry:")
+        # Subscribes while waiting for the first tick
+        next_chunk = asyncio.ensure_future(body.__anext__())
+        await asyncio.sleep(0)
+        assert len(broadcaster) == 1
+        next_chunk.cancel()
+        await asyncio.gather(next_chunk, return_exceptions=True)
+        await body.aclose()
+        return len(broadcaster)
+
+    assert asyncio.run(stream_and_close()) == 0
+
+
+def test_full_stream_answers_503(broadcaster):
+    async def subscribe_past_capacity():
+        broadcaster.subscribe()
+        broadcaster.subscribe()
+        await dashboard.dashboard_stream(ConnectedRequest(), current_user=None)
+
+    with pytest.raises(dashboard.HTTPException) as error:
+        asyncio.run(subscribe_past_capacity())
+    assert error.value.status_code == 503
@@ -0,0 +1,248 @@
+"""PostgreSQL-specific behaviour, run against a real server.
+
+Skipped unless TEST_POSTGRES_URL is set, e.g.
+
+    TEST_POSTGRES_URL=postgresql+psycopg://postgres@localhost/service_test uv run pytest
+
+The URL must point at a throwaway database: its public schema is dropped
+and rebuilt with ``alembic upgrade head`` (pg_trgm must be installable).
+"""
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+if not POSTGRES_URL:
+    pytest.skip("TEST_POSTGRES_URL is not set", allow_module_level=True)
+
+# conftest.py points the app at TEST_POSTGRES_URL
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from alembic.script import ScriptDirectory  # noqa: E402
+from sqlalchemy import func, insert, select, text, update  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import (  # noqa: E402
+    create_app_engine,
+    database_url,
+    engine,
+    get_db_session,
+    request_session_scope,
+    shared,
+)
+from app.database.models import (  # noqa: E402
+    DataMigrationState,
+    PasswordResetToken,
+    RefreshToken,
+    RollupWatermark,
+    User,
+)
+from app.functions import data_migrations, rollups  # noqa: E402
+from app.functions.backups import (  # noqa: E402
+    DELETE_EXPIRED_REFRESH_TOKENS,
+    _run_batches,
+    delete_expired_tokens,
+    job_lock,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def alembic_config() -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return config
+
+
+@pytest.fixture(scope="module", autouse=True)
+def migrated():
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    command.upgrade(alembic_config(), "head")
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE users, audit_events, metric_rollups, data_migrations RESTART IDENTITY CASCADE"))
+        conn.execute(update(RollupWatermark).values(last_id=0))
+
+
+def add_users(*emails: str, created_at: datetime | None = None) -> list[int]:
+    created_at = created_at or datetime.utcnow()
+    with get_db_session() as db:
+        ids = db.scalars(
+            insert(User).returning(User.id),
+            [{"email": email, "hashed_password": "x", "created_at": created_at, "updated_at": created_at} for email in emails],
+        ).all()
+        db.commit()
+    return list(ids)
+
+
+# --- engine and migrations ---------------------------------------------------
+
+def test_connect_options():
+    with engine.connect() as conn:
+        timeout = conn.scalar(text("SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"))
+        assert timeout == str(settings.db_statement_timeout_ms)
+        assert conn.scalar(text("SELECT current_setting('application_name')")) == settings.db_application_name
+        assert conn.scalar(text("SHOW default_transaction_read_only")) == "off"
+
+
+def test_read_only_engine_rejects_writes():
+    reader = create_app_engine(POSTGRES_URL, read_only=True)
+    try:
+        with reader.connect() as conn:
+            assert conn.scalar(text("SHOW default_transaction_read_only")) == "on"
+            with pytest.raises(DBAPIError, match="read-only transaction"):
+                conn.execute(update(User).values(is_active=True))
+    finally:
+        reader.dispose()
+
+
+def test_postgres_scheme_is_accepted():
+    url = make_url(POSTGRES_URL).set(drivername="postgres")
+    assert database_url(url.render_as_string(hide_password=False)).drivername == "postgresql"
+
+
+def test_request_without_replicas_uses_one_connection():
+    # A second checkout from the writer pool per request can exhaust it
+    with request_session_scope() as scope:
+        assert scope.read_session is scope.session
+
+
+def test_migrations_reach_head():
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT version_num FROM alembic_version")) == head
+        assert conn.scalar(text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")) == 1
+        indexes = set(conn.scalars(text("SELECT indexname FROM pg_indexes WHERE tablename = 'users'")))
+    assert {"ix_users_email_trgm", "ix_users_created_at_id"} <= indexes
+
+
+def test_email_search_is_case_insensitive():
+    add_users("Alice@Example.com", "bob@example.com", "carol@other.org")
+    assert {row.email for row in shared.search_users(q="EXAMPLE")} == {"Alice@Example.com", "bob@example.com"}
+    assert [row.email for row in shared.search_users(q="100%")] == []
+
+
+# --- cleanup and locking -----------------------------------------------------
+
+def test_cleanup_batches_skip_locked_rows():
+    user_id = add_users("tokens@example.com")[0]
+    now = datetime.utcnow()
+    with get_db_session() as db:
+        db.execute(
+            insert(RefreshToken),
+            [
+                {
+                    "jti": f"jti-{i}",
+                    "family_id": f"family-{i}",
+                    "user_id": user_id,
+                    "expires_at": now + timedelta(days=1 if i < 3 else -1),
+                }
+                for i in range(28)
+            ],
+        )
+        db.commit()
+
+    # Another node holds some expired rows: cleanup must go around them
+    # rather than wait on them
+    with engine.connect() as other:
+        locked = set(
+            other.scalars(
+                select(RefreshToken.id).where(RefreshToken.expires_at < now).order_by(RefreshToken.id).limit(5).with_for_update()
+            )
+        )
+        assert _run_batches(DELETE_EXPIRED_REFRESH_TOKENS, now) == 20
+        other.rollback()
+
+    with get_db_session() as db:
+        expired = set(db.scalars(select(RefreshToken.id).where(RefreshToken.expires_at < now)))
+        assert expired == locked
+        assert db.scalar(select(func.count()).select_from(RefreshToken).where(RefreshToken.expires_at > now)) == 3
+    assert delete_expired_tokens() == (0, 5)
+
+
+def test_expired_reset_tokens_are_deactivated_in_batches():
+    user_id = add_users("resets@example.com")[0]
+    now = datetime.utcnow()
+    with get_db_session() as db:
+        db.execute(
+            insert(PasswordResetToken),
+            [
+                {"user_id": user_id, "token": f"reset-{i}", "expires_at": now + timedelta(hours=1 if i < 2 else -1)}
+                for i in range(25)
+            ],
+        )
+        db.commit()
+    assert delete_expired_tokens() == (23, 0)
+    with get_db_session() as db:
+        assert db.scalar(select(func.count()).select_from(PasswordResetToken).where(PasswordResetToken.active)) == 2
+
+
+def test_job_lock_is_exclusive_across_sessions():
+    with job_lock("test.job") as first:
+        assert first
+        # Each job_lock checks out its own connection, i.e. its own session,
+        # standing in for another node
+        with job_lock("test.job") as second:
+            assert not second
+        with job_lock("test.other") as other:
+            assert other
+    with job_lock("test.job") as again:
+        assert again
+
+
+# --- ON CONFLICT upserts -----------------------------------------------------
+
+def test_rollup_counts_accumulate():
+    bucket = datetime(2026, 1, 1, 5)
+    with get_db_session() as db:
+        rollups._add_counts(db, Counter({("signups", "hour", bucket): 2}))
+        rollups._add_counts(db, Counter({("signups", "hour", bucket): 3}))
+        db.commit()
+    points = rollups.get_timeseries(["signups"], "hour", bucket, bucket + timedelta(hours=1))
+    assert points == [{"bucket": bucket.isoformat(), "signups": 5}]
+
+
+def test_roll_up_counts_each_row_once():
+    created_at = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+    add_users(*(f"signup{i}@example.com" for i in range(7)), created_at=created_at)
+    assert rollups.run_rollups()["signups"] == 7
+    assert rollups.run_rollups()["signups"] == 0
+    points = rollups.get_timeseries(["signups"], "hour", created_at, created_at + timedelta(hours=1))
+    assert points[0]["signups"] == 7
+
+
+def test_data_migration_state_rows_and_batches(monkeypatch):
+    add_users(*(f"migrate{i}@example.com" for i in range(5)))
+
+    def touch_users(db, after, limit):
+        ids = db.scalars(select(User.id).where(User.id > after).order_by(User.id).limit(limit)).all()
+        return len(ids), ids[-1] if ids else after
+
+    migration = data_migrations.DataMigration(
+        "test.touch_users", touch_users, lambda db: db.scalar(select(func.count()).select_from(User))
+    )
+    monkeypatch.setitem(data_migrations.MIGRATIONS, migration.name, migration)
+
+    data_migrations.ensure_state_rows()
+    data_migrations.ensure_state_rows()
+    with get_db_session() as db:
+        assert db.scalar(select(func.count()).select_from(DataMigrationState)) == 1
+
+    assert data_migrations.run_to_completion(migration, batch_size=2, throttle=False) == 5
+    with get_db_session() as db:
+        state = db.get(DataMigrationState, migration.name)
+        assert (state.processed, state.total, state.finished_at is not None) == (5, 5, True)
+    assert data_migrations.is_complete(migration.name)
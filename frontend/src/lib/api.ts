@@ -1,3 +1,4 @@
+import { useEffect } from 'react'
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
 import type { LoginData, RegisterPayload, User } from '@/lib/types'
 
@@ -125,13 +126,42 @@ const apiClient = {
       throw new Error(error.detail || error.message || `Failed to load ${page} data`)
     }
     return response.json()
+  },
+
+  // Run several page calls (e.g. auth/me + dashboard/onload) in one round trip
+  async batch(requests: BatchItem[]): Promise<Record<string, BatchResult>> {
+    const response = await fetchWithAuth('/api/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ requests }),
+    })
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}))
+      throw new Error(error.detail || error.message || 'Batch request failed')
+    }
+    const json = await response.json()
+    return Object.fromEntries(json.responses.map((r: BatchResult) => [r.id, r]))
   }
 }
 
+export interface BatchItem {
+  id: string
+  path: string
+  method?: 'GET' | 'POST'
+  body?: unknown
+}
+
+export interface BatchResult {
+  id: string
+  status: number
+  body: any
+}
+
 // Export the api object for use in route loaders
 export const api = {
   auth: apiClient,
   getPageData: apiClient.getPageData,
+  batch: apiClient.batch,
 }
 
 // Auth hooks
@@ -194,3 +224,20 @@ export function usePageData(page: string) {
     }
   })
 }
+
+// Live dashboard metrics: patches the cached dashboard page data on every
+// server-sent tick instead of polling /api/dashboard/onload
+export function useDashboardStream() {
+  const queryClient = useQueryClient()
+
+  useEffect(() => {
+    const source = new EventSource('/api/dashboard/stream')
+    source.addEventListener('metrics', (event) => {
+      const metrics = JSON.parse((event as MessageEvent).data)
+      queryClient.setQueryData(['pageData', 'dashboard'], (data: any) =>
+        data ? { ...data, system_metrics: metrics } : data
+      )
+    })
+    return () => source.close()
+  }, [queryClient])
+}
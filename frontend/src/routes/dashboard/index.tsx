@@ -1,5 +1,5 @@
 import { createFileRoute, redirect } from '@tanstack/react-router'
-import { usePageData } from '@/lib/api'
+import { useDashboardStream, usePageData } from '@/lib/api'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Users, Activity, Clock } from 'lucide-react'
 import type { DashboardData } from '@/lib/types'
@@ -23,6 +23,7 @@ export const Route = createFileRoute('/dashboard/')({
 
 function DashboardPage() {
   const { data, isLoading, error } = usePageData('dashboard')
+  useDashboardStream()
 
   if (isLoading) {
     return (
@@ -1,6 +1,7 @@
 #!/bin/bash
 
 # run.sh - Run both backend and frontend for local development
+# Usage: ./run.sh [--prod]
 set -e
 
 # Colors for output
@@ -27,10 +28,17 @@ if [ ! -f .env ]; then
     exit 1
 fi
 
-# Start backend
-echo -e "${GREEN}Starting backend on http://localhost:5656${NC}"
+# Start backend. --prod runs it through the production launcher (multiple
+# workers, no reload), e.g. to check behaviour or throughput locally.
 cd backend
-uv run uvicorn app.main:app --reload --host 0.0.0.0 --port 5656 2>&1 | sed "s/^/[BACKEND] /" &
+if [ "$1" = "--prod" ]; then
+    echo -e "${GREEN}Starting backend (production launcher) on http://localhost:5656${NC}"
+    uv run alembic upgrade head
+    uv run python -m app.scripts.serve --port 5656 2>&1 | sed "s/^/[BACKEND] /" &
+else
+    echo -e "${GREEN}Starting backend on http://localhost:5656${NC}"
+    uv run uvicorn app.main:app --reload --host 0.0.0.0 --port 5656 2>&1 | sed "s/^/[BACKEND] /" &
+fi
 BACKEND_PID=$!
 cd ..
 